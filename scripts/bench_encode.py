@@ -0,0 +1,85 @@
+"""
+Benchmark EncoderPool throughput against thread count (no camera needed).
+
+Encodes synthetic left+right frames at the chosen resolution with 1, 2, 4,
+... threads up to the core count, and prints frames/s and the speedup over
+a plain serial cv2.imencode loop. Run with --codec png to see the lossless
+path.
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from zed_toolbox.encoding import EncoderPool, pack_frame
+
+
+SIZES = {"HD720": (720, 1280), "HD1080": (1080, 1920), "HD2K": (1242, 2208)}
+
+
+def synthetic_frame(h, w, seed):
+    """Smooth gradients plus texture and noise, so JPEG/PNG work like on a real image."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    base = 127 + 60 * np.sin(x / 97.0 + seed) * np.cos(y / 61.0)
+    texture = cv2.resize(rng.uniform(-40, 40, (h // 16, w // 16)).astype(np.float32), (w, h))
+    gray = base + texture + rng.normal(0, 4, (h, w))
+    img = np.stack([gray, np.roll(gray, 7, axis=1), np.roll(gray, 13, axis=0)], axis=-1)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def run_pool(frames, threads, codec, quality):
+    delivered = []
+    with EncoderPool(threads, codec=codec, quality=quality) as pool:
+        t0 = time.perf_counter()
+        for i, frame in enumerate(frames):
+            pool.submit(frame, meta=i, callback=lambda enc, meta: delivered.append(meta))
+        pool.flush()
+        elapsed = time.perf_counter() - t0
+    assert delivered == list(range(len(frames))), "callbacks out of order"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolution", choices=sorted(SIZES), default="HD720")
+    parser.add_argument("--codec", choices=["jpeg", "png"], default="jpeg")
+    parser.add_argument("--quality", type=int, default=90)
+    parser.add_argument("--frames", type=int, default=120, help="stereo frames per run")
+    parser.add_argument("--max-threads", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)    # measure our pool, not OpenCV's internal threading
+    h, w = SIZES[args.resolution]
+    images = [synthetic_frame(h, w, seed) for seed in range(8)]
+    frames = [{"left": images[i % 8], "right": images[(i + 1) % 8]} for i in range(args.frames)]
+
+    ext = ".jpg" if args.codec == "jpeg" else ".png"
+    params = [cv2.IMWRITE_JPEG_QUALITY, args.quality] if args.codec == "jpeg" else [cv2.IMWRITE_PNG_COMPRESSION, 1]
+    t0 = time.perf_counter()
+    for frame in frames:
+        for img in frame.values():
+            cv2.imencode(ext, img, params)
+    serial = time.perf_counter() - t0
+
+    with EncoderPool(1, codec=args.codec, quality=args.quality) as pool:
+        packed = len(pack_frame(pool.encode(frames[0])))
+    raw = sum(img.nbytes for img in frames[0].values())
+
+    print(f"{args.resolution} stereo, {args.codec}"
+          f"{f' q{args.quality}' if args.codec == 'jpeg' else ''}, {args.frames} frames, "
+          f"{os.cpu_count()} core(s)")
+    print(f"packed frame {packed / 1e6:.2f} MB vs {raw / 1e6:.2f} MB raw ({raw / packed:.1f}x)")
+    print(f"{'threads':>8} {'frames/s':>9} {'speedup':>8}")
+    print(f"{'serial':>8} {args.frames / serial:9.1f} {1.0:8.2f}")
+    threads = 1
+    while threads <= args.max_threads:
+        elapsed = run_pool(frames, threads, args.codec, args.quality)
+        print(f"{threads:8d} {args.frames / elapsed:9.1f} {serial / elapsed:8.2f}")
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
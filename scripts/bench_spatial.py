@@ -0,0 +1,111 @@
+"""
+Benchmark VoxelGrid updates and queries against linear scans (no camera needed).
+
+Renders synthetic depth maps (floor, wall and a few boxes seen by a slowly
+moving camera) at HD720 and HD1080, then per resolution prints:
+  - deprojection and incremental integrate() time per frame
+  - box / radius / ray query time on the grid vs. a linear scan over the
+    frame's point list (what a planner does without an index)
+Queries are repeated --queries times at random positions in the scene.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from zed_toolbox.geometry import depth_to_points
+from zed_toolbox.spatial import VoxelGrid
+
+
+SIZES = {"HD720": (720, 1280), "HD1080": (1080, 1920)}
+
+
+def synthetic_depth(h, w, K, shift):
+    """Depth (meters) of a floor 1.2 m below the camera, a wall at 6 m and
+    three boxes, with the camera moved sideways by `shift`."""
+    fx, fy, cx, cy = K[0, 0], K[1, 1], K[0, 2], K[1, 2]
+    v, u = np.mgrid[0:h, 0:w].astype(np.float32)
+    x, y = (u - cx) / fx, (v - cy) / fy
+    with np.errstate(divide="ignore"):
+        depth = np.where(y > 0, 1.2 / y, np.inf)
+    depth = np.minimum(depth, 6.0)
+    for bx, bz, size in ((-0.8, 2.5, 0.5), (0.6, 3.5, 0.8), (1.5, 4.5, 0.6)):
+        z = bz - size / 2
+        X = x * z + shift
+        Y = y * z
+        inside = (np.abs(X - bx) < size / 2) & (Y > 1.2 - size) & (Y < 1.2)
+        depth = np.where(inside & (z < depth), z, depth)
+    noise = np.random.default_rng(int(shift * 1000)).normal(0, 0.003, depth.shape)
+    return (depth * (1 + noise)).astype(np.float32)
+
+
+def timed(fn, repeat):
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - t0) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voxel", type=float, default=0.05, help="voxel size in meters")
+    parser.add_argument("--stride", type=int, default=1, help="deproject every n-th pixel")
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-age", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for name, (h, w) in SIZES.items():
+        K = np.array([[0.55 * w, 0, w / 2], [0, 0.55 * w, h / 2], [0, 0, 1]])
+        depths = [synthetic_depth(h, w, K, 0.01 * i) for i in range(args.frames)]
+        grid = VoxelGrid(args.voxel, max_age=args.max_age)
+
+        deproject_ms, integrate_ms = [], []
+        for depth in depths:
+            t0 = time.perf_counter()
+            points = depth_to_points(depth, K, args.stride, max_depth=5.9)
+            t1 = time.perf_counter()
+            grid.integrate(points)
+            t2 = time.perf_counter()
+            deproject_ms.append((t1 - t0) * 1e3)
+            integrate_ms.append((t2 - t1) * 1e3)
+
+        centers = rng.uniform([-2, -1, 1], [2, 1.2, 5.5], (args.queries, 3))
+        half = rng.uniform(0.1, 0.5, (args.queries, 3))
+        dirs = rng.normal([0, 0, 1], 0.3, (args.queries, 3))
+        origin = np.zeros(3)
+
+        def scan_box(i):
+            lo, hi = centers[i] - half[i], centers[i] + half[i]
+            return int(((points >= lo) & (points <= hi)).all(axis=1).sum())
+
+        def scan_radius(i):
+            return int((np.sum((points - centers[i]) ** 2, axis=1) <= 0.09).sum())
+
+        def scan_ray(i):
+            d = dirs[i] / np.linalg.norm(dirs[i])
+            t = points @ d
+            dist = np.linalg.norm(points - t[:, None] * d, axis=1)
+            hit = (dist < args.voxel) & (t > 0)
+            return t[hit].min() if hit.any() else None
+
+        rows = [
+            ("box count", lambda i: grid.count_box(centers[i] - half[i], centers[i] + half[i]), scan_box),
+            ("radius 0.3", lambda i: grid.query_radius(centers[i], 0.3), scan_radius),
+            ("ray 6 m", lambda i: grid.raycast(origin, dirs[i], max_range=6.0), scan_ray),
+        ]
+
+        print(f"{name}: {len(points):,} points/frame (stride {args.stride}), "
+              f"{len(grid):,} voxels of {args.voxel} m")
+        print(f"  deproject {np.median(deproject_ms):7.2f} ms   integrate {np.median(integrate_ms):7.2f} ms"
+              f" (median of {args.frames} frames)")
+        print(f"  {'query':<12}{'grid ms':>10}{'scan ms':>10}{'speedup':>9}")
+        for label, grid_fn, scan_fn in rows:
+            grid_t = timed(grid_fn, args.queries)
+            scan_t = timed(scan_fn, min(args.queries, 20))
+            print(f"  {label:<12}{grid_t:10.3f}{scan_t:10.2f}{scan_t / grid_t:9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
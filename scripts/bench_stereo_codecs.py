@@ -0,0 +1,108 @@
+"""
+Compare the lossless stereo codecs (RecorderConfig.stereo_codec) on
+representative frames.
+
+By default uses synthetic HD720 frames (smooth shading, texture and sensor
+noise); pass --frames-from with a recorded cam_<last3>_left.npz / .zfr to
+measure on your own scene. For each codec and level prints encode and
+decode throughput (MB/s of raw frames, with --threads compression
+threads, as the Recorder runs them) and the compression ratio. lz4 rows
+are skipped unless the lz4 package is installed.
+"""
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from zed_toolbox.framestore import FrameStoreWriter, load_frames, read_frames
+
+
+CANDIDATES = [("npz", None), ("none", None), ("zlib", 1), ("zlib", 3), ("zlib", 6),
+              ("lz4", 0), ("lz4", 9), ("png", 1), ("png", 3)]
+
+
+def synthetic_frame(h, w, seed):
+    """Smooth gradients plus texture and noise, so codecs work like on a real image."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    base = 127 + 60 * np.sin(x / 97.0 + seed) * np.cos(y / 61.0)
+    texture = cv2.resize(rng.uniform(-40, 40, (h // 16, w // 16)).astype(np.float32), (w, h))
+    gray = base + texture + rng.normal(0, 4, (h, w))
+    img = np.stack([gray, np.roll(gray, 7, axis=1), np.roll(gray, 13, axis=0)], axis=-1)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def run(codec, level, frames, threads, chunk_frames):
+    """(encode s, decode s, encoded bytes) for one codec."""
+    buf = io.BytesIO()
+    if codec == "npz":
+        t0 = time.perf_counter()
+        np.savez_compressed(buf, frames=np.stack(frames))
+        t1 = time.perf_counter()
+        buf.seek(0)
+        with np.load(buf) as data:
+            data["frames"]
+        return t1 - t0, time.perf_counter() - t1, buf.getbuffer().nbytes
+
+    pool = ThreadPoolExecutor(threads) if threads else None
+    try:
+        t0 = time.perf_counter()
+        writer = FrameStoreWriter(codec, level, chunk_frames, pool)
+        for frame in frames:
+            writer.append(frame)
+        writer.write(buf)
+        t1 = time.perf_counter()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    path = f"/tmp/bench_stereo_{os.getpid()}.zfr"
+    with open(path, "wb") as f:
+        f.write(buf.getbuffer())
+    try:
+        t2 = time.perf_counter()
+        load_frames(path, threads=max(threads, 1))
+        t3 = time.perf_counter()
+    finally:
+        os.remove(path)
+    return t1 - t0, t3 - t2, buf.getbuffer().nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames-from", default=None, help="recorded .npz/.zfr to take frames from")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-frames", type=int, default=8)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)    # measure our threads, not OpenCV's
+    if args.frames_from:
+        frames = []
+        for frame in read_frames(args.frames_from):
+            frames.append(frame)
+            if len(frames) == args.frames:
+                break
+    else:
+        images = [synthetic_frame(720, 1280, seed) for seed in range(8)]
+        frames = [images[i % 8] for i in range(args.frames)]
+    raw = sum(f.nbytes for f in frames)
+
+    print(f"{len(frames)} frames of {frames[0].shape} {frames[0].dtype} ({raw / 1e6:.0f} MB), "
+          f"{args.threads} thread(s), {os.cpu_count()} core(s)")
+    print(f"{'codec':<10}{'encode MB/s':>12}{'decode MB/s':>12}{'ratio':>8}")
+    for codec, level in CANDIDATES:
+        label = codec if level is None else f"{codec} {level}"
+        try:
+            enc, dec, size = run(codec, level, frames, args.threads, args.chunk_frames)
+        except RuntimeError as e:
+            print(f"{label:<10}  skipped: {e}")
+            continue
+        print(f"{label:<10}{raw / enc / 1e6:12.0f}{raw / dec / 1e6:12.0f}{raw / size:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
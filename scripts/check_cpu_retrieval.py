@@ -0,0 +1,113 @@
+"""
+Check the CPU retrieval path without the ZED SDK or a GPU.
+
+Runs CpuRetriever against a stand-in SDK (Mat, VIEW, MEASURE) and a
+synthetic camera that fills the Mats with known BGRA images and float
+measures, then checks shapes, dtypes, values, the alpha/padding drop,
+copy semantics and the two-Mat view lifetime. Exits non-zero on the first
+failed check.
+"""
+import sys
+import types
+
+import numpy as np
+
+from zed_toolbox.retrieval import STREAM_SOURCES, CpuRetriever, make_retriever
+
+
+H, W = 48, 64
+
+
+class FakeMat:
+    """Like sl.Mat: get_data() returns a view of the Mat's own buffer, which
+    every retrieve into this Mat overwrites in place."""
+
+    def __init__(self):
+        self.data = None
+
+
+    def get_data(self):
+        return self.data
+
+
+    def _fill(self, shape, dtype):
+        if self.data is None or self.data.shape != shape or self.data.dtype != dtype:
+            self.data = np.empty(shape, dtype=dtype)
+        return self.data
+
+
+FakeSdk = types.SimpleNamespace(
+    Mat=FakeMat,
+    VIEW=types.SimpleNamespace(LEFT="LEFT", RIGHT="RIGHT"),
+    MEASURE=types.SimpleNamespace(DEPTH="DEPTH", CONFIDENCE="CONFIDENCE", XYZ="XYZ", NORMALS="NORMALS"),
+)
+
+
+class FakeCamera:
+    """Fills Mats like the SDK, in place: BGRA uint8 images, float32
+    measures (XYZ and normals padded to 4 channels). Values encode
+    (source, grab)."""
+
+    def __init__(self):
+        self.grab = 0
+
+
+    def retrieve_image(self, mat, view):
+        data = mat._fill((H, W, 4), np.uint8)
+        data[...] = (self.grab * 2 + (view == "RIGHT")) % 256
+        data[..., 3] = 255
+
+
+    def retrieve_measure(self, mat, measure):
+        if measure in ("XYZ", "NORMALS"):
+            data = mat._fill((H, W, 4), np.float32)
+            data[...] = self.grab
+            data[..., 3] = np.nan
+        else:
+            data = mat._fill((H, W), np.float32)
+            data[...] = self.grab + 0.5
+
+
+def check(ok, what):
+    print(f"{'ok  ' if ok else 'FAIL'} {what}")
+    if not ok:
+        sys.exit(1)
+
+
+def main():
+    check("pyzed" not in sys.modules, "retrieval imports without pyzed")
+    streams = list(STREAM_SOURCES)
+    camera = FakeCamera()
+    retriever = make_retriever("cpu", streams, sdk=FakeSdk)
+    check(isinstance(retriever, CpuRetriever) and retriever.memory == "cpu", "make_retriever('cpu') -> CpuRetriever")
+
+    camera.grab = 3
+    frames = retriever.retrieve(camera)
+    check(sorted(frames) == sorted(streams), "every stream retrieved")
+    check(frames["left"].shape == (H, W, 3) and frames["left"].dtype == np.uint8, "images drop alpha")
+    check((frames["left"] == 6).all() and (frames["right"] == 7).all(), "left/right come from their views")
+    check(frames["point_cloud"].shape == (H, W, 3) and not np.isnan(frames["point_cloud"]).any(),
+          "point cloud drops padding")
+    check(frames["depth"].shape == (H, W) and (frames["depth"] == 3.5).all(), "measures copied as-is")
+    check(all(arr.flags.c_contiguous for arr in frames.values()), "frames are contiguous")
+
+    camera.grab = 4
+    again = retriever.retrieve(camera, ["left"])
+    check(list(again) == ["left"] and (frames["left"] == 6).all(), "copies survive later grabs")
+
+    views = CpuRetriever(["depth"], sdk=FakeSdk)
+    camera.grab = 10
+    view = views.retrieve(camera, copy=False)["depth"]
+    kept = views.materialize(view)
+    camera.grab = 11
+    views.retrieve(camera, copy=False)
+    check((view == 10.5).all(), "copy=False view valid after one more retrieve")
+    camera.grab = 12
+    views.retrieve(camera, copy=False)
+    check((view == 12.5).all(), "copy=False view reused by the retrieve after that (two Mats)")
+    check(kept is not view and (kept == 10.5).all(), "materialize() copies a view")
+    check("pyzed" not in sys.modules, "no SDK imported")
+
+
+if __name__ == "__main__":
+    main()
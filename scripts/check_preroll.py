@@ -0,0 +1,64 @@
+"""
+Check PrerollBuffer sampling without a camera.
+
+Pushes synthetic frames at camera rate (with repeated seqs, as a consumer
+loop faster than the camera produces) and checks that the ring keeps one
+frame per recorder period: buffered seqs are spaced camera_fps / fps
+apart, cover `seconds` of camera time, and no seq repeats. Runs with and
+without an encoder pool (paced at camera rate, so the pool run takes
+3 * seconds). Exits non-zero on the first failed check.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from zed_toolbox.preroll import PrerollBuffer
+
+
+def check(ok, what):
+    print(f"{'ok  ' if ok else 'FAIL'} {what}")
+    if not ok:
+        sys.exit(1)
+
+
+def run(seconds, fps, camera_fps, codec, threads):
+    buf = PrerollBuffer(seconds, fps, codec=codec, threads=threads)
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    period_ns = int(1e9 / camera_fps)
+    for seq in range(1, int(3 * seconds * camera_fps) + 1):
+        meta = {"seq": seq, "timestamp_ns": seq * period_ns}
+        buf.push({"left": frame}, meta)
+        buf.push({"left": frame}, meta)         # same grab read twice
+        if threads:
+            time.sleep(1 / camera_fps)          # pace like a camera, so the pool keeps up
+    dropped = buf.dropped
+    seqs = [meta["seq"] for meta, _ in buf.drain()]
+    buf.close()
+
+    label = f"{codec}/{threads} thread(s)"
+    step = camera_fps // fps
+    check(dropped == 0, f"{label}: no sample dropped by the encoder pool")
+    check(len(seqs) == buf.capacity, f"{label}: ring holds {buf.capacity} frames (got {len(seqs)})")
+    check(len(set(seqs)) == len(seqs), f"{label}: no seq buffered twice")
+    check(all(b - a == step for a, b in zip(seqs, seqs[1:])),
+          f"{label}: buffered seqs {step} grabs apart ({seqs[:4]}...)")
+    span = (seqs[-1] - seqs[0] + step) / camera_fps
+    check(abs(span - seconds) < 1e-6, f"{label}: ring covers {seconds}s of camera time (got {span:.2f}s)")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--seconds", type=float, default=1.0)
+    p.add_argument("--fps", type=int, default=10)
+    p.add_argument("--camera-fps", type=int, default=30)
+    args = p.parse_args()
+    if args.camera_fps % args.fps:
+        p.error("--camera-fps must be a multiple of --fps")
+    run(args.seconds, args.fps, args.camera_fps, "raw", 0)
+    run(args.seconds, args.fps, args.camera_fps, "jpeg", 2)
+
+
+if __name__ == "__main__":
+    main()
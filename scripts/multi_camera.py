@@ -2,9 +2,10 @@
 Two ZED cameras (main + side) with synchronized start/stop recording.
 
 Press 's' to start recording on all cameras, 'e' to stop, ESC to quit.
-"""
-import time
 
+Event-driven: the loop blocks on the system's event bus and wakes up only
+for a new frame, a key press or a camera health change.
+"""
 from zed_toolbox import (
     CameraSystem, CameraConfig, ZedConfig, ViewerConfig, RecorderConfig,
     KeyListener,
@@ -37,16 +38,20 @@ def main():
     system.launch()
 
     try:
-        with KeyListener() as keys:
-            while system.is_alive:
-                system.get_observations()
-                if keys.consume_pressed("s"):
+        with system.events.queue(["frame", "key", "health"]) as events, KeyListener(events=system.events):
+            for ev in events:
+                if ev.kind == "frame":
+                    system.cameras[ev.source].get_observations()
+                elif ev.kind == "health":
+                    print(f"camera {ev.source}: {ev.data['previous']} -> {ev.data['state']}")
+                elif ev.data["key"] == "s":
                     system.start_recording()
-                if keys.consume_pressed("e"):
+                elif ev.data["key"] == "e":
                     system.stop_recording()
-                if keys.consume_pressed("esc"):
+                elif ev.data["key"] == "esc":
+                    break
+                if not system.is_alive:
                     break
-                time.sleep(0.01)
 
     finally:
         system.shutdown()
@@ -1,16 +1,15 @@
 """
 Stream directly from a ZED camera (no Camera/Viewer/Recorder).
 
-Saves N frames per enabled stream to disk and prints intrinsics + baseline.
-SSH-friendly. Edit `config` to switch between modes (e.g. add "depth").
+Captures a burst of N distinct frames per enabled stream, saves them to disk
+in the background (PNG images on an EncoderPool, float streams as .npy) and
+prints intrinsics + baseline. SSH-friendly. Edit `config` to switch between
+modes (e.g. add "depth").
 """
-import time
 from pathlib import Path
 
-import cv2
-import numpy as np
-
 from zed_toolbox import ZedCamera
+from zed_toolbox.burst import capture_burst
 from zed_toolbox.config import ZedConfig
 
 
@@ -27,8 +26,6 @@ def main():
     n_frames = 5
     # ========================
 
-    out_dir.mkdir(parents=True, exist_ok=True)
-
     camera = ZedCamera(serial, config)
     try:
         camera.launch()
@@ -37,33 +34,13 @@ def main():
         print(f"\nK (left):\n{intr['matrix']}")
         print(f"baseline: {intr['baseline']:.6f} m")
 
-        # Wait up to 5s for first frame
-        for _ in range(100):
-            if camera.get_current_state():
-                break
-            time.sleep(0.05)
-        else:
+        burst = capture_burst(camera, n_frames, timeout=5.0, serial=serial)
+        if not burst.count:
             raise RuntimeError("No frames received within 5s")
+        paths = burst.save(out_dir, codec="png").result()
 
-        for i in range(n_frames):
-            state = camera.get_current_state()
-            if not state:
-                time.sleep(0.05)
-                continue
-            for name, img in state.items():
-                if name == "depth":
-                    clipped = np.clip(img, 0.01, 3.0)
-                    norm = cv2.normalize(clipped, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
-                    norm[np.isnan(img)] = 0
-                    colormap = cv2.applyColorMap(norm, cv2.COLORMAP_JET)
-                    cv2.imwrite(str(out_dir / f"{i:03d}_depth_colormap.png"), colormap)
-                    np.savez_compressed(out_dir / f"{i:03d}_depth.npz", depth=img)  # raw float meters
-                else:
-                    cv2.imwrite(str(out_dir / f"{i:03d}_{name}.png"), img)
-            time.sleep(0.1)
-
-        print(f"\nSaved {n_frames} frames/stream to {out_dir.resolve()}")
-        print(f"Streams captured: {list(state.keys())}")
+        print(f"\nSaved {burst.count} frames/stream ({len(paths)} files) to {out_dir.resolve()}")
+        print(f"Streams captured: {list(burst.streams)}")
 
     finally:
         camera.shutdown()
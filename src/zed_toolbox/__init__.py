@@ -1,12 +1,50 @@
-from .zed import ZedCamera
-from .camera import Camera
-from .system import CameraSystem
-from .recorder import Recorder
-from .viewer import Viewer
-from .utils import KeyListener, draw_overlays, save_calibration_file
 from .config import (
     ZedConfig,
     ViewerConfig,
     RecorderConfig,
     CameraConfig,
 )
+from .config_loader import load_camera_configs, load_system_config
+
+# Everything below imports the ZED SDK (or OpenCV), so it is loaded on first
+# access: `import zed_toolbox` and the config tools stay usable without them.
+_LAZY = {
+    "ZedCamera": ".zed",
+    "Camera": ".camera",
+    "CameraSystem": ".system",
+    "ProcessCamera": ".worker",
+    "ZedWorker": ".worker",
+    "Recorder": ".recorder",
+    "Viewer": ".viewer",
+    "KeyListener": ".utils",
+    "draw_overlays": ".utils",
+    "save_calibration_file": ".utils",
+}
+
+__all__ = [
+    "ZedConfig",
+    "ViewerConfig",
+    "RecorderConfig",
+    "CameraConfig",
+    "load_camera_configs",
+    "load_system_config",
+    *_LAZY,
+]
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+def main(argv=None):
+    from .cli import main as cli_main
+    return cli_main(argv)
@@ -0,0 +1,258 @@
+"""
+Snapshot bursts: N distinct frames from a camera, as fast as it delivers
+them, saved in the background.
+
+    burst = cam.snapshot(50, streams=["left", "right"], save_dir="calib/001")
+    burst.streams["left"]          # (50, H, W, 3) uint8, one array per stream
+    burst.seq, burst.timestamp_ns  # (50,) per frame
+    burst.saved.result()           # wait for the files
+
+capture_burst() blocks on the camera's frame-ready signal
+(wait_for_frame) instead of sleeping, and keeps a frame only if every
+requested stream was retrieved since the previous kept frame (by
+meta["stream_seq"]), so a rate-limited stream never repeats in a burst.
+Each frame is copied into preallocated (n, *shape) arrays; pass the
+previous Burst as `out` to reuse its buffers for the next burst.
+
+BurstSaver encodes and writes bursts on its own thread and returns a
+Future per burst. The capture loop never waits for the disk. Per camera
+and burst:
+
+    cam_<last3>_<i>_<stream>.png|.jpg   uint8 streams (codec "png"/"jpeg",
+                                        encoded on an EncoderPool)
+    cam_<last3>_<stream>.npy            float streams, or every stream with
+                                        codec "npy" (the whole stacked array)
+    cam_<last3>_burst.json              serial, seq, timestamp_ns per frame
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .encoding import EncoderPool
+from .retrieval import to_host
+
+
+BURST_CODECS = {"png", "jpeg", "npy"}
+
+
+class Burst:
+    """
+    Frames of one burst in preallocated arrays. Only the first `count`
+    entries are valid (count < capacity when the capture timed out).
+
+    streams: {stream: (capacity, *shape) array}
+    seq, timestamp_ns: (capacity,) int64
+    sensors: metadata.SensorRow per frame (None without ZedConfig.metadata)
+    skipped: grabs passed over because a stream had not been retrieved again
+    saved: Future of the save started with save_dir / save(), else None
+    """
+
+    def __init__(self, serial, capacity):
+        self.serial = serial
+        self.capacity = int(capacity)
+        self.streams = {}
+        self._spare = {}            # buffers of the previous capture, reused by _store()
+        self.seq = np.full(self.capacity, -1, dtype=np.int64)
+        self.timestamp_ns = np.full(self.capacity, -1, dtype=np.int64)
+        self.sensors = [None] * self.capacity
+        self.count = 0
+        self.skipped = 0
+        self.saved = None
+
+
+    def __len__(self):
+        return self.count
+
+
+    def frame(self, i):
+        """{stream: array} of frame i (views into the burst arrays)."""
+        if not -self.count <= i < self.count:
+            raise IndexError(f"frame {i} out of range for a burst of {self.count}")
+        return {name: arr[i] for name, arr in self.streams.items()}
+
+
+    def _reset(self, serial):
+        if self.saved is not None and not self.saved.done():
+            raise ValueError("burst buffers are still being saved; wait for burst.saved first")
+        self.serial = serial
+        self._spare, self.streams = self.streams, {}
+        self.seq.fill(-1)
+        self.timestamp_ns.fill(-1)
+        self.sensors = [None] * self.capacity
+        self.count = 0
+        self.skipped = 0
+        self.saved = None
+
+
+    def _store(self, frames, meta):
+        i = self.count
+        for name, arr in frames.items():
+            buf = self.streams.get(name)
+            if buf is None:
+                buf = self._spare.pop(name, None)
+                if buf is None or buf.shape[1:] != arr.shape or buf.dtype != arr.dtype:
+                    buf = np.empty((self.capacity, *arr.shape), dtype=arr.dtype)
+                self.streams[name] = buf
+            buf[i] = arr
+        self.seq[i] = meta["seq"]
+        self.timestamp_ns[i] = -1 if meta.get("timestamp_ns") is None else meta["timestamp_ns"]
+        self.sensors[i] = meta.get("sensors")
+        self.count += 1
+
+
+    def save(self, out_dir, codec="png", quality=90, saver=None):
+        """Save in the background (see BurstSaver.save); returns the Future,
+        also kept as self.saved."""
+        self.saved = (saver or BurstSaver.shared()).save(self, out_dir, codec, quality)
+        return self.saved
+
+
+def capture_burst(source, n, streams=None, timeout=5.0, out=None, serial=None):
+    """
+    Capture n distinct frames from source (a ZedCamera or ZedWorker)
+    newer than the one current at the call. Returns a Burst; stops early
+    (burst.count < n) if no usable frame arrives for `timeout` seconds.
+
+    streams: streams to keep (default: every stream of the first frame).
+    out: a previous Burst of the same capacity to reuse (its save must be
+        done).
+    """
+    if n < 1:
+        raise ValueError("burst size must be >= 1")
+    if out is None:
+        burst = Burst(serial, n)
+    elif out.capacity != n:
+        raise ValueError(f"out holds {out.capacity} frames, burst needs {n}")
+    else:
+        burst = out
+        burst._reset(serial)
+    names = None if streams is None else list(streams)
+    _, meta = source.get_current_state(return_meta=True, streams=())
+    after_seq = meta["seq"]
+    last = dict(meta.get("stream_seq") or {})     # stream -> stream_seq of the last kept frame
+    while burst.count < n:
+        frame = source.wait_for_frame(after_seq, timeout=timeout, streams=names)
+        if frame is None:
+            break
+        frames, meta = frame
+        after_seq = meta["seq"]
+        if names is None:
+            names = list(frames)
+        if any(frames.get(name) is None for name in names):
+            burst.skipped += 1
+            continue
+        stream_seq = meta.get("stream_seq") or {}
+        fresh = {name: stream_seq.get(name, after_seq) for name in names}
+        if any(seq <= last.get(name, -1) for name, seq in fresh.items()):
+            burst.skipped += 1
+            continue
+        last = fresh
+        burst._store({name: to_host(frames[name]) for name in names}, meta)
+    return burst
+
+
+def capture_bursts(sources, n, streams=None, timeout=5.0):
+    """capture_burst() on every {serial: source} at once, one thread each,
+    so the bursts cover the same moment. Returns {serial: Burst}."""
+    bursts = {}
+    barrier = threading.Barrier(len(sources))
+
+    def run(serial, source):
+        barrier.wait()
+        bursts[serial] = capture_burst(source, n, streams, timeout, serial=serial)
+
+    threads = [threading.Thread(target=run, args=item, daemon=True, name=f"burst-{str(item[0])[-3:]}")
+               for item in sources.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {serial: bursts[serial] for serial in sources if serial in bursts}
+
+
+class BurstSaver:
+    """
+    Writes bursts on one background thread, encoding uint8 streams on an
+    EncoderPool. save() returns a concurrent.futures.Future resolving to
+    the list of written paths (or raising the first error). Bursts are
+    saved in submission order. BurstSaver.shared() is a process-wide
+    instance, started on first use.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, threads=None):
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="burst-save")
+        self._threads = threads
+        self._pools = {}        # (codec, quality) -> EncoderPool
+        self.saved = 0
+        self.last_save_ms = 0.0
+
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+
+    def save(self, burst, out_dir, codec="png", quality=90):
+        if codec not in BURST_CODECS:
+            raise ValueError(f"Unknown burst codec {codec!r}. Allowed: {sorted(BURST_CODECS)}")
+        return self._writer.submit(self._save, burst, Path(out_dir), codec, quality)
+
+
+    def _save(self, burst, out_dir, codec, quality):
+        t0 = time.perf_counter()
+        out_dir.mkdir(parents=True, exist_ok=True)
+        prefix = f"cam_{str(burst.serial)[-3:]}"
+        n = burst.count
+        paths = []
+        images = [] if codec == "npy" else [name for name, arr in burst.streams.items() if arr.dtype == np.uint8]
+        for name, arr in burst.streams.items():
+            if name not in images:
+                path = out_dir / f"{prefix}_{name}.npy"
+                np.save(path, arr[:n])
+                paths.append(path)
+
+        if images:
+            pool = self._pool(codec, quality)
+            ext = ".jpg" if codec == "jpeg" else ".png"
+            # Only encoding runs on the pool; files are written here, so a
+            # failed write raises out of the Future instead of into a callback.
+            futures = [pool.submit({name: burst.streams[name][i] for name in images}) for i in range(n)]
+            for i, future in enumerate(futures):
+                for name, (_, data) in future.result().items():
+                    path = out_dir / f"{prefix}_{i:03d}_{name}{ext}"
+                    data.tofile(path)
+                    paths.append(path)
+
+        path = out_dir / f"{prefix}_burst.json"
+        with open(path, "w") as f:
+            json.dump({"serial": burst.serial, "frames": n, "skipped": burst.skipped,
+                       "seq": burst.seq[:n].tolist(), "timestamp_ns": burst.timestamp_ns[:n].tolist()}, f)
+        paths.append(path)
+        self.saved += 1
+        self.last_save_ms = (time.perf_counter() - t0) * 1000
+        return paths
+
+
+    def _pool(self, codec, quality):
+        key = (codec, quality)
+        if key not in self._pools:
+            self._pools[key] = EncoderPool(self._threads, codec=codec, quality=quality)
+        return self._pools[key]
+
+
+    def close(self):
+        """Wait for pending saves and stop the threads."""
+        self._writer.shutdown(wait=True)
+        for pool in self._pools.values():
+            pool.close()
+        self._pools = {}
@@ -0,0 +1,206 @@
+"""
+Estimate camera extrinsics from calibration-board views in a recorded session.
+
+Record a short session in which every camera sees a checkerboard or ChArUco
+board at the same time (move it through the shared field of view), then:
+
+    zed-toolbox calibrate recordings/calib --board checkerboard --cols 9 --rows 6 --square 0.025
+
+The board pose is solved in every left frame (lossless left npz when
+recorded, else the mp4) with the intrinsics from the session manifest.
+Views of two cameras within tolerance_ms of each other give one estimate of
+their relative pose; estimates are averaged per camera. The result maps each
+camera's left frame into the reference camera's frame and drops straight
+into CameraConfig.extrinsics. Translations are in the session's
+coordinate_units, so give the square size in those units.
+"""
+import math
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from .geometry import invert_transform
+from .manifest import read_manifest, segment_sources
+
+
+BOARD_TYPES = {"checkerboard", "charuco"}
+
+
+def estimate_extrinsics(session_dir, board, reference=None, every=1, tolerance_ms=20.0,
+                        min_views=3, max_reprojection_px=2.0):
+    """
+    board: {"type": "checkerboard", "cols", "rows", "square"} (cols/rows
+        count inner corners) or {"type": "charuco", "cols", "rows", "square",
+        "marker", "dictionary"} (cols/rows count squares; dictionary is a
+        cv2.aruco name such as "DICT_5X5_100").
+    reference: serial whose frame becomes the system frame (identity
+        extrinsics); default the lowest serial.
+    every: use every n-th recorded frame.
+
+    Returns {serial: {"extrinsics": 4x4 list | None, "views": int,
+    "rms_translation": float | None, "rms_rotation_deg": float | None}}.
+    extrinsics is None for a camera with fewer than min_views shared views.
+    """
+    detector = BoardDetector(board)
+    session_dir = Path(session_dir)
+    poses = {}
+    for path in sorted(session_dir.glob("cam_*_manifest.jsonl")):
+        serial, views = _board_poses(path, detector, every, max_reprojection_px)
+        poses[serial] = views
+        print(f"[Calibrate {str(serial)[-3:]}] board found in {len(views)} frame(s)")
+    if not poses:
+        raise ValueError(f"{session_dir}: no camera manifests found")
+
+    reference = min(poses) if reference is None else int(reference)
+    if reference not in poses:
+        raise ValueError(f"reference camera {reference} not in session; found {sorted(poses)}")
+    ref_views = poses[reference]
+    ref_ts = np.array(sorted(ref_views), dtype=np.int64)
+    tolerance_ns = int(tolerance_ms * 1e6)
+
+    results = {}
+    for serial, views in poses.items():
+        if serial == reference:
+            results[serial] = {"extrinsics": np.eye(4).tolist(), "views": len(views),
+                               "rms_translation": 0.0, "rms_rotation_deg": 0.0}
+            continue
+        pairs = []
+        for ts, T_cam_board in views.items() if len(ref_ts) else ():
+            i = np.searchsorted(ref_ts, ts)
+            near = ref_ts[max(i - 1, 0):i + 1]
+            nearest = int(near[np.argmin(np.abs(near - ts))])
+            if abs(nearest - ts) <= tolerance_ns:
+                pairs.append(ref_views[nearest] @ invert_transform(T_cam_board))
+        if len(pairs) < min_views:
+            print(f"[Calibrate {str(serial)[-3:]}] only {len(pairs)} view(s) shared with "
+                  f"{str(reference)[-3:]}; need {min_views}")
+            results[serial] = {"extrinsics": None, "views": len(pairs),
+                               "rms_translation": None, "rms_rotation_deg": None}
+            continue
+        T, rms_t, rms_r = average_transforms(pairs)
+        results[serial] = {"extrinsics": T.tolist(), "views": len(pairs),
+                           "rms_translation": rms_t, "rms_rotation_deg": rms_r}
+    return results
+
+
+def average_transforms(transforms):
+    """Mean of rigid transforms (rotation projected back onto SO(3)).
+    Returns (T, rms translation deviation, rms rotation deviation in degrees)."""
+    Rs = np.stack([T[:3, :3] for T in transforms])
+    ts = np.stack([T[:3, 3] for T in transforms])
+    U, _, Vt = np.linalg.svd(Rs.sum(axis=0))
+    R = U @ np.diag([1, 1, np.sign(np.linalg.det(U @ Vt))]) @ Vt
+    t = ts.mean(axis=0)
+    T = np.eye(4)
+    T[:3, :3], T[:3, 3] = R, t
+
+    rms_t = float(np.sqrt(np.mean(np.sum((ts - t) ** 2, axis=1))))
+    cos = np.clip((np.einsum("nij,ij->n", Rs, R) - 1) / 2, -1.0, 1.0)
+    rms_r = float(np.degrees(np.sqrt(np.mean(np.arccos(cos) ** 2))))
+    return T, rms_t, rms_r
+
+
+class BoardDetector:
+    """Finds a calibration board in an image and solves its pose."""
+
+    def __init__(self, board):
+        board = dict(board)
+        kind = board.pop("type", "checkerboard")
+        if kind not in BOARD_TYPES:
+            raise ValueError(f"Unknown board type {kind!r}. Allowed: {sorted(BOARD_TYPES)}")
+        self.kind = kind
+        self.cols, self.rows = int(board["cols"]), int(board["rows"])
+        self.square = float(board["square"])
+        if kind == "checkerboard":
+            grid = np.mgrid[0:self.cols, 0:self.rows].T.reshape(-1, 2)
+            self._object = np.hstack([grid * self.square, np.zeros((len(grid), 1))]).astype(np.float32)
+        else:
+            if not hasattr(cv2, "aruco") or not hasattr(cv2.aruco, "CharucoDetector"):
+                raise RuntimeError(
+                    "ChArUco boards require OpenCV >= 4.7 with the aruco module "
+                    "(pip install opencv-contrib-python)"
+                )
+            dictionary = cv2.aruco.getPredefinedDictionary(
+                getattr(cv2.aruco, board.get("dictionary", "DICT_5X5_100"))
+            )
+            self._board = cv2.aruco.CharucoBoard((self.cols, self.rows), self.square,
+                                                 float(board["marker"]), dictionary)
+            self._detector = cv2.aruco.CharucoDetector(self._board)
+
+
+    def pose(self, image, K, max_reprojection_px=2.0):
+        """4x4 board-to-camera transform, or None if the board isn't found
+        (or fits worse than max_reprojection_px RMS)."""
+        gray = image if image.ndim == 2 else cv2.cvtColor(image[..., :3], cv2.COLOR_BGR2GRAY)
+        if self.kind == "checkerboard":
+            found, corners = cv2.findChessboardCorners(
+                gray, (self.cols, self.rows),
+                cv2.CALIB_CB_ADAPTIVE_THRESH | cv2.CALIB_CB_NORMALIZE_IMAGE | cv2.CALIB_CB_FAST_CHECK,
+            )
+            if not found:
+                return None
+            corners = cv2.cornerSubPix(
+                gray, corners, (5, 5), (-1, -1),
+                (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 1e-3),
+            )
+            obj = self._object
+        else:
+            corners, ids, _, _ = self._detector.detectBoard(gray)
+            if ids is None or len(ids) < 6:
+                return None
+            obj = self._board.getChessboardCorners()[ids.ravel()].astype(np.float32)
+
+        K = np.asarray(K, dtype=np.float64)
+        ok, rvec, tvec = cv2.solvePnP(obj, corners, K, None)
+        if not ok:
+            return None
+        projected, _ = cv2.projectPoints(obj, rvec, tvec, K, None)
+        rms = math.sqrt(float(np.mean(np.sum((projected - corners.reshape(-1, 1, 2)) ** 2, axis=-1))))
+        if rms > max_reprojection_px:
+            return None
+        T = np.eye(4)
+        T[:3, :3] = cv2.Rodrigues(rvec)[0]
+        T[:3, 3] = tvec.ravel()
+        return T
+
+
+def _board_poses(manifest_path, detector, every, max_reprojection_px):
+    """(serial, {timestamp_ns: board-to-camera 4x4}) for one camera."""
+    session = manifest_path.parent
+    cam = manifest_path.name.split("_")[1]
+    events, _ = read_manifest(manifest_path)
+    header = next((ev for ev in events if ev.get("event") == "session"), None)
+    if header is None:
+        raise ValueError(f"{manifest_path}: no session event")
+    K = (header.get("calibration") or {}).get("K")
+    if K is None:
+        raise ValueError(f"{manifest_path}: session has no intrinsics (K) recorded")
+
+    views, sources, segment, index = {}, {}, None, 0
+    try:
+        for ev in events:
+            if ev.get("event") != "frame":
+                continue
+            if ev["segment"] != segment:
+                for src in sources.values():
+                    src.close()
+                segment = ev["segment"]
+                sources = segment_sources(session, cam, segment)
+            frame = {}
+            for output in ev["outputs"]:
+                img = next(sources[output], None) if output in sources else None
+                if img is not None:
+                    frame[output] = img
+            index += 1
+            image = frame.get("left_npz", frame.get("left_mp4"))
+            ts = ev.get("timestamp_ns")
+            if image is None or ts is None or (index - 1) % every:
+                continue
+            T = detector.pose(image, K, max_reprojection_px)
+            if T is not None:
+                views[int(ts)] = T
+    finally:
+        for src in sources.values():
+            src.close()
+    return int(header["serial"]), views
@@ -1,7 +1,11 @@
+from .burst import capture_burst
 from .config import CameraConfig
 from .zed import ZedCamera
 from .viewer import Viewer
 from .recorder import Recorder
+from .overlays import OverlayRenderer
+from .retrieval import to_host
+from .scheduler import source_stream
 
 
 class Camera:
@@ -20,10 +24,16 @@ class Camera:
         while cam.is_alive:
             streams = cam.get_observations(overlays=...)
         cam.shutdown()
+
+    events: optional events.EventBus shared with the ZedCamera and Recorder,
+        which publish "frame", "health" and "recording" events on it.
     """
 
-    def __init__(self, serial, config=None):
+    record_in_worker = False    # ProcessCamera: the Recorder runs next to the capture loop
+
+    def __init__(self, serial, config=None, events=None):
         self.serial = serial
+        self.events = events
 
         if config is None:
             config = CameraConfig()
@@ -31,56 +41,171 @@ class Camera:
             config = CameraConfig(**config)
         self.cfg = config
 
-        self.zed_camera = ZedCamera(serial, self.cfg.zed)
-        self.viewer = Viewer(serial, self.cfg.viewer) if self.cfg.viewer is not None else None
-        self.recorder = Recorder(serial, self.cfg.recorder) if self.cfg.recorder is not None else None
+        self.zed_camera = self._make_source()
+        self.overlays = OverlayRenderer()
+        self.viewer = (
+            Viewer(serial, self.cfg.viewer, overlay_renderer=self.overlays)
+            if self.cfg.viewer is not None else None
+        )
+        self.recorder = (
+            Recorder(serial, self.cfg.recorder, overlay_renderer=self.overlays, events=events)
+            if self.cfg.recorder is not None and not self.record_in_worker else None
+        )
 
         self._is_alive = False
+        self._viewer_sub = None
+        self._recorder_sub = None
+        self._sink_seq = None
+        self._viewer_change_seq = None
+
+
+    def _make_source(self):
+        """The frame source behind self.zed_camera (ProcessCamera: a ZedWorker)."""
+        return ZedCamera(self.serial, self.cfg.zed, events=self.events)
 
 
     def launch(self):
         self.zed_camera.launch()
+        if self.viewer is not None:
+            self._viewer_sub = self.zed_camera.subscribe(self._available(self.cfg.viewer.show))
+        if self.recorder is not None and self.cfg.recorder.preroll_seconds > 0:
+            # Pre-roll records while idle, so its streams are always wanted.
+            self._recorder_sub = self.zed_camera.subscribe(self._available(self.cfg.recorder.streams))
         self._is_alive = True
 
 
-    def get_observations(self, overlays=None):
+    def get_observations(self, overlays=None, streams=None):
         """Return the latest stream snapshot from the camera and, as a side
         effect, push it to the viewer and recorder if they're enabled.
 
         Call this once per loop iteration. Returns the streams dict
-        (matching ZedCamera.get_current_state()).
+        (matching ZedCamera.get_current_state()). Each grab is pushed to the
+        sinks once: calls that see the same frame seq again (the loop is
+        faster than the camera) skip them. With ZedConfig.memory ==
+        "gpu" the returned arrays stay on the device; the viewer and recorder
+        get one shared host copy.
+
+        streams: if given, only these streams are read for the caller (the
+        viewer and recorder still get theirs), so with
+        ZedConfig.demand_timeout / copy_on_read unread streams cost nothing.
         """
-        streams = self.zed_camera.get_current_state()
-        if self.viewer is not None:
-            self.viewer.update(streams, overlays=overlays)
+        snapshot, meta = self.zed_camera.get_current_state(
+            return_meta=True, streams=self._read_set(streams))
+        return self._publish(snapshot, meta, overlays, streams)
+
+
+    def wait_for_observations(self, after_seq=0, timeout=None, overlays=None, streams=None):
+        """Event-driven get_observations(): block until the camera has a frame
+        newer than after_seq, push it to the sinks, and return
+        (streams, meta), or None on timeout. Use meta["seq"] as the next
+        after_seq."""
+        frame = self.zed_camera.wait_for_frame(after_seq, timeout=timeout,
+                                               streams=self._read_set(streams))
+        if frame is None:
+            return None
+        snapshot, meta = frame
+        return self._publish(snapshot, meta, overlays, streams), meta
+
+
+    def snapshot(self, n=1, streams=None, timeout=5.0, save_dir=None, codec="png", out=None):
+        """
+        Burst of n distinct frames, captured as fast as the camera delivers
+        them into preallocated arrays (see burst.py). Frames are not pushed
+        to the viewer or recorder.
+
+        save_dir: if given, the burst is encoded (codec "png", "jpeg" or
+            "npy") and written there in the background; burst.saved is the
+            Future.
+        out: a previous Burst to reuse the buffers of.
+        """
+        burst = capture_burst(self.zed_camera, n, streams, timeout, out=out, serial=self.serial)
+        if save_dir is not None:
+            burst.save(save_dir, codec)
+        return burst
+
+
+    def _read_set(self, streams):
+        if streams is None:
+            return None
+        wanted = set(streams)
+        for sub in (self._viewer_sub, self._recorder_sub):
+            if sub is not None:
+                wanted.update(sub.streams)
+        return wanted
+
+
+    def _publish(self, snapshot, meta, overlays, streams):
+        seq, self._sink_seq = self._sink_seq, meta["seq"]
+        if seq != meta["seq"]:
+            self._push(snapshot, meta, overlays)
+        if streams is None:
+            return snapshot
+        return {name: arr for name, arr in snapshot.items() if name in streams}
+
+
+    def _push(self, snapshot, meta, overlays):
+        change_seq = meta.get("change_seq")
+        show = self.viewer is not None and not (
+            self.cfg.viewer.skip_unchanged and not overlays
+            and change_seq is not None and change_seq == self._viewer_change_seq
+        )
+        sink_streams = snapshot
+        if (show or self.recorder is not None) and self.cfg.zed.memory == "gpu":
+            sink_streams = {name: to_host(arr) for name, arr in snapshot.items()}
+        if show and self.viewer.update(sink_streams, overlays=overlays):
+            self._viewer_change_seq = change_seq
         if self.recorder is not None:
-            self.recorder.update(streams, overlays=overlays)
-        return streams
+            self.recorder.update(sink_streams, overlays=overlays, meta=meta)
+
+
+    def set_static_overlays(self, overlays):
+        """Overlays drawn on every frame (e.g. workspace boundaries). Rasterized
+        once and composited, so they cost a masked copy per frame."""
+        self.overlays.set_static(overlays)
+        self._viewer_change_seq = None      # redraw even if the scene is unchanged
 
 
     def start_recording(self):
         if self.recorder is None:
             return
+        self.recorder.start(calibration=self._calibration())
+        if self._recorder_sub is None:
+            self._recorder_sub = self.zed_camera.subscribe(self._available(self.cfg.recorder.streams))
+
+
+    def _available(self, names):
+        """The subset of names this camera produces."""
+        return [name for name in names if source_stream(name) in self.cfg.zed.streams]
+
+
+    def _calibration(self):
         zed_cfg = self.zed_camera.cfg
-        calibration = {
+        return {
             "intrinsics": self.zed_camera.intrinsics,
             "streams": list(zed_cfg.streams),
             "depth_mode": zed_cfg.depth_mode,
             "coordinate_units": zed_cfg.coordinate_units,
             "resolution": zed_cfg.resolution,
             "camera_fps": zed_cfg.fps,
+            "extrinsics": self.cfg.extrinsics,
         }
-        self.recorder.start(calibration=calibration)
 
 
     def stop_recording(self):
         if self.recorder is not None:
             self.recorder.stop()
+        if self._recorder_sub is not None and self.cfg.recorder.preroll_seconds == 0:
+            self._recorder_sub.close()
+            self._recorder_sub = None
 
 
     def shutdown(self):
         if self.recorder is not None:
-            self.recorder.stop()
+            self.recorder.shutdown()
+        for sub in (self._viewer_sub, self._recorder_sub):
+            if sub is not None:
+                sub.close()
+        self._viewer_sub = self._recorder_sub = None
         if self.viewer is not None:
             self.viewer.shutdown()
         self.zed_camera.shutdown()
@@ -89,4 +214,6 @@ class Camera:
 
     @property
     def is_alive(self):
-        return self._is_alive
+        """False after shutdown() or once the camera is given up on
+        (ZedConfig.max_reconnects / worker max_restarts exhausted)."""
+        return self._is_alive and self.zed_camera.health != "failed"
@@ -0,0 +1,108 @@
+"""
+Cheap per-frame change detection, run in the capture thread.
+
+ChangeDetector reduces one image stream to a small grid of block means
+(every `subsample`-th pixel, averaged over block x block samples) and
+compares it with the grid of the last frame that counted as changed. A
+frame is changed when at least min_blocks blocks moved by more than
+threshold gray levels. Averaging hides sensor noise, and comparing against
+the last *changed* frame (not the previous one) lets slow drift add up
+until it counts. Averaging also dilutes small motion: an object covering a
+fraction f of a block moves its mean by only about f times its contrast, so
+motion much smaller than a block (block * subsample pixels) can stay below
+threshold. Lower block or threshold to catch it.
+
+ZedCamera (ZedConfig.change_detection) publishes the result as
+meta["change_seq"]: the seq of the newest grab that changed. Two frames
+with the same change_seq show the same scene, so sinks can skip work:
+Camera skips the viewer redraw (ViewerConfig.skip_unchanged) and the
+Recorder stores repeat markers or nothing (RecorderConfig.unchanged).
+
+Cost: ~0.2 ms per HD720 frame at subsample=8; cost_ms tracks it (EMA).
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class ChangeDetector:
+    """
+    stream: the uint8 image stream watched ("left" or "right").
+    threshold: gray levels (0-255) a block mean must move to count.
+    min_blocks: blocks that must move for the frame to be changed.
+    subsample: pixel stride of the sampled image.
+    block: samples per block side (block * subsample pixels of the frame).
+    """
+
+    def __init__(self, stream="left", threshold=6.0, min_blocks=1, subsample=8, block=8):
+        if stream not in ("left", "right"):
+            raise ValueError(f"change detection watches an image stream ('left' or 'right'), not {stream!r}")
+        if threshold <= 0:
+            raise ValueError("change threshold must be positive")
+        if min_blocks < 1:
+            raise ValueError("change min_blocks must be >= 1")
+        self.stream = stream
+        self.threshold = float(threshold)
+        self.min_blocks = int(min_blocks)
+        self.subsample = max(1, int(subsample))
+        self.block = max(1, int(block))
+        self._reference = None
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.changes = 0
+        self.last_score = 0.0           # largest block change of the last frame, gray levels
+        self.cost_ms = 0.0
+
+
+    def signature(self, image):
+        """Block means (float32 grid) of an image."""
+        s = self.subsample
+        img = image[::s, ::s]
+        if not isinstance(img, np.ndarray):
+            img = img.get()         # device frame: only the subsample crosses to host
+        if img.ndim == 3:
+            img = cv2.cvtColor(np.ascontiguousarray(img[..., :3]), cv2.COLOR_BGR2GRAY)
+        h, w = img.shape[:2]
+        size = (max(1, w // self.block), max(1, h // self.block))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+    def update(self, image):
+        """Whether image differs from the last changed frame. The first
+        frame, and any frame whose size changed, is changed."""
+        t0 = time.perf_counter()
+        sig = self.signature(image)
+        with self._lock:
+            ref = self._reference
+            if ref is None or ref.shape != sig.shape:
+                changed, score = True, float("inf")
+            else:
+                diff = np.abs(sig - ref)
+                score = float(diff.max())
+                changed = int(np.count_nonzero(diff > self.threshold)) >= self.min_blocks
+            if changed:
+                self._reference = sig
+                self.changes += 1
+            self.frames += 1
+            self.last_score = score
+            self.cost_ms = 0.9 * self.cost_ms + 0.1 * (time.perf_counter() - t0) * 1000
+        return changed
+
+
+    def reset(self):
+        """Count the next frame as changed (e.g. after a reconnect)."""
+        with self._lock:
+            self._reference = None
+
+
+    def stats(self):
+        with self._lock:
+            return {
+                "frames": self.frames,
+                "changes": self.changes,
+                "unchanged": self.frames - self.changes,
+                "last_score": self.last_score,
+                "cost_ms": self.cost_ms,
+            }
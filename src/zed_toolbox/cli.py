@@ -0,0 +1,684 @@
+"""
+zed-toolbox command line.
+
+    zed-toolbox list
+    zed-toolbox view 24944966 [--streams left depth]
+    zed-toolbox record 24944966 33261276 --streams left right --duration 60
+    zed-toolbox record --config cells.yaml --profile cell_b --trigger signal
+    zed-toolbox stream 24944966 --frames 5 --out ./recordings/smoke_test
+    zed-toolbox replay recordings/trial [--serial 966] [--info]
+    zed-toolbox bench 24944966 --streams left depth --seconds 10
+    zed-toolbox calibrate recordings/calib --board checkerboard --cols 9 --rows 6 --square 0.025
+    zed-toolbox validate cells.yaml [--profile cell_a | --all]
+    zed-toolbox plan cells.yaml [--profile cell_a] [--budget-mb 8000]
+    zed-toolbox run cells.yaml [--profile cell_a] [--record]
+
+Cameras come either from serials on the command line (plus --streams /
+--fps / recorder flags) or from a config file (--config / --profile).
+`calibrate` estimates camera extrinsics from a recorded session in which
+all cameras see a calibration board, and writes them as a config snippet.
+`validate` only parses and checks configs (no SDK import); `plan` also
+estimates each camera's memory and bandwidth from them. `run` launches
+a CameraSystem from a profile: 's' starts recording, 'e' stops, ESC quits.
+
+`record` is headless and event-driven: one thread per camera blocks on new
+frames (Camera.wait_for_observations) instead of polling. Recording starts
+right away, after --delay, or — with --trigger signal — on SIGUSR1, which
+toggles it. --duration stops after that many seconds of recording. SIGINT /
+SIGTERM stop and exit. Live throughput and drop stats print every
+--stats-every seconds.
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+
+from .config import CameraConfig, RecorderConfig, ViewerConfig, VALID_RECORD_STREAMS, ZedConfig
+from .config_loader import ConfigFileError, concrete_profiles, load_system_config, read_config_file
+
+
+# ---------------------------------------------------------------- helpers
+
+def _add_camera_args(p, recorder=False, single=False):
+    if single:
+        p.add_argument("serial", type=int, help="camera serial number")
+    else:
+        p.add_argument("serials", nargs="*", type=int, help="camera serial numbers")
+        p.add_argument("--config", default=None, help="config file (instead of serials)")
+        p.add_argument("--profile", default=None)
+    p.add_argument("--streams", nargs="+", default=["left"])
+    p.add_argument("--camera-fps", type=int, default=30)
+    p.add_argument("--resolution", default="HD720")
+    if recorder:
+        p.add_argument("--fps", type=int, default=10, help="recording rate")
+        p.add_argument("--save-dir", default="./recordings")
+        p.add_argument("--save-name", default=None)
+        p.add_argument("--sampling", default="adaptive", choices=["wallclock", "adaptive"])
+        p.add_argument("--preroll", type=float, default=0.0, help="pre-roll seconds")
+
+
+def _system_from_args(args, viewer=False, recorder=False):
+    """CameraSystem from --config/--profile or serials + flags."""
+    from .system import CameraSystem
+
+    if args.config:
+        spec = load_system_config(args.config, args.profile)
+        configs, options = spec.configs, spec.options
+        for cfg in configs.values():
+            if not viewer:
+                cfg.viewer = None
+            if recorder and cfg.recorder is None:
+                raise ConfigFileError(f"{args.config}: a camera has no recorder config")
+    else:
+        if not args.serials:
+            raise SystemExit("give camera serials or --config")
+        zed = dict(streams=args.streams, fps=args.camera_fps, resolution=args.resolution)
+        configs = {}
+        for serial in args.serials:
+            rec = None
+            if recorder:
+                rec = RecorderConfig(
+                    streams=[s for s in args.streams if s in VALID_RECORD_STREAMS],
+                    save_dir=args.save_dir, save_name=args.save_name, fps=args.fps,
+                    sampling=args.sampling, preroll_seconds=args.preroll,
+                )
+            configs[serial] = CameraConfig(
+                zed=ZedConfig(**zed),
+                viewer=ViewerConfig(show=args.streams) if viewer else None,
+                recorder=rec,
+            )
+        options = {}
+    return CameraSystem(configs, **options)
+
+
+def _install_signals(handlers):
+    previous = {}
+    for sig, fn in handlers.items():
+        previous[sig] = signal.signal(sig, lambda signum, frame, fn=fn: fn())
+    return previous
+
+
+# ---------------------------------------------------------------- list
+
+def cmd_list(args):
+    import pyzed.sl as sl
+
+    devices = sl.Camera.get_device_list()
+    if not devices:
+        print("no ZED cameras found")
+        return 1
+    for dev in devices:
+        print(f"{dev.serial_number}  {dev.camera_model}  {dev.camera_state}")
+    return 0
+
+
+# ---------------------------------------------------------------- view
+
+def cmd_view(args):
+    from .utils import KeyListener
+
+    system = _system_from_args(args, viewer=True)
+    system.launch()
+    seqs = dict.fromkeys(system.cameras, 0)
+    period = 1.0 / max(args.camera_fps, 1)
+    print("ESC to quit.")
+    try:
+        with KeyListener() as keys:
+            while system.is_alive and not keys.consume_pressed("esc"):
+                for serial, cam in system.cameras.items():
+                    hit = cam.wait_for_observations(seqs[serial], timeout=period)
+                    if hit is not None:
+                        seqs[serial] = hit[1]["seq"]
+    finally:
+        system.shutdown()
+    return 0
+
+
+# ---------------------------------------------------------------- record
+
+class _Pump:
+    """Per-camera thread: block on new frames and feed the recorder."""
+
+    def __init__(self, serial, cam):
+        self.serial = serial
+        self.cam = cam
+        self.lock = threading.Lock()        # serializes update() with start/stop
+        self.seq = 0
+        self.missed = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f"record-{str(serial)[-3:]}")
+
+
+    def start(self):
+        self._thread.start()
+
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self.lock:
+                hit = self.cam.wait_for_observations(self.seq, timeout=0.2, streams=())
+            if hit is None:
+                continue
+            seq = hit[1]["seq"]
+            if self.seq and seq > self.seq + 1:
+                self.missed += seq - self.seq - 1
+            self.seq = seq
+
+
+def cmd_record(args):
+    system = _system_from_args(args, recorder=True)
+    pumps = [_Pump(serial, cam) for serial, cam in system.cameras.items()]
+
+    wake = threading.Event()
+    flags = {"toggle": False, "quit": False}
+
+    def request(flag):
+        flags[flag] = True
+        wake.set()
+
+    handlers = {signal.SIGINT: lambda: request("quit"), signal.SIGTERM: lambda: request("quit")}
+    if args.trigger == "signal":
+        handlers[signal.SIGUSR1] = lambda: request("toggle")
+    previous = _install_signals(handlers)
+
+    recording = False
+    started_at = None
+
+    def set_recording(on):
+        nonlocal recording, started_at
+        for pump in pumps:
+            with pump.lock:
+                if on:
+                    pump.cam.start_recording()
+                else:
+                    pump.cam.stop_recording()
+        recording, started_at = on, (time.monotonic() if on else None)
+        print(f"[Record] recording {'started' if on else 'stopped'}")
+
+    system.launch()
+    for pump in pumps:
+        pump.start()
+    t_launch = time.monotonic()
+    start_at = None if args.trigger == "signal" else t_launch + args.delay
+    if args.trigger == "signal":
+        print(f"[Record] waiting for SIGUSR1 (kill -USR1 {os.getpid()}) to start/stop")
+
+    last_stats = time.monotonic()
+    counters = {pump.serial: (pump.seq, 0) for pump in pumps}
+    try:
+        while system.is_alive:
+            now = time.monotonic()
+            if flags["quit"]:
+                break
+            if flags["toggle"]:
+                flags["toggle"] = False
+                set_recording(not recording)
+            if start_at is not None and not recording and now >= start_at:
+                start_at = None
+                set_recording(True)
+            if recording and args.duration and now - started_at >= args.duration:
+                set_recording(False)
+                if args.trigger != "signal":
+                    break
+
+            if now - last_stats >= args.stats_every:
+                _print_stats(pumps, counters, now - last_stats)
+                last_stats = now
+
+            deadlines = [last_stats + args.stats_every]
+            if start_at is not None:
+                deadlines.append(start_at)
+            if recording and args.duration:
+                deadlines.append(started_at + args.duration)
+            wake.wait(max(0.0, min(deadlines) - time.monotonic()))
+            wake.clear()
+    finally:
+        if recording:
+            set_recording(False)
+        for pump in pumps:
+            pump.stop()
+        system.shutdown()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    return 0
+
+
+def _print_stats(pumps, counters, elapsed):
+    for pump in pumps:
+        last3 = str(pump.serial)[-3:]
+        seq0, frames0 = counters[pump.serial]
+        line = f"[Record {last3}] camera {(pump.seq - seq0) / elapsed:5.1f} fps"
+        drops = getattr(pump.cam.zed_camera, "grab_drops", None)
+        if drops is not None:
+            line += f", {drops} dropped"
+        line += f", {pump.missed} unseen"
+        health = pump.cam.zed_camera.get_health()
+        if health["state"] != "ok":
+            line += f", {health['state'].upper()}"
+        if health["gaps"]:
+            line += (f", {health['gaps']} gap(s), longest {health['longest_gap_s']:.1f}s, "
+                     f"{health['reconnects']} reconnect(s)")
+        frames = frames0
+        rec = pump.cam.recorder
+        if rec is not None:
+            stats = rec.stats()
+            frames = stats["frames"]
+            if stats["recording"]:
+                line += (f" | saved {(frames - frames0) / elapsed:5.1f} fps, {frames} total, "
+                         f"{stats['skipped']} skipped")
+                if stats["shed"]:
+                    line += f", shedding {'+'.join(stats['shed'])}"
+                if stats["queued"]:
+                    line += f", {stats['queued']} queued"
+                io = stats.get("io")
+                if io is not None:
+                    line += f" | disk {io['mb_s']:.1f} MB/s, p95 {io['latency_ms']['p95'] or 0:.0f} ms"
+                    if io["queued_mb"]:
+                        line += f", {io['queued_mb']:.0f} MB queued"
+        counters[pump.serial] = (pump.seq, frames)
+        print(line)
+
+
+# ---------------------------------------------------------------- stream
+
+def cmd_stream(args):
+    import numpy as np
+    from .burst import BurstSaver, capture_burst
+    from .encoding import EncoderPool
+    from .zed import ZedCamera
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ext = ".jpg" if args.codec == "jpeg" else ".png"
+
+    def write(encoded, stem):
+        for name, (kind, data) in encoded.items():
+            data.tofile(f"{stem}_{name}{ext}")
+
+    zed = ZedCamera(args.serial, ZedConfig(streams=args.streams, fps=args.camera_fps,
+                                               resolution=args.resolution))
+    pool = EncoderPool(args.threads, codec=args.codec, quality=args.quality)
+    try:
+        zed.launch()
+        intr = zed.get_intrinsics()
+        print(f"K (left):\n{intr['matrix']}")
+        print(f"baseline: {intr['baseline']:.6f}")
+
+        if not args.interval:
+            burst = capture_burst(zed, args.frames, timeout=5.0, serial=args.serial)
+            if not burst.count:
+                raise RuntimeError("no frame within 5s")
+            saver = BurstSaver(args.threads)
+            try:
+                paths = burst.save(out_dir, args.codec, args.quality, saver=saver).result()
+            finally:
+                saver.close()
+            print(f"burst of {burst.count} frame(s) of {sorted(burst.streams)} ({burst.skipped} skipped): "
+                  f"{len(paths)} file(s) in {out_dir.resolve()}")
+            return 0
+
+        seq, saved = 0, 0
+        while saved < args.frames:
+            frame = zed.wait_for_frame(seq, timeout=5.0)
+            if frame is None:
+                raise RuntimeError("no frame within 5s")
+            state, meta = frame
+            seq = meta["seq"]
+            stem = out_dir / f"{saved:03d}"
+            images = {name: img for name, img in state.items() if img.dtype == np.uint8}
+            for name, img in state.items():
+                if name not in images:
+                    np.save(f"{stem}_{name}.npy", img)
+            pool.submit(images, meta=stem, callback=write)
+            saved += 1
+            if args.interval:
+                time.sleep(args.interval)
+        pool.flush()
+        print(f"saved {saved} frame(s) of {sorted(state)} to {out_dir.resolve()} "
+              f"({pool.stats()['encode_ms']:.1f} ms per image on {pool.threads} encoder thread(s))")
+    finally:
+        pool.close()
+        zed.shutdown()
+    return 0
+
+
+# ---------------------------------------------------------------- replay
+
+def cmd_replay(args):
+    from .recovery import recover_manifest
+
+    session = Path(args.session)
+    last3 = str(args.serial)[-3:] if args.serial is not None else "*"
+    manifests = sorted(session.glob(f"cam_{last3}_manifest.jsonl"))
+    if not manifests:
+        print(f"[Replay] no manifests in {session}")
+        return 1
+
+    for path in manifests:
+        report = recover_manifest(path, repair=False)
+        cam = path.name.split("_")[1]
+        state = "clean" if report["ended"] else "interrupted"
+        print(f"[Replay {cam}] {report['frames']} frame(s), {len(report['segments'])} segment(s), {state}")
+        for problem in report["problems"]:
+            print(f"[Replay {cam}]   {problem}")
+        if not args.info:
+            if not _play(path, cam, args.speed):
+                break
+    return 0
+
+
+# Outputs shown side by side during replay (left_mp4 only without left_npz).
+REPLAY_PANELS = ("left_npz", "left_mp4", "right_npz", "depth_mp4")
+
+
+def _play(manifest_path, cam, speed):
+    """Show one camera's recording; returns False if the user quit (ESC)."""
+    import cv2
+    import numpy as np
+    from .manifest import read_manifest, segment_sources
+
+    session = manifest_path.parent
+    events, _ = read_manifest(manifest_path)
+    window = f"replay {cam}"
+    sources, segment = {}, None
+    t_prev, shown_at = None, None
+    try:
+        for ev in events:
+            if ev.get("event") != "frame":
+                continue
+            if ev["segment"] != segment:
+                segment = ev["segment"]
+                sources = segment_sources(session, cam, segment)
+            panels = {}
+            for output in ev["outputs"]:
+                # Every output advances, so shed outputs stay in step.
+                img = next(sources[output], None) if output in sources else None
+                if img is not None and output in REPLAY_PANELS:
+                    panels[output] = img
+            if "left_npz" in panels:
+                panels.pop("left_mp4", None)
+
+            ts = ev.get("timestamp_ns")
+            if t_prev is not None and ts is not None:
+                delay = (ts - t_prev) / 1e9 / speed - (time.monotonic() - shown_at)
+                if delay > 0:
+                    time.sleep(delay)
+            t_prev, shown_at = ts, time.monotonic()
+
+            if panels:
+                imgs = [panels[o] for o in REPLAY_PANELS if o in panels]
+                h = min(img.shape[0] for img in imgs)
+                cv2.imshow(window, np.hstack([img[:h] for img in imgs]))
+            if cv2.waitKey(1) == 27:
+                return False
+    finally:
+        for src in sources.values():
+            src.close()
+        try:
+            cv2.destroyWindow(window)
+        except cv2.error:
+            pass
+    return True
+
+
+# ---------------------------------------------------------------- bench
+
+def cmd_bench(args):
+    import numpy as np
+    from .zed import ZedCamera
+
+    cfg = ZedConfig(streams=args.streams, fps=args.camera_fps, resolution=args.resolution,
+                    memory=args.memory)
+    zed = ZedCamera(args.serial, cfg)
+    try:
+        zed.launch()
+        frame = zed.wait_for_frame(0, timeout=5.0)
+        if frame is None:
+            raise RuntimeError("no frame within 5s")
+        seq0 = seq = frame[1]["seq"]
+        drops0 = zed.grab_drops
+        waits, reads, unseen = [], [], 0
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < args.seconds:
+            t = time.perf_counter()
+            frame = zed.wait_for_frame(seq, timeout=1.0)
+            waits.append(time.perf_counter() - t)
+            if frame is None:
+                continue
+            new_seq = frame[1]["seq"]
+            unseen += new_seq - seq - 1
+            seq = new_seq
+            t = time.perf_counter()
+            zed.get_current_state()
+            reads.append(time.perf_counter() - t)
+        elapsed = time.monotonic() - t0
+    finally:
+        zed.shutdown()
+
+    reads_ms = np.array(reads) * 1000
+    print(f"[Bench] streams {args.streams} @ {args.resolution}/{args.camera_fps} fps, memory={args.memory}")
+    print(f"[Bench] capture      {(seq - seq0) / elapsed:6.1f} fps, {zed.grab_drops - drops0} dropped by camera")
+    health = zed.get_health()
+    if health["gaps"] or health["state"] != "ok":
+        print(f"[Bench] health       {health['state']}, {health['gaps']} gap(s) "
+              f"(longest {health['longest_gap_s'] or 0:.2f}s), {health['reconnects']} reconnect(s)")
+    print(f"[Bench] consumer     saw {len(reads)} frame(s), {unseen} unseen")
+    if len(reads_ms):
+        print(f"[Bench] snapshot     mean {reads_ms.mean():.3f} ms, p95 {np.percentile(reads_ms, 95):.3f} ms")
+    if zed.get_filter_timings():
+        print(f"[Bench] depth filter {json.dumps(zed.get_filter_timings())}")
+    return 0
+
+
+# ---------------------------------------------------------------- calibrate
+
+def cmd_calibrate(args):
+    from .calibration import estimate_extrinsics
+
+    board = {"type": args.board, "cols": args.cols, "rows": args.rows, "square": args.square}
+    if args.board == "charuco":
+        if args.marker is None:
+            print("[Calibrate] --marker is required for charuco boards", file=sys.stderr)
+            return 2
+        board.update(marker=args.marker, dictionary=args.dictionary)
+    try:
+        results = estimate_extrinsics(args.session, board, reference=args.reference, every=args.every,
+                                      tolerance_ms=args.tolerance_ms, min_views=args.min_views)
+    except ValueError as e:
+        print(f"[Calibrate] {e}", file=sys.stderr)
+        return 1
+
+    cameras = {}
+    for serial, result in sorted(results.items()):
+        last3 = str(serial)[-3:]
+        if result["extrinsics"] is None:
+            print(f"[Calibrate {last3}] no estimate ({result['views']} shared view(s))")
+            continue
+        print(f"[Calibrate {last3}] {result['views']} view(s), rms {result['rms_translation']:.4f} / "
+              f"{result['rms_rotation_deg']:.2f} deg")
+        cameras[serial] = {"extrinsics": [[round(v, 6) for v in row] for row in result["extrinsics"]]}
+
+    snippet = {"cameras": cameras}
+    if args.out is None:
+        print(json.dumps(snippet, indent=2))
+    else:
+        out = Path(args.out)
+        with open(out, "w") as f:
+            if out.suffix in (".yaml", ".yml"):
+                try:
+                    import yaml
+                except ImportError as e:
+                    raise RuntimeError("YAML output requires PyYAML (pip install pyyaml)") from e
+                yaml.safe_dump(snippet, f, default_flow_style=None, sort_keys=False)
+            else:
+                json.dump(snippet, f, indent=2)
+        print(f"[Calibrate] wrote {out}")
+    return 0 if len(cameras) == len(results) else 1
+
+
+# ---------------------------------------------------------------- config
+
+def cmd_validate(args):
+    profiles = [args.profile]
+    if args.all:
+        profiles = concrete_profiles(read_config_file(args.config), source=args.config)
+    failed = 0
+    for profile in profiles:
+        try:
+            spec = load_system_config(args.config, profile)
+        except (ConfigFileError, OSError) as e:
+            print(f"[Config] FAIL {e}")
+            failed += 1
+            continue
+        serials = ", ".join(str(s) for s in spec.configs)
+        print(f"[Config] ok   {spec.profile or '<default>'}: {len(spec.configs)} camera(s) ({serials})"
+              + (f", system {spec.options}" if spec.options else ""))
+    return 1 if failed else 0
+
+
+def cmd_plan(args):
+    from .planner import format_plan, plan_system
+
+    spec = load_system_config(args.config, args.profile)
+    budget = args.budget_mb if args.budget_mb is not None else spec.options.get("memory_budget_mb")
+    plan = plan_system(spec.configs, budget)
+    if args.json:
+        print(json.dumps(plan, indent=2, default=str))
+    else:
+        print(f"[Plan] {spec.profile or '<default>'}: {len(spec.configs)} camera(s)")
+        print(format_plan(plan))
+    return 1 if plan["warnings"] else 0
+
+
+def cmd_run(args):
+    from .utils import KeyListener
+
+    spec = load_system_config(args.config, args.profile)
+    system = spec.build()
+    system.launch()
+    if args.record:
+        system.start_recording()
+
+    print("Press 's' to start recording (all cams), 'e' to stop, ESC to quit.")
+    seqs = {serial: 0 for serial in system.cameras}
+    try:
+        with KeyListener() as keys:
+            while system.is_alive:
+                for serial, cam in system.cameras.items():
+                    hit = cam.wait_for_observations(seqs[serial], timeout=0.05)
+                    if hit is not None:
+                        seqs[serial] = hit[1]["seq"]
+                if keys.consume_pressed("s"):
+                    system.start_recording()
+                if keys.consume_pressed("e"):
+                    system.stop_recording()
+                if keys.consume_pressed("esc"):
+                    break
+    finally:
+        system.shutdown()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="zed-toolbox", description="ZED camera toolbox.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list", help="list connected ZED cameras")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("view", help="live view of one or more cameras")
+    _add_camera_args(p)
+    p.set_defaults(func=cmd_view)
+
+    p = sub.add_parser("record", help="headless, event-driven recording")
+    _add_camera_args(p, recorder=True)
+    p.add_argument("--duration", type=float, default=None, help="seconds to record")
+    p.add_argument("--delay", type=float, default=0.0, help="seconds before recording starts")
+    p.add_argument("--trigger", default="now", choices=["now", "signal"],
+                   help="'signal': SIGUSR1 toggles recording")
+    p.add_argument("--stats-every", type=float, default=5.0, help="seconds between stats lines")
+    p.set_defaults(func=cmd_record)
+
+    p = sub.add_parser("stream", help="save a few frames per stream from one camera")
+    _add_camera_args(p, single=True)
+    p.add_argument("--frames", type=int, default=5)
+    p.add_argument("--interval", type=float, default=0.1,
+                   help="seconds between saved frames; 0 captures one burst of distinct frames")
+    p.add_argument("--out", default="./recordings/smoke_test")
+    p.add_argument("--codec", choices=["png", "jpeg"], default="png", help="image format")
+    p.add_argument("--quality", type=int, default=90, help="JPEG quality")
+    p.add_argument("--threads", type=int, default=None, help="encoder threads (default: cores, max 8)")
+    p.set_defaults(func=cmd_stream)
+
+    p = sub.add_parser("replay", help="play back or summarize a recorded session")
+    p.add_argument("session")
+    p.add_argument("--serial", default=None, help="only this camera")
+    p.add_argument("--speed", type=float, default=1.0)
+    p.add_argument("--info", action="store_true", help="summary only, no window")
+    p.set_defaults(func=cmd_replay)
+
+    p = sub.add_parser("bench", help="measure capture throughput and snapshot cost")
+    _add_camera_args(p, single=True)
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("--memory", default="cpu", choices=["cpu", "gpu"])
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("calibrate", help="estimate camera extrinsics from a recorded board session")
+    p.add_argument("session")
+    p.add_argument("--board", choices=["checkerboard", "charuco"], default="checkerboard")
+    p.add_argument("--cols", type=int, required=True, help="inner corners (checkerboard) or squares (charuco)")
+    p.add_argument("--rows", type=int, required=True)
+    p.add_argument("--square", type=float, required=True, help="square size in the session's coordinate units")
+    p.add_argument("--marker", type=float, default=None, help="charuco marker size")
+    p.add_argument("--dictionary", default="DICT_5X5_100", help="charuco cv2.aruco dictionary")
+    p.add_argument("--reference", default=None, help="serial of the reference camera (default: lowest)")
+    p.add_argument("--every", type=int, default=1, help="use every n-th frame")
+    p.add_argument("--tolerance-ms", type=float, default=20.0, help="max timestamp offset of paired views")
+    p.add_argument("--min-views", type=int, default=3)
+    p.add_argument("--out", default=None, help=".json/.yaml config snippet (default: print)")
+    p.set_defaults(func=cmd_calibrate)
+
+    p = sub.add_parser("validate", help="check a config file without touching cameras")
+    p.add_argument("config")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--profile", default=None)
+    group.add_argument("--all", action="store_true",
+                       help="validate every profile except camera-less bases used only by extends")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("plan", help="estimate memory and bandwidth of a config (no SDK import)")
+    p.add_argument("config")
+    p.add_argument("--profile", default=None)
+    p.add_argument("--budget-mb", type=float, default=None, help="memory budget (default: system.memory_budget_mb)")
+    p.add_argument("--json", action="store_true", help="print the plan as JSON")
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("run", help="launch a CameraSystem from a config file")
+    p.add_argument("config")
+    p.add_argument("--profile", default=None)
+    p.add_argument("--record", action="store_true", help="start recording right away")
+    p.set_defaults(func=cmd_run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except ConfigFileError as e:
+        print(f"[Config] {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,25 @@
 from dataclasses import dataclass, field
 
 
-VALID_STREAMS = {"left", "right", "depth"}
-VALID_DISPLAY_STREAMS = {"left", "right", "depth"}
+VALID_STREAMS = {"left", "right", "depth", "confidence", "point_cloud", "normals"}
+DEPTH_STREAMS = {"depth", "confidence", "point_cloud", "normals"}
+VALID_DISPLAY_STREAMS = {"left", "right", "depth", "depth_filtered", "confidence", "normals"}
+VALID_RECORD_STREAMS = {"left", "right", "depth"}
 VALID_RESOLUTIONS = {"HD720", "HD1080", "HD2K", "AUTO"}
 VALID_DEPTH_MODES = {"NONE", "PERFORMANCE", "QUALITY", "ULTRA", "NEURAL_LIGHT", "NEURAL", "NEURAL_PLUS"}
 VALID_UNITS = {"MILLIMETER", "CENTIMETER", "METER", "INCH", "FOOT"}
+VALID_SAMPLING = {"wallclock", "adaptive"}
+VALID_MEMORY = {"cpu", "gpu"}
+VALID_PREROLL_CODECS = {"raw", "jpeg", "png"}
+VALID_STEREO_CODECS = {"npz", "none", "zlib", "lz4", "png"}
+STEREO_LEVEL_RANGES = {"zlib": (0, 9), "lz4": (0, 16), "png": (0, 9)}
+EXPOSURE_CONTROL_KEYS = {
+    "target", "rate_hz", "max_step", "deadband", "clip_limit", "subsample",
+    "min_exposure", "max_exposure", "max_gain", "gain_scale",
+}
+CHANGE_DETECTION_KEYS = {"stream", "threshold", "min_blocks", "subsample", "block"}
+VALID_UNCHANGED = {"save", "skip", "repeat"}
+VALID_DEPTH_FILTERS = {"range", "invalid", "fill_holes", "temporal", "decimate", "median", "bilateral"}
 
 
 @dataclass
@@ -13,16 +27,45 @@ class ZedConfig:
     """
     Config for a ZED camera pipeline.
 
-    streams: subset of {"left", "right", "depth"}.
+    streams: subset of {"left", "right", "depth", "confidence", "point_cloud", "normals"}.
         - "left"  : left RGB image (canonical color view; anchors intrinsics).
         - "right" : right RGB image.
         - "depth" : on-device depth (computed from the stereo pair). Enable
                     this when running ZED standalone, without FFS.
+        - "confidence"  : SDK depth confidence measure, float32 (H, W).
+        - "point_cloud" : XYZ in the left-camera frame, float32 (H, W, 3).
+        - "normals"     : surface normals, float32 (H, W, 3).
+
+    stream_rates: optional {stream: Hz} retrieval rate per stream, e.g.
+        {"depth": 15} with fps=30 retrieves depth on every other grab. Streams
+        without an entry are retrieved on every grab. Between retrievals a
+        stream keeps its last value; meta["stream_seq"] tells how fresh it is.
+
+    demand_timeout: None (default) retrieves every configured stream. Set to
+        N seconds to retrieve a stream only while it is subscribed to
+        (ZedCamera.subscribe) or was read through get_current_state() /
+        wait_for_frame() within the last N seconds.
+    copy_on_read: skip the per-grab copy out of the SDK buffers; a stream is
+        copied the first time a reader asks for that grab's frame, and not
+        at all if nobody does.
+
+    history_frames / history_mb: keep a bounded lookback history of recent
+        frames (see history.FrameHistory), sized in frames per stream or in
+        total megabytes. At most one of the two; None (default) = no history.
+    history_streams: streams kept in the history; defaults to all streams.
+
+    metadata: read per-frame capture metadata in the capture thread
+        (host time, exposure/gain in effect, IMU sample at the image
+        timestamp; see metadata.py). Published as meta["sensors"] and kept
+        in ZedCamera.metadata for the last metadata_frames grabs. A
+        Recorder with save_metadata saves it for every recorded frame.
+    metadata_frames: rows kept in ZedCamera.metadata.
 
     resolution: ZED SDK resolution preset.
 
-    depth_mode: Default "NEURAL" when "depth" is in streams; auto-coerced to
-        "NONE" otherwise. One of
+    depth_mode: Default "NEURAL" when a depth-derived stream ("depth",
+        "confidence", "point_cloud", "normals") is in streams; auto-coerced
+        to "NONE" otherwise. One of
         {"NONE", "PERFORMANCE", "QUALITY", "ULTRA", "NEURAL_LIGHT", "NEURAL", "NEURAL_PLUS"}.
 
     coordinate_units: distance units for depth values.
@@ -30,8 +73,57 @@ class ZedConfig:
     auto_exposure: True -> AEC/AGC enabled; False -> manual exposure + gain.
     exposure: manual exposure value in [0, 100]. Ignored if auto_exposure.
     gain:     manual gain value in [0, 100]. Ignored if auto_exposure.
+    exposure_control: optional dict enabling the toolbox's own exposure loop
+        (exposure.ExposureController) instead of SDK AEC; exposure/gain are
+        its starting point. Keys (all optional): target (mean luma, 0..1,
+        default 0.45), rate_hz (4), max_step (1.5), deadband, clip_limit,
+        subsample, min_exposure, max_exposure, max_gain, gain_scale.
+        {} uses the defaults. Requires "left" in streams; exclusive with
+        auto_exposure.
+    change_detection: optional dict enabling change.ChangeDetector in the
+        capture thread; each frame's meta["change_seq"] is then the seq of
+        the newest grab whose image changed. Keys (all optional): stream
+        ("left"), threshold (gray levels a block must move, 6), min_blocks
+        (1), subsample (8), block (8). {} uses the defaults. Needed by
+        ViewerConfig.skip_unchanged and RecorderConfig.unchanged.
+
+    memory: where retrieved frames live.
+        - "cpu": NumPy arrays in host memory (default).
+        - "gpu": CuPy arrays in device memory, retrieved with sl.MEM.GPU;
+                 hand them to torch/cupy via DLPack without a host copy.
+                 Requires cupy. Viewer/Recorder receive host copies.
+
+    depth_filters: optional list of depth filter stage dicts (see
+        depth_filters.DepthFilterChain), e.g.
+        [{"type": "range", "min": 0.2, "max": 3.0},
+         {"type": "temporal", "alpha": 0.4, "delta": 0.05},
+         {"type": "median", "ksize": 5}].
+        Requires "depth" in streams. The filtered result is published as an
+        extra "depth_filtered" stream next to the raw "depth".
+    depth_filter_threads: 0 runs the chain inline in the capture thread.
+        N > 0 runs it on a pool of N worker threads (1 if the chain has a
+        temporal stage, to keep frame order); a frame arriving while all
+        workers are busy is not filtered.
+
+    stall_timeout: seconds without a good frame (failing or hanging grabs)
+        before the capture thread closes and reopens the camera with the
+        same InitParameters. Failing grabs are retried with exponential
+        backoff until then.
+    max_reconnects: failed reopen attempts in a row before the camera is
+        marked "failed" (Camera.is_alive turns False); 0 never reopens.
+        None (default) keeps trying.
     """
     streams: list[str] = field(default_factory=lambda: ["left", "right"])
+    stream_rates: dict[str, float] | None = None
+    demand_timeout: float | None = None
+    copy_on_read: bool = False
+
+    history_frames: int | None = None
+    history_mb: float | None = None
+    history_streams: list[str] | None = None
+
+    metadata: bool = False
+    metadata_frames: int = 300
 
     fps: int = 30
     resolution: str = "HD720"
@@ -41,6 +133,16 @@ class ZedConfig:
     auto_exposure: bool = False
     exposure: int = 65
     gain: int = 60
+    exposure_control: dict | None = None
+    change_detection: dict | None = None
+
+    memory: str = "cpu"
+
+    depth_filters: list[dict] | None = None
+    depth_filter_threads: int = 0
+
+    stall_timeout: float = 2.0
+    max_reconnects: int | None = None
 
     def __post_init__(self):
         if not self.streams:
@@ -66,6 +168,11 @@ class ZedConfig:
                 f"Unknown coordinate_units {self.coordinate_units!r}. "
                 f"Allowed: {sorted(VALID_UNITS)}"
             )
+        if self.memory not in VALID_MEMORY:
+            raise ValueError(
+                f"Unknown memory {self.memory!r}. "
+                f"Allowed: {sorted(VALID_MEMORY)}"
+            )
         if self.fps <= 0:
             raise ValueError("fps must be positive")
         if not (0 <= self.exposure <= 100):
@@ -73,7 +180,69 @@ class ZedConfig:
         if not (0 <= self.gain <= 100):
             raise ValueError("gain must be in [0, 100]")
 
-        if "depth" not in self.streams:
+        if self.stream_rates:
+            unknown = set(self.stream_rates) - set(self.streams)
+            if unknown:
+                raise ValueError(f"stream_rates for stream(s) not in streams: {sorted(unknown)}")
+            for name, hz in self.stream_rates.items():
+                if hz <= 0:
+                    raise ValueError(f"stream_rates[{name!r}] must be positive")
+        if self.exposure_control is not None:
+            if self.auto_exposure:
+                raise ValueError("exposure_control and auto_exposure are mutually exclusive")
+            if "left" not in self.streams:
+                raise ValueError("exposure_control meters the 'left' stream; add it to streams")
+            unknown = set(self.exposure_control) - EXPOSURE_CONTROL_KEYS
+            if unknown:
+                raise ValueError(
+                    f"Unknown exposure_control key(s): {sorted(unknown)}. "
+                    f"Allowed: {sorted(EXPOSURE_CONTROL_KEYS)}"
+                )
+        if self.change_detection is not None:
+            unknown = set(self.change_detection) - CHANGE_DETECTION_KEYS
+            if unknown:
+                raise ValueError(
+                    f"Unknown change_detection key(s): {sorted(unknown)}. "
+                    f"Allowed: {sorted(CHANGE_DETECTION_KEYS)}"
+                )
+            stream = self.change_detection.get("stream", "left")
+            if stream not in ("left", "right") or stream not in self.streams:
+                raise ValueError(f"change_detection watches an image stream in streams; got {stream!r}")
+        if self.stall_timeout <= 0:
+            raise ValueError("stall_timeout must be positive")
+        if self.max_reconnects is not None and self.max_reconnects < 0:
+            raise ValueError("max_reconnects must be >= 0 or None")
+        if self.demand_timeout is not None and self.demand_timeout <= 0:
+            raise ValueError("demand_timeout must be positive")
+        if self.history_frames is not None and self.history_mb is not None:
+            raise ValueError("set at most one of history_frames / history_mb")
+        if self.history_frames is not None and self.history_frames < 1:
+            raise ValueError("history_frames must be >= 1")
+        if self.history_mb is not None and self.history_mb <= 0:
+            raise ValueError("history_mb must be positive")
+        if self.history_streams is not None:
+            unknown = set(self.history_streams) - set(self.streams)
+            if unknown:
+                raise ValueError(f"history_streams not in streams: {sorted(unknown)}")
+        if self.metadata_frames < 1:
+            raise ValueError("metadata_frames must be >= 1")
+        if (self.history_frames or self.history_mb) and self.memory == "gpu":
+            raise ValueError("history is kept in host memory; not supported with memory='gpu'")
+        if self.depth_filters:
+            if "depth" not in self.streams:
+                raise ValueError("depth_filters requires the 'depth' stream")
+            if self.memory == "gpu":
+                raise ValueError("depth_filters run on host arrays; not supported with memory='gpu'")
+            for spec in self.depth_filters:
+                if spec.get("type") not in VALID_DEPTH_FILTERS:
+                    raise ValueError(
+                        f"Unknown depth filter {spec.get('type')!r}. "
+                        f"Allowed: {sorted(VALID_DEPTH_FILTERS)}"
+                    )
+        if self.depth_filter_threads < 0:
+            raise ValueError("depth_filter_threads must be >= 0")
+
+        if not DEPTH_STREAMS & set(self.streams):
             self.depth_mode = "NONE"
 
 
@@ -82,15 +251,19 @@ class ViewerConfig:
     """
     Config for the Viewer (display window).
 
-    show: subset of {"left", "right", "depth"}.
+    show: subset of {"left", "right", "depth", "depth_filtered", "confidence", "normals"}.
         Streams listed here but not present in the camera's output are
         silently skipped. Overlays (if provided) are applied to the "left"
         panel only.
     fps: display rate cap; the capture thread runs faster, the viewer
         rate-limits its imshow calls to this rate.
+    skip_unchanged: don't redraw while the camera's image is unchanged
+        (meta["change_seq"]; requires ZedConfig.change_detection) and no
+        overlays are passed.
     """
     show: list[str] = field(default_factory=lambda: ["left"])
     fps: int = 30
+    skip_unchanged: bool = False
 
     def __post_init__(self):
         if not self.show:
@@ -121,31 +294,185 @@ class RecorderConfig:
 
     Files saved under {save_dir}/{save_name}/:
         cam_<last3>_left.mp4          (when "left" in streams)
-        cam_<last3>_left.npz          (when both "left" and "right")
-        cam_<last3>_right.npz         (when "right" in streams)
+        cam_<last3>_left.npz          (when both "left" and "right"; .zfr
+                                       with a chunked stereo_codec)
+        cam_<last3>_right.npz         (when "right" in streams; ditto)
         cam_<last3>_depth.mp4         (when "depth" in streams)
         cam_<last3>_overlay.mp4       (when save_with_overlays and "left")
         cam_<last3>_calibration.json  (when "right" in streams)
+        cam_<last3>_timestamps.csv    (always; one row per saved frame / skipped slot)
+        cam_<last3>_manifest.jsonl    (always; write-ahead session log)
+        cam_<last3>_metadata.zmd      (when save_metadata; per-frame
+                                       timestamps, exposure/gain, IMU)
 
     save_name: if None, auto-set to a timestamp at start() (e.g. "20260511_153023").
     fps: rate at which frames are sampled from the camera. Default 10 Hz. Up to 30 Hz.
+
+    sampling: how frames are picked for saving.
+        - "wallclock": save whenever 1/fps seconds of wall time have passed
+                       since the last save (legacy behavior).
+        - "adaptive":  pick frames on a 1/fps grid of *camera* timestamps, so
+                       the saved rate matches fps exactly whenever the camera
+                       delivers. Slots without a frame are logged as skipped,
+                       with a reason, in timestamps.csv. Under load the
+                       recorder sheds optional outputs in order
+                       overlay.mp4 -> depth.mp4 -> left.mp4; the lossless
+                       stereo pair is never shed.
+    load_budget: adaptive mode only. Fraction of the 1/fps frame period the
+        recorder may spend writing a frame before it starts shedding outputs.
+
+    segment_seconds / segment_mb: rotate to a new segment once the current
+        one spans this much recording time / holds this many megabytes
+        (buffered npz frames + mp4 bytes). Closed segments are finalized and
+        fsynced, so a crash only loses the open one. Segment 0 keeps the
+        plain file names; segment k writes cam_<last3>_<stream>_<kkkk>.<ext>.
+        None (default) = one segment per recording, so a crash loses every
+        npz frame of it. Set one of them when crash safety matters.
+    resume: if save_name points at an existing session for this camera,
+        recover its manifest and continue recording into it instead of
+        overwriting it.
+
+    preroll_seconds: keep the last N seconds of frames (at fps) in memory
+        while not recording; start() writes them ahead of the live frames.
+        0 (default) disables pre-roll.
+    preroll_codec: how pre-roll frames are held in memory.
+        - "raw":  frames as captured (fastest; ~2.6 MB per HD720 image).
+        - "png":  lossless, roughly 2-3x smaller.
+        - "jpeg": ~10-20x smaller; the npz stereo pair still uses PNG so the
+                  lossless outputs stay lossless.
+    preroll_quality: JPEG quality for preroll_codec="jpeg".
+    preroll_threads: encoder threads compressing pre-roll frames off the
+        caller's thread (encoding.EncoderPool). 0 compresses inline in
+        update(). Ignored for "raw".
+
+    stereo_codec: lossless format of the left/right npz outputs (see
+        framestore.py).
+        - "npz":  np.savez_compressed at segment close (zlib 6, single
+                  thread); loads with np.load. Default.
+        - "none" / "zlib" / "lz4" / "png": a chunked .zfr file, compressed
+                  on stereo_threads threads while recording; read with
+                  framestore.read_frames() / load_frames(). "lz4" needs
+                  the lz4 package.
+    stereo_level: codec level (zlib 0-9, lz4 0-16, png 0-9); None picks
+        the fast default (zlib 1, lz4 0, png 1).
+    stereo_threads: compression threads for chunked codecs; 0 compresses
+        inline in update().
+    stereo_chunk_frames: frames per compression task.
+
+    io_scheduler: write npz files and batch fsyncs through the process-wide
+        diskio.IOScheduler, which serves all recorders' writes in large
+        blocks, round-robin. False (default) writes directly.
+    io_budget_mb_s: this session's disk bandwidth budget in MB/s (npz
+        writes plus the growth of its mp4/manifest/csv files). None =
+        unthrottled.
+    io_max_queued_mb: npz data the session may have queued for the disk
+        before the writer blocks (backpressure).
+    durability_interval: seconds between batched fsyncs of the open files
+        (manifest, mp4s, timestamps.csv). Closed segments are always
+        fsynced before their segment_close event.
+
+    save_metadata: write every saved frame's capture metadata (seq, image
+        and host timestamps, exposure/gain, IMU; see metadata.py) to the
+        columnar metadata.zmd sidecar. Without ZedConfig.metadata only
+        seq and timestamp are filled in.
+
+    unchanged: what to do with a sampled frame whose image has not changed
+        since the last stored frame (meta["change_seq"]; requires
+        ZedConfig.change_detection).
+        - "save":   store it like any other frame (default).
+        - "repeat": store a marker instead: a frame index and a
+                    timestamps.csv / metadata row with outputs "repeat",
+                    and the manifest frame event gets "repeat_of" (the
+                    frame index it repeats). No image is written.
+        - "skip":   store nothing; timestamps.csv gets a row with skip
+                    reason "unchanged".
+        The first frame of every segment is always stored.
     """
     streams: list[str] = field(default_factory=lambda: ["left"])
     save_dir: str = "./recordings"
     save_name: str | None = None
     fps: int = 10
     save_with_overlays: bool = False
+    sampling: str = "wallclock"
+    load_budget: float = 0.8
+    segment_seconds: float | None = None
+    segment_mb: float | None = None
+    resume: bool = False
+    preroll_seconds: float = 0.0
+    preroll_codec: str = "raw"
+    preroll_quality: int = 90
+    preroll_threads: int = 2
+    stereo_codec: str = "npz"
+    stereo_level: int | None = None
+    stereo_threads: int = 2
+    stereo_chunk_frames: int = 8
+    io_scheduler: bool = False
+    io_budget_mb_s: float | None = None
+    io_max_queued_mb: float = 64.0
+    durability_interval: float = 1.0
+    save_metadata: bool = False
+    unchanged: str = "save"
 
     def __post_init__(self):
         if self.fps <= 0:
             raise ValueError("fps must be positive")
+        if self.sampling not in VALID_SAMPLING:
+            raise ValueError(
+                f"Unknown sampling {self.sampling!r}. "
+                f"Allowed: {sorted(VALID_SAMPLING)}"
+            )
+        if not (0 < self.load_budget <= 1):
+            raise ValueError("load_budget must be in (0, 1]")
+        if self.segment_seconds is not None and self.segment_seconds <= 0:
+            raise ValueError("segment_seconds must be positive")
+        if self.segment_mb is not None and self.segment_mb <= 0:
+            raise ValueError("segment_mb must be positive")
+        if self.stereo_codec not in VALID_STEREO_CODECS:
+            raise ValueError(
+                f"Unknown stereo_codec {self.stereo_codec!r}. "
+                f"Allowed: {sorted(VALID_STEREO_CODECS)}"
+            )
+        if self.stereo_level is not None:
+            if self.stereo_codec not in STEREO_LEVEL_RANGES:
+                raise ValueError(f"stereo_level does not apply to stereo_codec {self.stereo_codec!r}")
+            lo, hi = STEREO_LEVEL_RANGES[self.stereo_codec]
+            if not lo <= self.stereo_level <= hi:
+                raise ValueError(f"stereo_level for {self.stereo_codec} must be in [{lo}, {hi}]")
+        if self.stereo_threads < 0:
+            raise ValueError("stereo_threads must be >= 0")
+        if self.stereo_chunk_frames < 1:
+            raise ValueError("stereo_chunk_frames must be >= 1")
+        if self.io_budget_mb_s is not None and self.io_budget_mb_s <= 0:
+            raise ValueError("io_budget_mb_s must be positive")
+        if self.io_max_queued_mb <= 0:
+            raise ValueError("io_max_queued_mb must be positive")
+        if self.durability_interval <= 0:
+            raise ValueError("durability_interval must be positive")
+        if self.preroll_seconds < 0:
+            raise ValueError("preroll_seconds must be >= 0")
+        if self.preroll_codec not in VALID_PREROLL_CODECS:
+            raise ValueError(
+                f"Unknown preroll_codec {self.preroll_codec!r}. "
+                f"Allowed: {sorted(VALID_PREROLL_CODECS)}"
+            )
+        if not (0 <= self.preroll_quality <= 100):
+            raise ValueError("preroll_quality must be in [0, 100]")
+        if self.preroll_threads < 0:
+            raise ValueError("preroll_threads must be >= 0")
+        if self.unchanged not in VALID_UNCHANGED:
+            raise ValueError(
+                f"Unknown unchanged {self.unchanged!r}. "
+                f"Allowed: {sorted(VALID_UNCHANGED)}"
+            )
+        if self.resume and self.save_name is None:
+            raise ValueError("resume requires an explicit save_name")
         if not self.streams:
             raise ValueError("streams must contain at least one entry")
-        invalid = set(self.streams) - VALID_STREAMS
+        invalid = set(self.streams) - VALID_RECORD_STREAMS
         if invalid:
             raise ValueError(
                 f"Unknown stream id(s): {sorted(invalid)}. "
-                f"Allowed: {sorted(VALID_STREAMS)}"
+                f"Allowed: {sorted(VALID_RECORD_STREAMS)}"
             )
 
 
@@ -156,15 +483,34 @@ class CameraConfig:
 
     Sub-configs may be passed as dataclasses or dicts (normalized in __post_init__).
     Setting viewer=None or recorder=None disables that component.
+
+    extrinsics: optional 4x4 row-major transform (nested lists) taking points
+        from this camera's left-camera frame into the shared system frame, in
+        the camera's coordinate_units. Used by
+        CameraSystem.get_fused_point_cloud(); estimate it with
+        calibration.estimate_extrinsics() / `zed-toolbox calibrate`.
     """
     zed: ZedConfig | dict = field(default_factory=ZedConfig)
     viewer: ViewerConfig | dict | None = None
     recorder: RecorderConfig | dict | None = None
+    extrinsics: list[list[float]] | None = None
 
     def __post_init__(self):
+        if self.extrinsics is not None:
+            rows = [list(row) for row in self.extrinsics]
+            if len(rows) != 4 or any(len(row) != 4 for row in rows):
+                raise ValueError("extrinsics must be a 4x4 matrix (list of 4 rows of 4)")
+            if any(abs(a - b) > 1e-6 for a, b in zip(rows[3], (0, 0, 0, 1))):
+                raise ValueError("extrinsics last row must be [0, 0, 0, 1]")
+            self.extrinsics = [[float(v) for v in row] for row in rows]
         if isinstance(self.zed, dict):
             self.zed = ZedConfig(**self.zed)
         if isinstance(self.viewer, dict):
             self.viewer = ViewerConfig(**self.viewer)
         if isinstance(self.recorder, dict):
             self.recorder = RecorderConfig(**self.recorder)
+        if self.zed.change_detection is None:
+            if self.viewer is not None and self.viewer.skip_unchanged:
+                raise ValueError("viewer.skip_unchanged requires zed.change_detection")
+            if self.recorder is not None and self.recorder.unchanged != "save":
+                raise ValueError(f"recorder.unchanged={self.recorder.unchanged!r} requires zed.change_detection")
@@ -0,0 +1,226 @@
+"""
+Load CameraSystem configs from YAML / TOML / JSON files.
+
+A config file holds named profiles. A profile lists its cameras by serial,
+plus a `camera` block of defaults merged under every camera, and optional
+`system` options for CameraSystem. `extends` inherits from one or more
+other profiles (later ones win; the profile's own keys win over all).
+Merging is recursive for mappings; lists and scalars are replaced.
+
+    default_profile: cell_a
+    profiles:
+      base:
+        camera:
+          zed: {streams: [left, right], fps: 30}
+          recorder: {streams: [left, right], save_dir: ./recordings}
+      cell_a:
+        extends: base
+        system: {use_processes: true}
+        cameras:
+          24944966: {viewer: {show: [left]}}
+          33261276: {zed: {exposure: 40}}
+
+A file without `profiles` is a single anonymous profile (`camera`,
+`cameras`, `system` at the top level).
+
+This module imports neither the ZED SDK nor OpenCV, so validating configs
+is fast and works on machines without cameras.
+"""
+import copy
+import json
+from pathlib import Path
+
+from .config import CameraConfig
+
+
+SYSTEM_OPTIONS = {"use_processes", "record_in_worker", "max_restarts", "shared_exposure", "memory_budget_mb"}
+
+_cache = {}     # (path, profile) -> (mtime_ns, size, SystemSpec)
+
+
+class ConfigFileError(ValueError):
+    """A config file is malformed or fails validation. The message names the
+    file, profile and camera it came from."""
+
+
+class SystemSpec:
+    """A loaded profile: validated CameraConfigs plus CameraSystem options."""
+
+    def __init__(self, profile, configs, options):
+        self.profile = profile
+        self.configs = configs
+        self.options = options
+
+
+    def build(self, **overrides):
+        """Construct the CameraSystem (imports the SDK)."""
+        from .system import CameraSystem
+        return CameraSystem(copy.deepcopy(self.configs), **{**self.options, **overrides})
+
+
+def load_system_config(path, profile=None, use_cache=True):
+    """
+    Load and validate one profile of a config file. Returns a SystemSpec.
+
+    profile: profile name; defaults to the file's default_profile, or its
+        only profile. Results are cached per (file, profile) and reused while
+        the file's mtime and size are unchanged; callers get a deep copy, so
+        mutating a returned config never leaks into the cache.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    key = (str(path), profile)
+    hit = _cache.get(key) if use_cache else None
+    if hit is not None and hit[:2] == (stat.st_mtime_ns, stat.st_size):
+        return copy.deepcopy(hit[2])
+
+    data = read_config_file(path)
+    name, raw = resolve_profile(data, profile, source=path)
+    spec = _build_spec(name, raw, source=path)
+    _cache[key] = (stat.st_mtime_ns, stat.st_size, spec)
+    return copy.deepcopy(spec)
+
+
+def load_camera_configs(path, profile=None):
+    """{serial: CameraConfig} for one profile; see load_system_config()."""
+    return load_system_config(path, profile).configs
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def read_config_file(path):
+    """Parse a .yaml/.yml, .toml or .json file into plain dicts."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise RuntimeError("YAML configs require PyYAML (pip install pyyaml)") from e
+        with open(path) as f:
+            data = yaml.safe_load(f)
+    elif suffix == ".toml":
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError as e:
+                raise RuntimeError("TOML configs on Python < 3.11 require tomli (pip install tomli)") from e
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    elif suffix == ".json":
+        with open(path) as f:
+            data = json.load(f)
+    else:
+        raise ConfigFileError(f"{path}: unknown config format {suffix!r}. Allowed: .yaml, .yml, .toml, .json")
+    if not isinstance(data, dict):
+        raise ConfigFileError(f"{path}: top level must be a mapping")
+    return data
+
+
+def resolve_profile(data, profile=None, source="<config>"):
+    """Flatten `extends` chains. Returns (profile name, merged profile dict)."""
+    profiles = data.get("profiles")
+    if profiles is None:
+        if profile is not None:
+            raise ConfigFileError(f"{source}: no profiles defined, cannot select {profile!r}")
+        return None, {k: v for k, v in data.items() if k != "default_profile"}
+
+    if profile is None:
+        profile = data.get("default_profile")
+    if profile is None:
+        if len(profiles) != 1:
+            raise ConfigFileError(
+                f"{source}: several profiles and no default_profile; pick one of {sorted(profiles)}"
+            )
+        profile = next(iter(profiles))
+    return profile, _resolve(profiles, profile, (), source)
+
+
+def concrete_profiles(data, source="<config>"):
+    """Names of the profiles that describe a system, sorted: every profile
+    except those that only exist to be extended (they are some profile's
+    parent and define no cameras, even after inheritance). [None] for a file
+    without profiles."""
+    profiles = data.get("profiles")
+    if profiles is None:
+        return [None]
+    parents = set()
+    for raw in profiles.values():
+        extends = (raw or {}).get("extends") or []
+        parents.update([extends] if isinstance(extends, str) else extends)
+    names = []
+    for name in sorted(profiles):
+        if name in parents:
+            try:
+                if not _resolve(profiles, name, (), source).get("cameras"):
+                    continue
+            except ConfigFileError:
+                pass        # reported when the profile is loaded
+        names.append(name)
+    return names
+
+
+def _resolve(profiles, name, chain, source):
+    if name not in profiles:
+        raise ConfigFileError(f"{source}: unknown profile {name!r}. Defined: {sorted(profiles)}")
+    if name in chain:
+        raise ConfigFileError(f"{source}: profile inheritance cycle {' -> '.join(chain + (name,))}")
+    own = dict(profiles[name] or {})
+    parents = own.pop("extends", None) or []
+    if isinstance(parents, str):
+        parents = [parents]
+    merged = {}
+    for parent in parents:
+        merged = deep_merge(merged, _resolve(profiles, parent, chain + (name,), source))
+    return deep_merge(merged, own)
+
+
+def deep_merge(base, override):
+    """Recursive dict merge; override wins. Inputs are not modified."""
+    out = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = deep_merge(out[key], value)
+        else:
+            out[key] = copy.deepcopy(value)
+    return out
+
+
+def _build_spec(profile, raw, source):
+    where = f"{source}" + (f" [profile {profile}]" if profile else "")
+    unknown = set(raw) - {"camera", "cameras", "system"}
+    if unknown:
+        raise ConfigFileError(f"{where}: unknown key(s) {sorted(unknown)}")
+
+    options = dict(raw.get("system") or {})
+    bad = set(options) - SYSTEM_OPTIONS
+    if bad:
+        raise ConfigFileError(f"{where}: unknown system option(s) {sorted(bad)}. Allowed: {sorted(SYSTEM_OPTIONS)}")
+
+    cameras = raw.get("cameras") or {}
+    if not cameras:
+        raise ConfigFileError(f"{where}: no cameras defined")
+    defaults = raw.get("camera") or {}
+
+    configs = {}
+    for serial, cam in cameras.items():
+        serial = _serial(serial, where)
+        merged = deep_merge(defaults, cam or {})
+        try:
+            configs[serial] = CameraConfig(**merged)
+        except (TypeError, ValueError) as e:
+            raise ConfigFileError(f"{where} camera {serial}: {e}") from e
+    return SystemSpec(profile, configs, options)
+
+
+def _serial(value, where):
+    # TOML (and JSON) keys are always strings.
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ConfigFileError(f"{where}: camera key {value!r} is not a serial number") from None
+
@@ -0,0 +1,266 @@
+import time
+import warnings
+
+import cv2
+import numpy as np
+
+
+class DepthFilterChain:
+    """
+    Ordered depth post-processing stages, built from ZedConfig.depth_filters.
+
+    Invalid depth is NaN throughout the chain (the SDK's convention), so
+    stages compose without agreeing on sentinel values. Each call returns a
+    new array; the raw input is never modified. Per-stage cost is tracked as
+    an exponential moving average in milliseconds (timings()).
+
+    Stage specs (dicts, applied in list order):
+        {"type": "range", "min": 0.2, "max": 3.0}
+            invalidate depth outside [min, max].
+        {"type": "invalid", "fill": None}
+            invalidate non-finite and non-positive depth; with fill set,
+            replace invalid pixels with that value instead.
+        {"type": "fill_holes", "ksize": 5, "iterations": 1}
+            fill invalid pixels with the nearest (smallest) valid depth in a
+            ksize x ksize window.
+        {"type": "temporal", "alpha": 0.4, "delta": 0.05, "hold": False}
+            per-pixel EMA across frames; changes larger than delta (in
+            depth units) reset the pixel instead of smearing edges. With
+            hold, pixels that go invalid keep their last value.
+        {"type": "decimate", "factor": 2, "method": "stride"}
+            downsample by an integer factor: "stride" (cheap) or nan-aware
+            "median" (several times slower).
+        {"type": "median", "ksize": 5}
+            median filter (ksize 3 or 5), invalid pixels excluded.
+        {"type": "bilateral", "d": 5, "sigma_color": 0.05, "sigma_space": 5}
+            edge-preserving smoothing; sigma_color is in depth units,
+            invalid pixels excluded.
+    median and bilateral run OpenCV on the frame, then redo the pixels next
+    to holes from their valid neighbors, so cost grows with hole borders.
+    """
+
+    def __init__(self, specs):
+        self.stages = []
+        for i, spec in enumerate(specs):
+            spec = dict(spec)
+            kind = spec.pop("type")
+            if kind not in STAGES:
+                raise ValueError(f"Unknown depth filter {kind!r}. Allowed: {sorted(STAGES)}")
+            self.stages.append((f"{i}:{kind}", STAGES[kind](**spec)))
+        self._timings = {label: 0.0 for label, _ in self.stages}
+
+
+    @property
+    def stateful(self):
+        return any(getattr(stage, "stateful", False) for _, stage in self.stages)
+
+
+    def __call__(self, depth):
+        out = depth.astype(np.float32, copy=True)
+        for label, stage in self.stages:
+            t0 = time.perf_counter()
+            out = stage(out)
+            ms = (time.perf_counter() - t0) * 1000.0
+            self._timings[label] = 0.9 * self._timings[label] + 0.1 * ms
+        return out
+
+
+    def timings(self):
+        """{stage label: EMA milliseconds}, e.g. {"0:range": 0.4, "1:median": 2.1}."""
+        return dict(self._timings)
+
+
+    def reset(self):
+        for _, stage in self.stages:
+            if hasattr(stage, "reset"):
+                stage.reset()
+
+
+class RangeClip:
+    def __init__(self, min=0.0, max=np.inf):
+        if min >= max:
+            raise ValueError("range filter needs min < max")
+        self.min, self.max = float(min), float(max)
+
+    def __call__(self, depth):
+        with np.errstate(invalid="ignore"):
+            depth[(depth < self.min) | (depth > self.max)] = np.nan
+        return depth
+
+
+class InvalidMask:
+    def __init__(self, fill=None):
+        self.fill = np.nan if fill is None else float(fill)
+
+    def __call__(self, depth):
+        with np.errstate(invalid="ignore"):
+            depth[~np.isfinite(depth) | (depth <= 0)] = self.fill
+        return depth
+
+
+class FillHoles:
+    def __init__(self, ksize=5, iterations=1):
+        if ksize < 3 or ksize % 2 == 0:
+            raise ValueError("fill_holes ksize must be an odd integer >= 3")
+        self.kernel = np.ones((ksize, ksize), np.uint8)
+        self.iterations = int(iterations)
+
+    def __call__(self, depth):
+        invalid = np.isnan(depth)
+        if not invalid.any():
+            return depth
+        # Min-filter with invalid pixels at +inf picks the closest valid neighbor.
+        work = np.where(invalid, np.inf, depth).astype(np.float32)
+        nearest = cv2.erode(work, self.kernel, iterations=self.iterations)
+        depth[invalid] = nearest[invalid]
+        depth[np.isinf(depth)] = np.nan
+        return depth
+
+
+class TemporalEMA:
+    stateful = True
+
+    def __init__(self, alpha=0.4, delta=np.inf, hold=False):
+        if not (0 < alpha <= 1):
+            raise ValueError("temporal alpha must be in (0, 1]")
+        self.alpha = float(alpha)
+        self.delta = float(delta)
+        self.hold = bool(hold)
+        self._state = None
+        self._scratch = None
+
+    def reset(self):
+        self._state = None
+
+    def __call__(self, depth):
+        if self._state is None or self._state.shape != depth.shape:
+            self._state = depth.copy()
+            self._scratch = np.empty(depth.shape, dtype=bool)
+            return depth
+
+        state, jump = self._state, self._scratch
+        valid_new = np.isfinite(depth)
+        valid_old = np.isfinite(state)
+        with np.errstate(invalid="ignore"):
+            np.greater(np.abs(depth - state), self.delta, out=jump)
+        blend = valid_new & valid_old & ~jump
+        take_new = valid_new & ~blend
+
+        state[blend] += self.alpha * (depth[blend] - state[blend])
+        state[take_new] = depth[take_new]
+        if not self.hold:
+            state[~valid_new] = np.nan
+        depth[...] = state
+        return depth
+
+
+class Decimate:
+    def __init__(self, factor=2, method="stride"):
+        if int(factor) < 1:
+            raise ValueError("decimate factor must be >= 1")
+        if method not in ("stride", "median"):
+            raise ValueError("decimate method must be 'stride' or 'median'")
+        self.factor = int(factor)
+        self.method = method
+
+    def __call__(self, depth):
+        f = self.factor
+        if f == 1:
+            return depth
+        if self.method == "stride":
+            return np.ascontiguousarray(depth[::f, ::f])
+        h, w = (depth.shape[0] // f) * f, (depth.shape[1] // f) * f
+        blocks = depth[:h, :w].reshape(h // f, f, w // f, f).transpose(0, 2, 1, 3)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)   # all-NaN blocks
+            return np.nanmedian(blocks.reshape(h // f, w // f, f * f), axis=2).astype(np.float32)
+
+
+class Median:
+    def __init__(self, ksize=5):
+        if ksize not in (3, 5):
+            raise ValueError("median ksize must be 3 or 5 for float depth")
+        self.ksize = ksize
+        r = ksize // 2
+        self._offsets = [(dy, dx) for dy in range(-r, r + 1) for dx in range(-r, r + 1)]
+
+    def __call__(self, depth):
+        invalid = np.isnan(depth)
+        out = cv2.medianBlur(np.nan_to_num(depth, nan=0.0), self.ksize)
+        if invalid.any():
+            # The zero-filled holes skew windows that overlap them; redo
+            # those pixels as a median of their valid neighbors only.
+            rows, cols = _near_invalid(invalid, self.ksize)
+            if rows.size:
+                values = np.sort(_gather(depth, rows, cols, self._offsets), axis=1)    # NaNs sort last
+                n = np.count_nonzero(~np.isnan(values), axis=1)
+                i = np.arange(rows.size)
+                out[rows, cols] = 0.5 * (values[i, (n - 1) // 2] + values[i, n // 2])
+            out[invalid] = np.nan
+        return out
+
+
+class Bilateral:
+    def __init__(self, d=5, sigma_color=0.05, sigma_space=5.0):
+        self.d, self.sigma_color, self.sigma_space = int(d), float(sigma_color), float(sigma_space)
+        # Same disk window and weights as cv2.bilateralFilter.
+        r = self.d // 2 if self.d > 0 else int(round(self.sigma_space * 1.5))
+        self._offsets = [(dy, dx) for dy in range(-r, r + 1) for dx in range(-r, r + 1)
+                         if dy * dy + dx * dx <= r * r]
+        dist2 = np.array([dy * dy + dx * dx for dy, dx in self._offsets], dtype=np.float32)
+        self._spatial = np.exp(-dist2 / (2 * self.sigma_space ** 2))
+        self._color_scale = 1.0 / (2 * self.sigma_color ** 2)
+        self._ksize = 2 * r + 1
+
+    def __call__(self, depth):
+        invalid = np.isnan(depth)
+        out = cv2.bilateralFilter(np.nan_to_num(depth, nan=0.0), self.d,
+                                  self.sigma_color, self.sigma_space)
+        if invalid.any():
+            # Redo pixels whose window overlaps a hole with the weights of
+            # the valid neighbors only (normalized over the valid mask).
+            rows, cols = _near_invalid(invalid, self._ksize)
+            if rows.size:
+                r = self._ksize // 2
+                padded = np.pad(depth, r, mode="edge")
+                center = depth[rows, cols]
+                num = np.zeros(rows.size, dtype=np.float32)
+                den = np.zeros(rows.size, dtype=np.float32)
+                for (dy, dx), spatial in zip(self._offsets, self._spatial):
+                    values = padded[rows + r + dy, cols + r + dx]
+                    diff = values - center
+                    weight = spatial * np.exp(-diff * diff * self._color_scale)
+                    weight[np.isnan(values)] = 0.0
+                    num += weight * np.nan_to_num(values)
+                    den += weight
+                out[rows, cols] = num / den
+            out[invalid] = np.nan
+        return out
+
+
+def _near_invalid(invalid, ksize):
+    """(rows, cols) of valid pixels with an invalid pixel in their
+    ksize x ksize window."""
+    grown = cv2.dilate(invalid.view(np.uint8), np.ones((ksize, ksize), np.uint8)).view(bool)
+    return np.nonzero(grown & ~invalid)
+
+
+def _gather(depth, rows, cols, offsets):
+    """(N, len(offsets)) window values around each (row, col); edges are
+    replicated like OpenCV's default border."""
+    r = max(max(abs(dy), abs(dx)) for dy, dx in offsets)
+    padded = np.pad(depth, r, mode="edge")
+    dy = np.array([o[0] for o in offsets]) + r
+    dx = np.array([o[1] for o in offsets]) + r
+    return padded[rows[:, None] + dy, cols[:, None] + dx]
+
+
+STAGES = {
+    "range": RangeClip,
+    "invalid": InvalidMask,
+    "fill_holes": FillHoles,
+    "temporal": TemporalEMA,
+    "decimate": Decimate,
+    "median": Median,
+    "bilateral": Bilateral,
+}
@@ -0,0 +1,392 @@
+"""
+Shared disk writer for all recorders in a process.
+
+Without it, every Recorder writes its own files whenever it likes: several
+cameras' npz saves interleave small writes on one disk, and one big
+savez_compressed at stop() can hog the device while the others stall.
+IOScheduler funnels those writes through one I/O thread instead:
+
+- ScheduledFile buffers a writer's output into block_size blocks (4 MiB by
+  default), so the disk sees large sequential writes.
+- Each IOSession (one per recording session) has its own block queue. The
+  I/O thread serves sessions round-robin, one block per turn, so no session
+  can starve another.
+- An optional per-session bandwidth budget (MB/s, token bucket) paces a
+  session's blocks. Files written by other code, such as OpenCV's mp4
+  writers and the manifest, can be tracked so their growth is charged too.
+- A session may hold at most max_queued_mb in its queue. A writer that
+  gets ahead blocks in write() (backpressure) until the disk catches up.
+- fsyncs are batched per session: closed files and tracked files that
+  grew are fsynced together every durability_interval seconds, or at once
+  when a writer waits for durability (ScheduledFile.close()).
+
+stats() reports throughput, queue depth, block latency (queued -> on disk),
+time spent throttled or blocked, and fsync cost per session.
+"""
+import collections
+import io
+import os
+import threading
+import time
+
+
+class IOSession:
+    """One recording session's share of an IOScheduler. Create with
+    IOScheduler.session()."""
+
+    def __init__(self, scheduler, name, budget_mb_s=None, max_queued_mb=64.0, durability_interval=1.0):
+        self.scheduler = scheduler
+        self.name = name
+        self.rate = budget_mb_s * 1e6 if budget_mb_s else None
+        self.max_queued = int(max_queued_mb * 1e6)
+        self.durability_interval = durability_interval
+
+        self._blocks = collections.deque()      # (file, bytes | None for close, enqueue time)
+        self.queued = 0
+        self._tokens = float(scheduler.block_size)
+        self._refilled = time.monotonic()
+        self._throttled_since = None
+        self._closing = []                      # files written out, waiting for fsync
+        self._tracked = {}                      # path -> size at last sync
+        self._next_sync = time.monotonic() + durability_interval
+        self._sync_now = False
+        self.closed = False
+
+        self.bytes_written = 0
+        self.tracked_bytes = 0
+        self.write_s = 0.0
+        self.throttled_s = 0.0
+        self.blocked_s = 0.0
+        self.fsyncs = 0
+        self.fsync_s = 0.0
+        self._latency = collections.deque(maxlen=256)
+        self._recent = collections.deque()      # (time, bytes) over the last few seconds
+
+
+    def open(self, path):
+        """A write-only file whose bytes go to disk through the scheduler."""
+        return ScheduledFile(self, path)
+
+
+    def track(self, path):
+        """Fsync this externally written file with the session's batch, and
+        charge its growth against the budget."""
+        with self.scheduler._cond:
+            self._tracked.setdefault(str(path), _size(path))
+
+
+    def untrack(self, path):
+        with self.scheduler._cond:
+            self._tracked.pop(str(path), None)
+
+
+    def sync(self):
+        """Ask for a durability pass now instead of at the next interval."""
+        with self.scheduler._cond:
+            self._sync_now = True
+            self.scheduler._cond.notify_all()
+
+
+    def close(self):
+        """Detach from the scheduler once everything queued is on disk."""
+        self.scheduler._close_session(self)
+
+
+    def _refill(self, now):
+        if self.rate is None:
+            return
+        self._tokens = min(self._tokens + (now - self._refilled) * self.rate,
+                           max(self.rate * 0.5, self.scheduler.block_size))
+        self._refilled = now
+
+
+    def _wait_for_tokens(self):
+        """Seconds until the budget allows another block (0 = now)."""
+        if self.rate is None or self._tokens > 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+
+    def stats(self):
+        # The I/O thread appends to the deques and counters under the
+        # scheduler lock; take a consistent copy under it.
+        with self.scheduler._cond:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0][0] > 5.0:
+                self._recent.popleft()
+            recent = sum(n for _, n in self._recent)
+            lat = sorted(self._latency)
+            written, tracked, write_s = self.bytes_written, self.tracked_bytes, self.write_s
+            queued, throttled_s, blocked_s = self.queued, self.throttled_s, self.blocked_s
+            fsyncs, fsync_s = self.fsyncs, self.fsync_s
+        pick = lambda q: round(lat[min(int(q * len(lat)), len(lat) - 1)] * 1e3, 2) if lat else None
+        return {
+            "mb_written": round((written + tracked) / 1e6, 2),
+            "mb_s": round(recent / 5e6, 2),
+            "disk_mb_s": round(written / write_s / 1e6, 1) if write_s else None,
+            "queued_mb": round(queued / 1e6, 2),
+            "latency_ms": {"p50": pick(0.5), "p95": pick(0.95), "max": pick(1.0)},
+            "throttled_s": round(throttled_s, 2),
+            "blocked_s": round(blocked_s, 2),
+            "fsyncs": fsyncs,
+            "fsync_ms": round(fsync_s / fsyncs * 1e3, 2) if fsyncs else None,
+        }
+
+
+class ScheduledFile(io.RawIOBase):
+    """
+    Write-only file that hands its data to an IOSession in block_size
+    blocks. Works anywhere a binary file object is accepted for writing,
+    including np.savez_compressed (the zip is streamed, not seeked).
+    close() returns once the file is on disk and fsynced.
+    """
+
+    def __init__(self, session, path):
+        super().__init__()
+        self.session = session
+        self.path = str(path)
+        self.fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        self.size = 0
+        self.error = None
+        self._buf = bytearray()
+        self._done = threading.Event()
+
+
+    def writable(self):
+        return True
+
+
+    def write(self, data):
+        if self.error is not None:
+            raise self.error
+        n = len(data)
+        self._buf += data
+        self.size += n
+        block_size = self.session.scheduler.block_size
+        while len(self._buf) >= block_size:
+            block = bytes(self._buf[:block_size])
+            del self._buf[:block_size]
+            self.session.scheduler._submit(self.session, self, block)
+        return n
+
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buf:
+                self.session.scheduler._submit(self.session, self, bytes(self._buf))
+                self._buf.clear()
+            self.session.scheduler._submit(self.session, self, None)
+            self._done.wait()
+        finally:
+            super().close()
+        if self.error is not None:
+            raise self.error
+
+
+class IOScheduler:
+    """
+    block_size: bytes per disk write; ScheduledFile coalesces into blocks
+        of this size.
+
+    One scheduler serves any number of IOSessions. shared() returns the
+    process-wide instance the Recorders use.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, block_size=4 << 20):
+        self.block_size = int(block_size)
+        self._sessions = []
+        self._cond = threading.Condition()
+        self._turn = 0
+        self._stop = False
+        self._thread = None
+
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+
+    def session(self, name, budget_mb_s=None, max_queued_mb=64.0, durability_interval=1.0):
+        """Register a session. budget_mb_s: None = unthrottled."""
+        session = IOSession(self, name, budget_mb_s, max_queued_mb, durability_interval)
+        with self._cond:
+            self._sessions.append(session)
+            if self._thread is None:
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, daemon=True, name="io-scheduler")
+                self._thread.start()
+        return session
+
+
+    def _submit(self, session, file, block):
+        """Queue a block (None = close marker). Blocks the writer while the
+        session already holds max_queued bytes."""
+        n = 0 if block is None else len(block)
+        with self._cond:
+            if session.closed:
+                raise RuntimeError(f"I/O session {session.name!r} is closed")
+            if n and session.queued and session.queued + n > session.max_queued:
+                t0 = time.monotonic()
+                self._cond.wait_for(lambda: session.queued + n <= session.max_queued or not session.queued)
+                session.blocked_s += time.monotonic() - t0
+            session._blocks.append((file, block, time.monotonic()))
+            session.queued += n
+            self._cond.notify_all()
+
+
+    def _next_block(self):
+        """Under the lock: (session, entry) to write next, or (None, seconds
+        to wait before anything is due)."""
+        now = time.monotonic()
+        wait = None
+        n = len(self._sessions)
+        for i in range(n):
+            session = self._sessions[(self._turn + i) % n]
+            if session._sync_now or (now >= session._next_sync and (session._closing or session._tracked)):
+                return session, "sync"
+            due = session._next_sync - now if session._closing or session._tracked else None
+            if session._blocks:
+                session._refill(now)
+                entry = session._blocks[0]
+                delay = 0.0 if entry[1] is None else session._wait_for_tokens()
+                if delay == 0.0:
+                    if session._throttled_since is not None:
+                        session.throttled_s += now - session._throttled_since
+                        session._throttled_since = None
+                    self._turn = (self._turn + i + 1) % n
+                    return session, session._blocks.popleft()
+                if session._throttled_since is None:
+                    session._throttled_since = now
+                due = delay if due is None else min(due, delay)
+            if due is not None:
+                wait = due if wait is None else min(wait, due)
+        return None, wait
+
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stop and not any(s._blocks or s._closing for s in self._sessions):
+                        self._thread = None
+                        return
+                    session, entry = self._next_block()
+                    if session is not None:
+                        break
+                    self._cond.wait(timeout=entry)
+            if entry == "sync":
+                self._sync(session)
+            else:
+                self._write(session, *entry)
+
+
+    def _write(self, session, file, block, queued_at):
+        if block is None:
+            with self._cond:
+                session._closing.append(file)
+                session._sync_now = True
+            return
+        t0 = time.monotonic()
+        if file.error is None:
+            try:
+                view = memoryview(block)
+                while view:
+                    view = view[os.write(file.fd, view):]
+            except OSError as e:
+                file.error = e
+        t1 = time.monotonic()
+        with self._cond:
+            session.queued -= len(block)
+            session.bytes_written += len(block)
+            session.write_s += t1 - t0
+            session._tokens -= len(block)
+            session._latency.append(t1 - queued_at)
+            session._recent.append((t1, len(block)))
+            self._cond.notify_all()
+
+
+    def _sync(self, session):
+        """One batched durability pass: fsync and close finished files, fsync
+        tracked files that grew, and charge their growth to the budget."""
+        with self._cond:
+            closing, session._closing = session._closing, []
+            tracked = dict(session._tracked)
+            session._sync_now = False
+            session._next_sync = time.monotonic() + session.durability_interval
+        t0 = time.monotonic()
+        synced, grown = 0, {}
+        for file in closing:
+            try:
+                os.fsync(file.fd)
+            except OSError as e:
+                file.error = file.error or e
+            os.close(file.fd)
+            synced += 1
+        for path, last in tracked.items():
+            size = _size(path)
+            if size is None or size == last:
+                continue
+            try:
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError:
+                continue
+            grown[path] = size
+            synced += 1
+        elapsed = time.monotonic() - t0
+        with self._cond:
+            for path, size in grown.items():
+                if path in session._tracked:
+                    delta = size - (session._tracked[path] or 0)
+                    session._tracked[path] = size
+                    session.tracked_bytes += max(delta, 0)
+                    session._tokens -= max(delta, 0)
+                    session._recent.append((time.monotonic(), max(delta, 0)))
+            session.fsyncs += synced
+            session.fsync_s += elapsed if synced else 0.0
+            self._cond.notify_all()
+        for file in closing:
+            file._done.set()
+
+
+    def _close_session(self, session):
+        with self._cond:
+            self._cond.wait_for(lambda: not session._blocks and not session._closing)
+            session.closed = True
+            if session in self._sessions:
+                self._sessions.remove(session)
+            self._cond.notify_all()
+
+
+    def stats(self):
+        """{session name: IOSession.stats()}."""
+        with self._cond:
+            return {s.name: s.stats() for s in self._sessions}
+
+
+    def close(self):
+        """Write out everything queued, then stop the I/O thread."""
+        with self._cond:
+            self._stop = True
+            thread = self._thread
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+
+
+def _size(path):
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return None
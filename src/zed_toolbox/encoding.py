@@ -0,0 +1,269 @@
+"""
+Parallel JPEG/PNG frame encoding and a compact frame transport format.
+
+EncoderPool encodes {stream: array} frames on a thread pool. cv2.imencode
+releases the GIL, so throughput scales with cores (scripts/bench_encode.py).
+The streams of one frame are encoded in parallel. Completion callbacks and
+futures resolve strictly in submission order, so consumers that write files
+or send frames over a socket never have to reorder.
+
+An encoded frame is {stream: (kind, data)}:
+    - ("image", buf): uint8 image as JPEG or PNG bytes (np.uint8 1-D buffer)
+    - ("f16", arr):   float32 stream (depth, confidence, ...) held as float16
+    - ("raw", arr):   anything else, uncompressed
+pack_frame() / unpack_frame() turn one into a single bytes blob (with
+metadata) for disk or network transport; decode_frame() restores arrays.
+"""
+import collections
+import json
+import os
+import struct
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .retrieval import to_host
+
+
+ENCODE_CODECS = {"jpeg", "png"}
+
+_MAGIC = b"ZTF1"
+_PREFIX = struct.Struct("<4sI")     # magic, header length
+
+
+def encode_array(arr, codec="jpeg", quality=90, png_compression=1):
+    """Encode one stream; see the module docstring for the (kind, data) forms."""
+    if arr.dtype == np.uint8:
+        if codec == "jpeg":
+            ok, buf = cv2.imencode(".jpg", arr, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+        else:
+            ok, buf = cv2.imencode(".png", arr, [cv2.IMWRITE_PNG_COMPRESSION, int(png_compression)])
+        if ok:
+            return ("image", buf)
+    if arr.dtype == np.float32:
+        return ("f16", arr.astype(np.float16))
+    return ("raw", arr.copy())
+
+
+def decode_frame(encoded):
+    """{stream: (kind, data)} -> {stream: array}."""
+    out = {}
+    for name, (kind, data) in encoded.items():
+        if kind == "image":
+            out[name] = cv2.imdecode(data, cv2.IMREAD_UNCHANGED)
+        elif kind == "f16":
+            out[name] = data.astype(np.float32)
+        else:
+            out[name] = data
+    return out
+
+
+def encoded_nbytes(encoded):
+    return sum(data.nbytes for _, data in encoded.values())
+
+
+def pack_frame(encoded, meta=None):
+    """
+    Serialize an encoded frame to bytes:
+        b"ZTF1" | u32 header length | JSON header | stream payloads
+    The header holds meta and, per stream, its kind, dtype and shape.
+    """
+    streams, payloads = [], []
+    for name, (kind, data) in encoded.items():
+        data = np.ascontiguousarray(data)
+        streams.append([name, kind, data.dtype.str, list(data.shape)])
+        payloads.append(data.tobytes())
+    header = json.dumps({"meta": meta or {}, "streams": streams}).encode()
+    return b"".join([_PREFIX.pack(_MAGIC, len(header)), header, *payloads])
+
+
+def unpack_frame(blob):
+    """bytes from pack_frame() -> (encoded, meta). Arrays view the blob."""
+    magic, size = _PREFIX.unpack_from(blob, 0)
+    if magic != _MAGIC:
+        raise ValueError("not a packed frame (bad magic)")
+    offset = _PREFIX.size
+    header = json.loads(bytes(blob[offset:offset + size]))
+    offset += size
+    encoded = {}
+    for name, kind, dtype, shape in header["streams"]:
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape)) if shape else 1
+        data = np.frombuffer(blob, dtype=dtype, count=count, offset=offset).reshape(shape)
+        offset += count * dtype.itemsize
+        encoded[name] = (kind, data)
+    return encoded, header["meta"]
+
+
+class _Job:
+    __slots__ = ("meta", "callback", "future", "encoded", "remaining", "error", "done")
+
+    def __init__(self, meta, callback, remaining):
+        self.meta = meta
+        self.callback = callback
+        self.future = Future()
+        self.encoded = {}
+        self.remaining = remaining
+        self.error = None
+        self.done = False
+
+
+class EncoderPool:
+    """
+    Encode frames to JPEG/PNG on a pool of worker threads.
+
+    threads: worker count; default min(cpu_count, 8).
+    codec / quality: "jpeg" (quality 0-100) or "png" (lossless, fast
+        compression level). Streams named in `lossless` always use PNG.
+    max_in_flight: frames submitted but not yet delivered. submit() blocks
+        (or, with block=False, drops the frame and counts it in `dropped`)
+        while the pool is full, so a slow consumer bounds memory instead of
+        queueing without limit. Default 2 * threads.
+
+    submit() returns a Future of the encoded frame. callback(encoded, meta)
+    and the futures complete in submission order. A callback runs on
+    whichever worker finishes the frame at the head of the queue, so keep it
+    short (write a file, send a message). The caller must not modify
+    submitted arrays until the frame is delivered. Frames from
+    get_current_state() are fresh arrays and need no copy.
+    """
+
+    def __init__(self, threads=None, codec="jpeg", quality=90, lossless=(),
+                 max_in_flight=None, png_compression=1):
+        if codec not in ENCODE_CODECS:
+            raise ValueError(f"Unknown codec {codec!r}. Allowed: {sorted(ENCODE_CODECS)}")
+        if not (0 <= quality <= 100):
+            raise ValueError("quality must be in [0, 100]")
+        self.threads = threads or min(os.cpu_count() or 1, 8)
+        self.codec = codec
+        self.quality = int(quality)
+        self.lossless = set(lossless)
+        self.png_compression = int(png_compression)
+        self.max_in_flight = max_in_flight or 2 * self.threads
+
+        self.submitted = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.encode_ms = 0.0        # per-stream encode cost on one worker (EMA)
+
+        self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix="encode")
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._deliver_lock = threading.Lock()
+        self._order = collections.deque()
+
+
+    def submit(self, frames, meta=None, callback=None, block=True, timeout=None):
+        """
+        Queue one frame ({stream: array}; None entries are skipped; device
+        arrays are copied to host first). Returns a Future resolving to
+        {stream: (kind, data)}, or None if the pool stayed full (block=False,
+        or timeout expired).
+        """
+        acquired = self._slots.acquire(timeout=timeout) if block else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self.dropped += 1
+            return None
+
+        frames = {name: to_host(arr) for name, arr in frames.items() if arr is not None}
+        job = _Job(meta, callback, len(frames))
+        with self._lock:
+            self.submitted += 1
+            self._order.append(job)
+        if not frames:
+            self._finish(job)
+        for name, arr in frames.items():
+            self._executor.submit(self._encode, job, name, arr)
+        return job.future
+
+
+    def encode(self, frames):
+        """Encode one frame and wait for it."""
+        return self.submit(frames).result()
+
+
+    def _encode(self, job, name, arr):
+        t0 = time.perf_counter()
+        try:
+            codec = "png" if name in self.lossless else self.codec
+            result = encode_array(arr, codec, self.quality, self.png_compression)
+            error = None
+        except Exception as e:
+            result, error = None, e
+        cost = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self.encode_ms = 0.9 * self.encode_ms + 0.1 * cost
+            if error is None:
+                job.encoded[name] = result
+            elif job.error is None:
+                job.error = error
+            job.remaining -= 1
+            last = job.remaining == 0
+        if last:
+            self._finish(job)
+
+
+    def _finish(self, job):
+        with self._lock:
+            job.done = True
+        # Whoever finishes a job delivers every completed job at the head of
+        # the queue; the deliver lock keeps two workers from interleaving.
+        with self._deliver_lock:
+            while True:
+                with self._lock:
+                    if not (self._order and self._order[0].done):
+                        break
+                    head = self._order.popleft()
+                self._deliver(head)
+
+
+    def _deliver(self, job):
+        if job.error is not None:
+            job.future.set_exception(job.error)
+        else:
+            if job.callback is not None:
+                try:
+                    job.callback(job.encoded, job.meta)
+                except Exception as e:
+                    print(f"[Encoder] callback failed: {type(e).__name__}: {e}")
+            job.future.set_result(job.encoded)
+        with self._lock:
+            self.delivered += 1
+            self._idle.notify_all()
+        self._slots.release()
+
+
+    def flush(self, timeout=None):
+        """Wait until every submitted frame is delivered (callback run, future
+        resolved). Returns False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self.delivered == self.submitted, timeout)
+
+
+    def stats(self):
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "in_flight": len(self._order),
+                "encode_ms": self.encode_ms,
+            }
+
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
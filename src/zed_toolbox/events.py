@@ -0,0 +1,297 @@
+"""
+Event bus for key presses, frames, recorder state and camera health.
+
+Publishers push events as they happen, and consumers block until one
+arrives, so an application loop needs no polling and no sleeps:
+
+    bus = system.events
+    queue = bus.queue(["frame", "key"])
+    with KeyListener(events=bus):
+        for ev in queue:                     # blocks; idle CPU ~0
+            if ev.kind == "frame":
+                system.cameras[ev.source].get_observations()
+            elif ev.data["key"] == "s":
+                system.start_recording()
+
+Event kinds published by the toolbox (ev.source is the camera serial,
+or "keyboard"):
+
+    "frame"      ZedCamera captured a frame            {"seq", "timestamp_ns"}
+    "health"     ZedCamera watchdog state changed      {"state", "previous"}
+    "recording"  Recorder started / closed a segment / stopped
+                 {"state": "started" | "segment" | "stopped", "session_dir", ...}
+    "key"        KeyListener key press                 {"key"}
+    "memory"     planner.MemoryGuard action or warning
+                 {"state", "rss_mb", "budget_mb", "available_mb", "action"}
+
+Any other kind can be published by user code. publish() costs one set
+lookup when nobody listens to the kind.
+
+Consumers:
+    bus.queue(kinds)      EventQueue: get(timeout), iteration, await aget()
+    bus.on(kinds, fn)     fn(event) on the bus's dispatcher thread
+    bus.wait(kinds)       block for the next matching event
+Queues keep only the newest pending "frame" event per camera (see
+EventQueue), so a slow consumer skips frames instead of falling behind.
+"""
+import asyncio
+import collections
+import threading
+import time
+
+
+Event = collections.namedtuple("Event", "kind source data time")
+
+COALESCED_KINDS = ("frame",)
+
+
+class EventQueue:
+    """
+    Events of the subscribed kinds (None = all), in publication order.
+
+    Events of a coalesced kind replace a pending event of the same kind and
+    source instead of queueing behind it (counted in `coalesced`); other
+    events are dropped oldest-first once maxsize are pending (counted in
+    `dropped`). Close with close() or use as a context manager.
+    """
+
+    def __init__(self, bus, kinds=None, maxsize=1024, coalesce=COALESCED_KINDS):
+        self.bus = bus
+        self.kinds = _kinds(kinds)
+        self.maxsize = maxsize
+        self.coalesce = frozenset(coalesce)
+        self._items = collections.deque()     # Event | (kind, source) key of a coalesced event
+        self._latest = {}                     # (kind, source) -> pending coalesced Event
+        self._cond = threading.Condition()
+        self._waiters = []                    # asyncio (loop, future) pairs
+        self.closed = False
+        self.coalesced = 0
+        self.dropped = 0
+
+
+    def __len__(self):
+        return len(self._items)
+
+
+    def _put(self, event):
+        with self._cond:
+            if self.closed:
+                return
+            if event.kind in self.coalesce:
+                key = (event.kind, event.source)
+                if key in self._latest:
+                    self.coalesced += 1
+                else:
+                    self._items.append(key)
+                self._latest[key] = event
+            else:
+                if len(self._items) >= self.maxsize:
+                    old = self._items.popleft()
+                    if not isinstance(old, Event):
+                        self._latest.pop(old, None)
+                    self.dropped += 1
+                self._items.append(event)
+            self._cond.notify()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+
+    def _pop(self):
+        item = self._items.popleft()
+        return item if isinstance(item, Event) else self._latest.pop(item)
+
+
+    def get(self, timeout=None):
+        """Next event; None on timeout or once the queue is closed."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self.closed, timeout):
+                return None
+            return self._pop() if self._items else None
+
+
+    def get_nowait(self):
+        with self._cond:
+            return self._pop() if self._items else None
+
+
+    async def aget(self):
+        """Await the next event; None once the queue is closed."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._items:
+                    return self._pop()
+                if self.closed:
+                    return None
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+            await future
+
+
+    def __iter__(self):
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+
+    def __aiter__(self):
+        return self
+
+
+    async def __anext__(self):
+        event = await self.aget()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+    def close(self):
+        """Unsubscribe; blocked get()/aget() calls return None."""
+        self.bus._unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _kinds(kinds):
+    if kinds is None:
+        return None
+    return frozenset([kinds] if isinstance(kinds, str) else kinds)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class EventBus:
+    """
+    Fans published events out to EventQueues and callbacks. Thread-safe;
+    publish() never blocks on a consumer. Callbacks registered with on()
+    run one at a time on a dispatcher thread owned by the bus, so a slow
+    callback delays other callbacks but never a publisher.
+    """
+
+    def __init__(self):
+        self._queues = ()               # swapped on (un)subscribe; publish() reads it unlocked
+        self._wanted = frozenset()      # kinds someone listens to; None in it = all
+        self._lock = threading.Lock()
+        self._callbacks = []            # (kinds | None, source | None, fn)
+        self._dispatch = None           # EventQueue feeding the callbacks
+
+
+    def publish(self, kind, source=None, **data):
+        wanted = self._wanted
+        if kind not in wanted and None not in wanted:
+            return
+        event = Event(kind, source, data, time.monotonic())
+        for queue in self._queues:
+            if queue.kinds is None or kind in queue.kinds:
+                queue._put(event)
+
+
+    def queue(self, kinds=None, maxsize=1024, coalesce=COALESCED_KINDS):
+        """A new EventQueue receiving the given kinds (None = all)."""
+        queue = EventQueue(self, kinds, maxsize, coalesce)
+        with self._lock:
+            self._queues += (queue,)
+            self._update_wanted()
+        return queue
+
+
+    def on(self, kinds, callback, source=None):
+        """Call callback(event) for every event of these kinds (None = all),
+        optionally only from one source. Returns a handle; handle.close()
+        unregisters."""
+        entry = (_kinds(kinds), source, callback)
+        with self._lock:
+            self._callbacks.append(entry)
+            self._update_dispatch_kinds()
+        return _Handle(self, entry)
+
+
+    def wait(self, kinds=None, timeout=None, predicate=None):
+        """Block for the next matching event published after this call;
+        None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue(kinds, coalesce=()) as queue:
+            while True:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                event = queue.get(remaining)
+                if event is None or predicate is None or predicate(event):
+                    return event
+
+
+    def _update_wanted(self):
+        wanted = set()
+        for queue in self._queues:
+            wanted |= {None} if queue.kinds is None else queue.kinds
+        self._wanted = frozenset(wanted)
+
+
+    def _update_dispatch_kinds(self):
+        """Point the dispatcher queue at every kind a callback wants (called
+        under the lock). The dispatcher thread is started with the first
+        callback and then idles in get() while there are none."""
+        kinds = set()
+        for entry_kinds, _, _ in self._callbacks:
+            if entry_kinds is None:
+                kinds = None
+                break
+            kinds |= entry_kinds
+        if self._dispatch is None:
+            self._dispatch = EventQueue(self, kinds)
+            self._queues += (self._dispatch,)
+            threading.Thread(target=self._run_callbacks, daemon=True, name="event-dispatch").start()
+        self._dispatch.kinds = None if kinds is None else frozenset(kinds)
+        self._update_wanted()
+
+
+    def _run_callbacks(self):
+        for event in self._dispatch:
+            with self._lock:
+                callbacks = list(self._callbacks)
+            for kinds, source, fn in callbacks:
+                if (kinds is None or event.kind in kinds) and (source is None or event.source == source):
+                    try:
+                        fn(event)
+                    except Exception as e:
+                        print(f"[Events] callback for {event.kind!r} failed: {type(e).__name__}: {e}")
+
+
+    def _unsubscribe(self, queue):
+        with self._lock:
+            if queue in self._queues:
+                self._queues = tuple(q for q in self._queues if q is not queue)
+                self._update_wanted()
+
+
+    def _remove_callback(self, entry):
+        with self._lock:
+            if entry in self._callbacks:
+                self._callbacks.remove(entry)
+                self._update_dispatch_kinds()
+
+
+class _Handle:
+    def __init__(self, bus, entry):
+        self._bus = bus
+        self._entry = entry
+
+
+    def close(self):
+        self._bus._remove_callback(self._entry)
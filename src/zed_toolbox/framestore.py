@@ -0,0 +1,278 @@
+"""
+Lossless frame stores for the recorded stereo pair.
+
+RecorderConfig.stereo_codec picks how cam_<last3>_left/right are saved:
+
+    "npz"   np.savez_compressed at segment close (zlib level 6, one
+            thread); loads with np.load. The default, for compatibility.
+    "none"  uncompressed frames in a .zfr file.
+    "zlib"  zlib per frame, level 0-9 (default 1).
+    "lz4"   LZ4 frame format per frame, level 0-16 (default 0, the fast
+            mode; needs `pip install lz4`).
+    "png"   one PNG per frame via OpenCV, compression 0-9 (default 1).
+
+For every codec but "npz", FrameStoreWriter compresses frames in chunks
+of chunk_frames on a thread pool *while recording* (zlib, lz4 and
+cv2.imencode release the GIL, so chunks compress in parallel), and the
+segment close only writes the finished bytes.
+
+.zfr layout (little-endian, streamable, no seeking needed to write):
+
+    b"ZFR1" | u32 n | n bytes JSON {"codec", "level", "dtype", "shape"}
+    per chunk:  b"CHNK" | u32 frames | frames x u64 length | payloads
+    b"ZEND" | u64 total frames
+
+A file without the ZEND trailer is incomplete. read_frames() handles both
+.npz and .zfr.
+"""
+import json
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .config import STEREO_LEVEL_RANGES, VALID_STEREO_CODECS
+
+
+DEFAULT_LEVELS = {"zlib": 1, "lz4": 0, "png": 1}
+
+_MAGIC = b"ZFR1"
+_CHUNK = b"CHNK"
+_END = b"ZEND"
+
+
+def file_extension(codec):
+    return "npz" if codec == "npz" else "zfr"
+
+
+def _lz4():
+    try:
+        import lz4.frame
+    except ImportError as e:
+        raise RuntimeError("stereo_codec='lz4' requires the lz4 package (pip install lz4)") from e
+    return lz4.frame
+
+
+def _encoder(codec, level):
+    """frame -> bytes for one codec."""
+    if codec == "none":
+        return lambda frame: frame.tobytes()
+    if codec == "zlib":
+        return lambda frame: zlib.compress(frame, level)
+    if codec == "lz4":
+        lz4frame = _lz4()
+        return lambda frame: lz4frame.compress(frame, compression_level=level)
+    if codec == "png":
+        import cv2
+        params = [cv2.IMWRITE_PNG_COMPRESSION, level]
+
+        def encode(frame):
+            ok, buf = cv2.imencode(".png", frame, params)
+            if not ok:
+                raise ValueError(f"PNG encoding failed for frame {frame.shape} {frame.dtype}")
+            return buf.tobytes()
+        return encode
+    raise ValueError(f"Unknown stereo codec {codec!r}. Allowed: {sorted(VALID_STEREO_CODECS - {'npz'})}")
+
+
+def _decoder(codec, dtype, shape):
+    """bytes -> frame for one codec."""
+    dtype = np.dtype(dtype)
+    if codec == "none":
+        return lambda buf: np.frombuffer(buf, dtype).reshape(shape)
+    if codec == "zlib":
+        return lambda buf: np.frombuffer(zlib.decompress(buf), dtype).reshape(shape)
+    if codec == "lz4":
+        lz4frame = _lz4()
+        return lambda buf: np.frombuffer(lz4frame.decompress(buf), dtype).reshape(shape)
+    if codec == "png":
+        import cv2
+        return lambda buf: cv2.imdecode(np.frombuffer(buf, np.uint8), cv2.IMREAD_UNCHANGED).reshape(shape)
+    raise ValueError(f"Unknown stereo codec {codec!r} in file")
+
+
+class FrameStoreWriter:
+    """
+    Collects one segment's frames for a .zfr file, compressing every
+    chunk_frames frames as a task on pool (None compresses inline). Frames
+    must all have the same shape and dtype, and must not be modified after
+    append(). write() waits for the chunks and streams the file out.
+    """
+
+    def __init__(self, codec="zlib", level=None, chunk_frames=8, pool=None):
+        if codec not in VALID_STEREO_CODECS or codec == "npz":
+            raise ValueError(f"Unknown stereo codec {codec!r}. Allowed: {sorted(VALID_STEREO_CODECS - {'npz'})}")
+        level = DEFAULT_LEVELS.get(codec) if level is None else level
+        if codec in STEREO_LEVEL_RANGES:
+            lo, hi = STEREO_LEVEL_RANGES[codec]
+            if not lo <= level <= hi:
+                raise ValueError(f"{codec} level must be in [{lo}, {hi}], got {level}")
+        self.codec = codec
+        self.level = level
+        self.chunk_frames = max(1, int(chunk_frames))
+        self._encode = _encoder(codec, level)
+        self._pool = pool
+        self._chunks = []           # Future | list[bytes], in order
+        self._pending = []
+        self._dtype = None
+        self._shape = None
+        self.frames = 0
+        self.raw_bytes = 0
+
+
+    def __len__(self):
+        return self.frames
+
+
+    def append(self, frame):
+        if self._shape is None:
+            self._dtype, self._shape = frame.dtype, frame.shape
+        elif frame.shape != self._shape or frame.dtype != self._dtype:
+            raise ValueError(f"frame {frame.shape} {frame.dtype} does not match "
+                             f"{self._shape} {self._dtype} of this segment")
+        self._pending.append(np.ascontiguousarray(frame))
+        self.frames += 1
+        self.raw_bytes += frame.nbytes
+        if len(self._pending) >= self.chunk_frames:
+            self._submit()
+
+
+    def _submit(self):
+        frames, self._pending = self._pending, []
+        if self._pool is None:
+            self._chunks.append(self._encode_chunk(frames))
+        else:
+            self._chunks.append(self._pool.submit(self._encode_chunk, frames))
+
+
+    def _encode_chunk(self, frames):
+        return [self._encode(frame) for frame in frames]
+
+
+    @property
+    def nbytes(self):
+        """Bytes held in memory: compressed chunks that are done, raw frames
+        otherwise."""
+        total = sum(f.nbytes for f in self._pending)
+        for chunk in self._chunks:
+            if isinstance(chunk, list):
+                total += sum(len(p) for p in chunk)
+            elif chunk.done() and chunk.exception() is None:
+                total += sum(len(p) for p in chunk.result())
+            else:
+                total += self.chunk_frames * self.raw_bytes // max(self.frames, 1)
+        return total
+
+
+    def write(self, f):
+        """Write the .zfr file to the binary file object f. Returns its size."""
+        if self._pending:
+            self._submit()
+        header = json.dumps({
+            "codec": self.codec,
+            "level": self.level,
+            "dtype": None if self._dtype is None else self._dtype.str,
+            "shape": None if self._shape is None else list(self._shape),
+        }).encode()
+        size = f.write(_MAGIC + struct.pack("<I", len(header)) + header) or 0
+        for chunk in self._chunks:
+            parts = chunk if isinstance(chunk, list) else chunk.result()
+            size += f.write(_CHUNK + struct.pack(f"<I{len(parts)}Q", len(parts), *map(len, parts))) or 0
+            for part in parts:
+                size += f.write(part) or 0
+        size += f.write(_END + struct.pack("<Q", self.frames)) or 0
+        self._chunks = []
+        return size
+
+
+def _read_exact(f, n):
+    buf = f.read(n)
+    if len(buf) != n:
+        raise ValueError("truncated .zfr file")
+    return buf
+
+
+def _read_header(f):
+    if _read_exact(f, 4) != _MAGIC:
+        raise ValueError("not a .zfr file")
+    (n,) = struct.unpack("<I", _read_exact(f, 4))
+    return json.loads(_read_exact(f, n))
+
+
+def _iter_chunks(f, skip=False):
+    """Yields lists of payloads (or of lengths, with skip) per chunk, then
+    checks the trailer."""
+    while True:
+        tag = _read_exact(f, 4)
+        if tag == _END:
+            return struct.unpack("<Q", _read_exact(f, 8))[0]
+        if tag != _CHUNK:
+            raise ValueError(f"corrupt .zfr chunk tag {tag!r}")
+        (count,) = struct.unpack("<I", _read_exact(f, 4))
+        lengths = struct.unpack(f"<{count}Q", _read_exact(f, 8 * count))
+        if skip:
+            f.seek(sum(lengths), 1)
+            yield lengths
+        else:
+            yield [_read_exact(f, n) for n in lengths]
+
+
+def read_frames(path):
+    """Iterate the frames of a stereo recording (.npz or .zfr)."""
+    path = Path(path)
+    if path.suffix == ".npz":
+        with np.load(path) as data:
+            arr = data["frames"]
+        yield from arr
+        return
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        decode = _decoder(header["codec"], header["dtype"], tuple(header["shape"] or ()))
+        for parts in _iter_chunks(f):
+            for part in parts:
+                yield decode(part)
+
+
+def load_frames(path, threads=4):
+    """All frames of a stereo recording as one (N, H, W, C) array; .zfr
+    files decode on `threads` threads."""
+    path = Path(path)
+    if path.suffix == ".npz":
+        with np.load(path) as data:
+            return data["frames"]
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        parts = [part for chunk in _iter_chunks(f) for part in chunk]
+    shape = tuple(header["shape"] or ())
+    decode = _decoder(header["codec"], header["dtype"], shape)
+    out = np.empty((len(parts), *shape), dtype=header["dtype"] or np.uint8)
+    if threads and threads > 1 and len(parts) > 1:
+        with ThreadPoolExecutor(threads) as pool:
+            for i, frame in enumerate(pool.map(decode, parts)):
+                out[i] = frame
+    else:
+        for i, part in enumerate(parts):
+            out[i] = decode(part)
+    return out
+
+
+def check_frames(path):
+    """Structural check of a .zfr file without decoding. Returns the frame
+    count; raises ValueError if it is truncated or corrupt."""
+    with open(path, "rb") as f:
+        _read_header(f)
+        frames = 0
+        chunks = _iter_chunks(f, skip=True)
+        while True:
+            try:
+                frames += len(next(chunks))
+            except StopIteration as stop:
+                total = stop.value
+                break
+        if total != frames:
+            raise ValueError(f"trailer says {total} frames, chunks hold {frames}")
+        if f.read(1):
+            raise ValueError("trailing data after the end marker")
+    return frames
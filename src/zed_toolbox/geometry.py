@@ -0,0 +1,111 @@
+"""
+Vectorized point cloud helpers: depth deprojection, rigid transforms and
+voxel downsampling. Pure NumPy, so they also run in worker processes
+(CameraSystem.get_fused_point_cloud(processes=N)).
+"""
+import numpy as np
+
+
+def as_transform(extrinsics):
+    """4x4 nested list / array -> float64 (4, 4) array; None -> identity."""
+    if extrinsics is None:
+        return np.eye(4)
+    T = np.asarray(extrinsics, dtype=np.float64)
+    if T.shape != (4, 4):
+        raise ValueError(f"extrinsics must be 4x4, got shape {T.shape}")
+    return T
+
+
+def invert_transform(T):
+    R, t = T[:3, :3], T[:3, 3]
+    out = np.eye(4)
+    out[:3, :3] = R.T
+    out[:3, 3] = -R.T @ t
+    return out
+
+
+def scale_intrinsics(K, size, shape):
+    """K for an image of `shape` (H, W) when K was calibrated at `size`
+    (W, H), e.g. for decimated depth."""
+    if size is None or (shape[1], shape[0]) == tuple(size):
+        return K
+    sx, sy = shape[1] / size[0], shape[0] / size[1]
+    K = np.array(K, dtype=np.float64)
+    K[0] *= sx
+    K[1] *= sy
+    return K
+
+
+def depth_to_points(depth, K, stride=1, min_depth=0.0, max_depth=None, image=None):
+    """
+    Deproject a depth map (registered to the image K belongs to) into an
+    (N, 3) float32 cloud in the camera frame; invalid (NaN, inf, <= 0) and
+    out-of-range pixels are dropped. stride samples every stride-th pixel
+    in both directions. With image (same H, W as depth), also returns the
+    (N, 3) uint8 colors of the kept pixels: (points, colors).
+    """
+    z = depth[::stride, ::stride]
+    fx, fy, cx, cy = K[0, 0], K[1, 1], K[0, 2], K[1, 2]
+    us = (np.arange(0, depth.shape[1], stride, dtype=np.float32) - cx) / fx
+    vs = (np.arange(0, depth.shape[0], stride, dtype=np.float32) - cy) / fy
+
+    valid = np.isfinite(z) & (z > min_depth)
+    if max_depth is not None:
+        valid &= z <= max_depth
+    rows, cols = np.nonzero(valid)
+    zv = z[rows, cols].astype(np.float32)
+    points = np.empty((zv.size, 3), dtype=np.float32)
+    points[:, 0] = us[cols] * zv
+    points[:, 1] = vs[rows] * zv
+    points[:, 2] = zv
+    if image is None:
+        return points
+    colors = image[::stride, ::stride][rows, cols][:, :3]
+    return points, np.ascontiguousarray(colors)
+
+
+def transform_points(points, T):
+    """Apply a 4x4 rigid transform to (N, 3) points."""
+    T = np.asarray(T, dtype=np.float32)
+    return points @ T[:3, :3].T + T[:3, 3]
+
+
+def voxel_downsample(points, voxel_size, colors=None):
+    """
+    Replace all points falling into one voxel_size cube by their centroid
+    (and mean color). Returns points, or (points, colors) with colors.
+    """
+    if len(points) == 0 or not voxel_size:
+        return points if colors is None else (points, colors)
+    cells = np.floor(points / voxel_size).astype(np.int64)
+    cells -= cells.min(axis=0)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+
+    out = _mean_by(inverse, points, counts).astype(np.float32)
+    if colors is None:
+        return out
+    return out, _mean_by(inverse, colors, counts).astype(np.uint8)
+
+
+def _mean_by(inverse, values, counts):
+    n = len(counts)
+    sums = np.stack([np.bincount(inverse, weights=values[:, i], minlength=n) for i in range(3)], axis=1)
+    return sums / counts[:, None]
+
+
+def camera_cloud(depth, K, T, stride=1, min_depth=0.0, max_depth=None, voxel_size=None, image=None):
+    """One camera's contribution to a fused cloud: deproject, move into the
+    system frame with T, and pre-downsample. Returns (points, colors|None).
+    Module-level so process pools can pickle it."""
+    if image is not None and image.shape[:2] != depth.shape[:2]:
+        image = None
+    out = depth_to_points(depth, K, stride, min_depth, max_depth, image)
+    points, colors = out if image is not None else (out, None)
+    points = transform_points(points, T)
+    if voxel_size:
+        out = voxel_downsample(points, voxel_size, colors)
+        points, colors = out if colors is not None else (out, None)
+    return points, colors
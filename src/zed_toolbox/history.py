@@ -0,0 +1,188 @@
+import threading
+
+import numpy as np
+
+
+class StreamRing:
+    """
+    Bounded history of one stream in preallocated arrays.
+
+    Frames live in a linear buffer of 2 * capacity slots. Appends fill it
+    front to back; when it is full, the newest capacity - 1 frames are
+    moved to the front. That costs one extra frame copy per append on
+    average, and in exchange the retained frames are always contiguous, so
+    every query is a plain slice (a zero-copy stacked view) and never a
+    gather.
+
+    Views returned by queries alias the buffer: each frame in a view stays
+    valid until it ages out of the history, then gets overwritten. Copy
+    what you keep longer than that.
+    """
+
+    def __init__(self, capacity, shape, dtype):
+        if capacity < 1:
+            raise ValueError("history capacity must be >= 1")
+        self.capacity = int(capacity)
+        self.frames = np.empty((2 * self.capacity, *shape), dtype=dtype)
+        self.timestamps = np.zeros(2 * self.capacity, dtype=np.int64)
+        self.seqs = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._start = 0             # first retained slot
+        self._end = 0               # one past the newest slot
+
+
+    def __len__(self):
+        return self._end - self._start
+
+
+    def append(self, frame, timestamp_ns, seq):
+        if self._end == len(self.frames):
+            keep = self.capacity - 1
+            lo = self._end - keep
+            self.frames[:keep] = self.frames[lo:self._end]
+            self.timestamps[:keep] = self.timestamps[lo:self._end]
+            self.seqs[:keep] = self.seqs[lo:self._end]
+            self._start, self._end = 0, keep
+        i = self._end
+        self.frames[i] = frame
+        self.timestamps[i] = timestamp_ns
+        self.seqs[i] = seq
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+
+    def last(self, n):
+        lo = max(self._start, self._end - n)
+        return self._slice(lo, self._end)
+
+
+    def between(self, t0_ns, t1_ns):
+        ts = self.timestamps[self._start:self._end]
+        lo = self._start + int(np.searchsorted(ts, t0_ns, side="left"))
+        hi = self._start + int(np.searchsorted(ts, t1_ns, side="right"))
+        return self._slice(lo, hi)
+
+
+    def nearest(self, timestamp_ns):
+        """(frame, timestamp_ns, seq) closest in time, or None if empty."""
+        if self._end == self._start:
+            return None
+        ts = self.timestamps[self._start:self._end]
+        j = int(np.searchsorted(ts, timestamp_ns))
+        if j == len(ts) or (j > 0 and timestamp_ns - ts[j - 1] <= ts[j] - timestamp_ns):
+            j -= 1
+        i = self._start + j
+        return self.frames[i], int(self.timestamps[i]), int(self.seqs[i])
+
+
+    def _slice(self, lo, hi):
+        return self.frames[lo:hi], self.timestamps[lo:hi], self.seqs[lo:hi]
+
+
+class FrameHistory:
+    """
+    Per-camera lookback buffer: one StreamRing per recorded stream.
+
+    Sized by frames (capacity) or by memory (budget_mb, split evenly across
+    streams and accounting for the 2x linear buffer); rings are allocated
+    from the first frame of each stream, so shapes follow the camera
+    resolution. Streams retrieved at a reduced rate (stream_rates) have
+    sparser rings; each query reports the timestamps and seqs it returns.
+
+    Queries return zero-copy views (see StreamRing):
+        last(stream, n)           -> (frames[n, ...], timestamps_ns[n], seqs[n])
+        between(stream, t0, t1)   -> same, for timestamps in [t0, t1] (ns)
+        nearest(stream, t)        -> (frame, timestamp_ns, seq) or None
+    """
+
+    def __init__(self, streams, capacity=None, budget_mb=None):
+        if (capacity is None) == (budget_mb is None):
+            raise ValueError("FrameHistory needs exactly one of capacity / budget_mb")
+        self.streams = list(streams)
+        self.capacity = capacity
+        self.budget_mb = budget_mb
+        self._rings = {}
+        self._lock = threading.Lock()
+
+
+    def append(self, frames, timestamp_ns, seq):
+        """Copy the history streams present in frames into their rings."""
+        with self._lock:
+            for name in self.streams:
+                frame = frames.get(name)
+                if frame is None:
+                    continue
+                ring = self._rings.get(name)
+                if ring is None:
+                    ring = self._rings[name] = StreamRing(self._capacity_for(frame), frame.shape, frame.dtype)
+                ring.append(frame, timestamp_ns, seq)
+
+
+    def _capacity_for(self, frame):
+        if self.capacity is not None:
+            return self.capacity
+        per_stream = self.budget_mb * 1024 * 1024 / len(self.streams)
+        return max(1, int(per_stream // (2 * frame.nbytes)))
+
+
+    def last(self, stream, n):
+        with self._lock:
+            ring = self._ring(stream)
+            return ring.last(n) if ring is not None else _empty()
+
+
+    def between(self, stream, t0_ns, t1_ns):
+        with self._lock:
+            ring = self._ring(stream)
+            return ring.between(t0_ns, t1_ns) if ring is not None else _empty()
+
+
+    def nearest(self, stream, timestamp_ns):
+        with self._lock:
+            ring = self._ring(stream)
+            return ring.nearest(timestamp_ns) if ring is not None else None
+
+
+    def span(self, stream):
+        """(oldest, newest) retained timestamp_ns of a stream, or None."""
+        with self._lock:
+            ring = self._ring(stream)
+            if ring is None or not len(ring):
+                return None
+            ts = ring.last(ring.capacity)[1]
+            return int(ts[0]), int(ts[-1])
+
+
+    def _ring(self, stream):
+        if stream not in self.streams:
+            raise ValueError(f"Stream {stream!r} is not recorded in history. Recorded: {self.streams}")
+        return self._rings.get(stream)
+
+
+def _empty():
+    return None, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+
+def align_nearest(histories, stream, timestamp_ns=None, tolerance_ns=None):
+    """
+    Pick, from each camera's history, the frame nearest to one timestamp.
+
+    histories: {serial: FrameHistory}. timestamp_ns defaults to the newest
+    time every camera has reached (the minimum of their newest timestamps),
+    so the result never waits on a lagging camera. With tolerance_ns, a
+    camera whose nearest frame is further away maps to None.
+
+    Returns {serial: (frame, timestamp_ns, seq) | None}.
+    """
+    if timestamp_ns is None:
+        newest = [span[1] for span in (h.span(stream) for h in histories.values()) if span]
+        if not newest:
+            return {serial: None for serial in histories}
+        timestamp_ns = min(newest)
+    out = {}
+    for serial, history in histories.items():
+        hit = history.nearest(stream, timestamp_ns)
+        if hit is not None and tolerance_ns is not None and abs(hit[1] - timestamp_ns) > tolerance_ns:
+            hit = None
+        out[serial] = hit
+    return out
@@ -0,0 +1,143 @@
+import json
+import os
+import time
+
+
+# Recorder output id -> (stream, extension). File names are built by
+# output_filename() so the Recorder and recovery agree on them. The stereo
+# outputs keep their "_npz" ids but are .zfr files with a chunked
+# stereo_codec (see framestore.py).
+OUTPUT_FILES = {
+    "left_mp4": ("left", "mp4"),
+    "overlay_mp4": ("overlay", "mp4"),
+    "depth_mp4": ("depth", "mp4"),
+    "left_npz": ("left", "npz"),
+    "right_npz": ("right", "npz"),
+}
+
+
+STEREO_EXTENSIONS = ("npz", "zfr")
+
+
+def output_filename(last3, output, segment=0, ext=None):
+    """cam_<last3>_<stream>.<ext> for segment 0, cam_<last3>_<stream>_<NNNN>.<ext>
+    for later segments, so unsegmented sessions keep the original names."""
+    stream, default_ext = OUTPUT_FILES[output]
+    suffix = f"_{segment:04d}" if segment else ""
+    return f"cam_{last3}_{stream}{suffix}.{ext or default_ext}"
+
+
+def find_output(session, last3, output, segment=0):
+    """Path of an output's file in a session, whichever stereo format it was
+    written in; None if it doesn't exist."""
+    exts = STEREO_EXTENSIONS if output.endswith("_npz") else (None,)
+    for ext in exts:
+        path = session / output_filename(last3, output, segment, ext)
+        if path.exists():
+            return path
+    return None
+
+
+class SessionManifest:
+    """
+    Append-only, line-delimited JSON log of one camera's recording session.
+
+    Every event is written and flushed as soon as it happens, and fsynced at
+    most every sync_interval seconds (always on segment close and at the
+    end), so after a crash the manifest describes everything that reached
+    the disk. recovery.recover_session() replays it. With io (a
+    diskio.IOSession), the periodic fsyncs join the session's batch instead.
+
+    Events:
+        {"event": "session", "serial", "config", "calibration", "time"}
+        {"event": "resume", "segment", "frame", "time"}
+        {"event": "segment_open", "segment", "time"}
+        {"event": "frame", "frame", "segment", "seq", "timestamp_ns", "outputs"}
+        {"event": "segment_close", "segment", "frames", "files": {name: bytes}, "time"}
+        {"event": "recovered", ...}  (appended by recovery)
+        {"event": "end", "frames", "time"}
+    """
+
+    def __init__(self, path, sync_interval=1.0, append=False, io=None):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.io = io
+        self._f = open(path, "a" if append else "w")
+        self._last_sync = time.monotonic()
+        if io is not None:
+            io.track(path)
+
+
+    def write(self, event, **fields):
+        self._f.write(json.dumps({"event": event, **fields}, default=_to_json) + "\n")
+        self._f.flush()
+        if self.io is None and time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+
+    def sync(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._last_sync = time.monotonic()
+
+
+    def close(self):
+        if self._f is not None:
+            self.sync()
+            self._f.close()
+            self._f = None
+            if self.io is not None:
+                self.io.untrack(self.path)
+
+
+def read_manifest(path):
+    """
+    Parse a manifest. Returns (events, good_bytes): the decoded events up to
+    the first torn or corrupt line, and the byte length of that valid
+    prefix (a crash mid-write leaves a partial last line).
+    """
+    events = []
+    good_bytes = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+            good_bytes += len(line)
+    return events, good_bytes
+
+
+def _to_json(obj):
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def segment_sources(session, cam, segment):
+    """{output: frame iterator} for the files of one recorded segment."""
+    import cv2
+
+    from .framestore import read_frames
+
+    def mp4_frames(path):
+        cap = cv2.VideoCapture(str(path))
+        try:
+            while True:
+                ok, img = cap.read()
+                if not ok:
+                    return
+                yield img
+        finally:
+            cap.release()
+
+    sources = {}
+    for output in OUTPUT_FILES:
+        path = find_output(session, cam, output, segment)
+        if path is not None:
+            sources[output] = mp4_frames(path) if path.suffix == ".mp4" else read_frames(path)
+    return sources
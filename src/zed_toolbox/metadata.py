@@ -0,0 +1,296 @@
+"""
+Per-frame capture metadata: timestamps, exposure/gain and IMU.
+
+The capture thread reads one SensorRow per grab (ZedConfig.metadata). It
+publishes the row with the frame (meta["sensors"]) and appends it to a
+MetadataLog, a ring of preallocated column arrays (one array per field,
+not one dict per frame). The Recorder appends the rows of the frames it
+saves to cam_<last3>_metadata.zmd, a columnar sidecar keyed by frame
+index. read_metadata() loads it as a MetadataTable for joins by frame
+index or by time.
+
+Fields (missing values are -1 for integers, NaN for floats):
+
+    seq, timestamp_ns   camera grab counter and SDK image timestamp
+    host_ns             host wall clock (time.time_ns()) when grab() returned
+    exposure, gain      settings in effect, [0, 100]
+    imu_timestamp_ns    timestamp of the IMU sample
+    accel               linear acceleration (3,), m/s^2
+    gyro                angular velocity (3,), deg/s
+    orientation         IMU orientation quaternion (4,), x, y, z, w
+
+.zmd layout (little-endian, append-only):
+
+    b"ZMD1" | u32 n | n bytes JSON {"columns": [[name, dtype, shape], ...]}
+    per row group:  b"ROWS" | u32 rows | each column's rows, in schema order
+
+A torn last row group (crash while writing) is ignored by the reader and
+cut off by repair_metadata().
+"""
+import collections
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+
+SENSOR_FIELDS = {
+    "seq": (np.int64, ()),
+    "timestamp_ns": (np.int64, ()),
+    "host_ns": (np.int64, ()),
+    "exposure": (np.float32, ()),
+    "gain": (np.float32, ()),
+    "imu_timestamp_ns": (np.int64, ()),
+    "accel": (np.float32, (3,)),
+    "gyro": (np.float32, (3,)),
+    "orientation": (np.float32, (4,)),
+}
+RECORD_FIELDS = {"frame": (np.int64, ()), "segment": (np.int32, ()), **SENSOR_FIELDS}
+
+SensorRow = collections.namedtuple("SensorRow", SENSOR_FIELDS)
+
+_MAGIC = b"ZMD1"
+_ROWS = b"ROWS"
+
+
+def empty_row(seq=None, timestamp_ns=None):
+    """A SensorRow with only the frame identity filled in."""
+    nan3, nan4 = (np.nan,) * 3, (np.nan,) * 4
+    return SensorRow(-1 if seq is None else seq, -1 if timestamp_ns is None else timestamp_ns,
+                     -1, np.nan, np.nan, -1, nan3, nan3, nan4)
+
+
+def _allocate(fields, rows):
+    return {name: np.empty((rows, *shape), dtype=dtype) for name, (dtype, shape) in fields.items()}
+
+
+class MetadataLog:
+    """
+    The last `capacity` SensorRows of a camera, in preallocated columns.
+
+    Like history.StreamRing, rows live in a linear buffer of 2 * capacity
+    slots and the retained ones are moved to the front when it fills, so
+    queries are plain slices. Queries return copies ({field: array}), safe
+    to keep while the capture thread appends.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("metadata capacity must be >= 1")
+        self.capacity = int(capacity)
+        self.columns = _allocate(SENSOR_FIELDS, 2 * self.capacity)
+        self._start = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+
+    def __len__(self):
+        return self._end - self._start
+
+
+    def append(self, row):
+        with self._lock:
+            if self._end == 2 * self.capacity:
+                keep = self.capacity - 1
+                lo = self._end - keep
+                for col in self.columns.values():
+                    col[:keep] = col[lo:self._end]
+                self._start, self._end = 0, keep
+            i = self._end
+            for col, value in zip(self.columns.values(), row):
+                col[i] = value
+            self._end += 1
+            if self._end - self._start > self.capacity:
+                self._start += 1
+
+
+    def last(self, n):
+        with self._lock:
+            return self._slice(max(self._start, self._end - n), self._end)
+
+
+    def between(self, t0_ns, t1_ns):
+        """Rows with an image timestamp in [t0_ns, t1_ns]."""
+        with self._lock:
+            ts = self.columns["timestamp_ns"][self._start:self._end]
+            lo = self._start + int(np.searchsorted(ts, t0_ns, side="left"))
+            hi = self._start + int(np.searchsorted(ts, t1_ns, side="right"))
+            return self._slice(lo, hi)
+
+
+    def _slice(self, lo, hi):
+        return {name: col[lo:hi].copy() for name, col in self.columns.items()}
+
+
+class MetadataWriter:
+    """
+    Appends (frame, segment, SensorRow) records to a .zmd file. Rows are
+    collected in preallocated columns and written as one row group every
+    group_rows rows and on flush(). append=True continues an existing file
+    (a resumed session); its schema must match.
+    """
+
+    def __init__(self, path, append=False, group_rows=64):
+        self.path = str(path)
+        self.group_rows = max(1, int(group_rows))
+        self._columns = _allocate(RECORD_FIELDS, self.group_rows)
+        self._n = 0
+        self.rows = 0
+        exists = append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        if exists:
+            with open(self.path, "rb") as f:
+                if _read_schema(f) != _schema(RECORD_FIELDS):
+                    raise ValueError(f"{self.path} has a different metadata schema")
+        self._file = open(self.path, "ab" if exists else "wb")
+        if not exists:
+            header = json.dumps({"columns": _schema(RECORD_FIELDS)}).encode()
+            self._file.write(_MAGIC + struct.pack("<I", len(header)) + header)
+
+
+    def append(self, frame, segment, row):
+        i = self._n
+        self._columns["frame"][i] = frame
+        self._columns["segment"][i] = segment
+        for name, value in zip(SENSOR_FIELDS, row):
+            self._columns[name][i] = value
+        self._n += 1
+        self.rows += 1
+        if self._n == self.group_rows:
+            self.flush()
+
+
+    def flush(self):
+        """Write the collected rows as one row group."""
+        if self._n:
+            parts = [_ROWS + struct.pack("<I", self._n)]
+            parts += [col[:self._n].tobytes() for col in self._columns.values()]
+            self._file.write(b"".join(parts))
+            self._n = 0
+        self._file.flush()
+
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+class MetadataTable:
+    """
+    The metadata of one recording, as {field: array} columns sorted by
+    frame index. Joins are vectorized binary searches:
+
+        table.index_of(frames)        -> row per frame index (-1 = no row)
+        table.take(frames)            -> {field: array} aligned to frames
+        table.frames_near(times_ns)   -> frame index nearest to each time
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+
+    def __len__(self):
+        return len(self.columns["frame"])
+
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+
+    def index_of(self, frames):
+        frames = np.atleast_1d(np.asarray(frames, dtype=np.int64))
+        col = self.columns["frame"]
+        idx = np.searchsorted(col, frames)
+        found = idx < len(col)
+        found[found] = col[idx[found]] == frames[found]
+        return np.where(found, idx, -1)
+
+
+    def take(self, frames):
+        """Metadata of these frame indices; KeyError if one has no row."""
+        idx = self.index_of(frames)
+        if (idx < 0).any():
+            missing = np.atleast_1d(frames)[idx < 0]
+            raise KeyError(f"no metadata for frame(s) {missing[:10].tolist()}")
+        return {name: col[idx] for name, col in self.columns.items()}
+
+
+    def frames_near(self, times_ns, clock="timestamp_ns"):
+        """Frame index whose `clock` ("timestamp_ns" or "host_ns") is
+        nearest to each of times_ns, e.g. to align robot log entries."""
+        ts = self.columns[clock]
+        if not len(ts):
+            raise ValueError("metadata table is empty")
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        times = np.asarray(times_ns, dtype=np.int64)
+        j = np.clip(np.searchsorted(ts, times), 1, max(len(ts) - 1, 1))
+        left = ts[j - 1]
+        right = ts[np.minimum(j, len(ts) - 1)]
+        j = np.where(times - left <= right - times, j - 1, j)
+        return self.columns["frame"][order[np.minimum(j, len(ts) - 1)]]
+
+
+def _schema(fields):
+    return [[name, np.dtype(dtype).str, list(shape)] for name, (dtype, shape) in fields.items()]
+
+
+def _read_schema(f):
+    head = f.read(8)
+    if len(head) < 8 or head[:4] != _MAGIC:
+        raise ValueError("not a .zmd metadata file")
+    (n,) = struct.unpack("<I", head[4:])
+    header = f.read(n)
+    if len(header) != n:
+        raise ValueError("truncated .zmd header")
+    return json.loads(header)["columns"]
+
+
+def _scan(f, schema):
+    """Yields (offset after the group, rows, {name: bytes}) per complete row
+    group; stops at the first torn one."""
+    sizes = [(name, np.dtype(dtype).itemsize * int(np.prod(shape))) for name, dtype, shape in schema]
+    while True:
+        head = f.read(8)
+        if len(head) < 8 or head[:4] != _ROWS:
+            return
+        (rows,) = struct.unpack("<I", head[4:])
+        data = {}
+        for name, size in sizes:
+            buf = f.read(rows * size)
+            if len(buf) != rows * size:
+                return
+            data[name] = buf
+        yield f.tell(), rows, data
+
+
+def read_metadata(path):
+    """Load a .zmd sidecar as a MetadataTable (complete row groups only)."""
+    with open(path, "rb") as f:
+        schema = _read_schema(f)
+        groups = [data for _, _, data in _scan(f, schema)]
+    columns = {}
+    for name, dtype, shape in schema:
+        buf = b"".join(g[name] for g in groups)
+        columns[name] = np.frombuffer(buf, dtype=dtype).reshape(-1, *shape)
+    order = np.argsort(columns["frame"], kind="stable")
+    if (order != np.arange(len(order))).any():
+        columns = {name: col[order] for name, col in columns.items()}
+    return MetadataTable(columns)
+
+
+def repair_metadata(path, repair=True):
+    """(rows, torn bytes) of a .zmd file; with repair, cut the torn tail so
+    appending can continue."""
+    with open(path, "rb") as f:
+        schema = _read_schema(f)
+        good, rows = f.tell(), 0
+        for end, n, _ in _scan(f, schema):
+            good, rows = end, rows + n
+    torn = os.path.getsize(path) - good
+    if torn and repair:
+        os.truncate(path, good)
+    return rows, torn
@@ -0,0 +1,213 @@
+import cv2
+import numpy as np
+
+
+class OverlayRenderer:
+    """
+    Renders overlays onto a frame into a reusable buffer.
+
+    One renderer is shared by a Camera's Viewer and Recorder: render() keeps
+    the last (image, overlays) pair and returns the cached result when both
+    are the same objects, so a tick that feeds both sinks renders once. Pass
+    a new overlays list when its contents change (the cache compares object
+    identity, not contents).
+
+    The returned buffer is reused by the next render(); copy it if you need
+    to keep it.
+
+    Static overlays (set_static) are rasterized once per frame size and
+    composited with a masked copy instead of being redrawn every frame.
+
+    Overlay dicts (all coordinates are pixels, colors BGR):
+        {"type": "dot",    "xy": (x, y), "radius": 6, "color": (0, 255, 0)}
+        {"type": "points", "xy": ndarray (N, 2), "radius": 2,
+                           "color": (0, 255, 0) or ndarray (N, 3)}
+        {"type": "text",   "content": "label", "position": (x, y),
+                           "color": (0, 0, 255), "scale": 1, "thickness": 3}
+        {"type": "box",    "xyxy": (x0, y0, x1, y1), "color": (0, 255, 0),
+                           "thickness": 2}            # -1 fills
+        {"type": "line",   "xy": [(x, y), ...], "color": (255, 0, 0),
+                           "thickness": 2, "closed": False}
+        {"type": "mask",   "mask": ndarray (H, W) bool, "color": (0, 0, 255),
+                           "alpha": 0.5}
+    """
+
+    def __init__(self):
+        self._buffer = None
+        self._last_image = None
+        self._last_overlays = None
+
+        self._static = []
+        self._static_cache = None   # (shape, layer, mask, blends)
+
+
+    def set_static(self, overlays):
+        """Overlays drawn under the per-frame ones on every render."""
+        self._static = list(overlays or [])
+        self._static_cache = None
+        self._last_image = None
+
+
+    def fork(self):
+        """A renderer with the same static overlays and its own buffer, for
+        rendering on another thread while this one is in use."""
+        other = OverlayRenderer()
+        other._static = self._static
+        other._static_cache = self._static_cache
+        return other
+
+
+    def fork(self):
+        """A renderer with the same static overlays and its own buffer, for
+        rendering on another thread while this one is in use."""
+        other = OverlayRenderer()
+        other._static = self._static
+        other._static_cache = self._static_cache
+        return other
+
+
+    def has_overlays(self, overlays=None):
+        """Whether render() would draw anything (per-frame or static)."""
+        return bool(overlays) or bool(self._static)
+
+
+    def render(self, image, overlays=None):
+        if image is self._last_image and overlays is self._last_overlays:
+            return self._buffer
+
+        if self._buffer is None or self._buffer.shape != image.shape:
+            self._buffer = np.empty_like(image)
+        np.copyto(self._buffer, image)
+
+        if self._static:
+            self._composite_static(self._buffer)
+        for item in overlays or ():
+            draw_item(self._buffer, item)
+
+        self._last_image = image
+        self._last_overlays = overlays
+        return self._buffer
+
+
+    def _composite_static(self, buf):
+        if self._static_cache is None or self._static_cache[0] != buf.shape:
+            self._static_cache = self._rasterize_static(buf.shape)
+        _, layer, mask, blends = self._static_cache
+        np.copyto(buf, layer, where=mask[..., None])
+        for y0, y1, x0, x1, alpha, color in blends:
+            _blend(buf[y0:y1, x0:x1], alpha, color)
+
+
+    def _rasterize_static(self, shape):
+        layer = np.zeros(shape, dtype=np.uint8)
+        mask = np.zeros(shape[:2], dtype=np.uint8)
+        blends = []
+        for item in self._static:
+            if item["type"] == "mask":
+                blend = _mask_blend(item, shape)
+                if blend is not None:
+                    blends.append(blend)
+                continue
+            draw_item(layer, item)
+            draw_item(mask, {**item, "color": 255})
+        return shape, layer, mask.astype(bool), blends
+
+
+def draw_item(buf, item):
+    """Draw one overlay dict onto buf in place."""
+    kind = item["type"]
+    color = item.get("color")
+    if kind == "dot" and item.get("xy") is not None:
+        cv2.circle(
+            buf,
+            (int(item["xy"][0]), int(item["xy"][1])),
+            item.get("radius", 6),
+            color if color is not None else (0, 255, 0),
+            -1,
+        )
+    elif kind == "points":
+        draw_points(buf, item["xy"], item.get("radius", 2),
+                    color if color is not None else (0, 255, 0))
+    elif kind == "text":
+        cv2.putText(
+            buf,
+            text=item.get("content", item.get("text", "")),
+            org=tuple(int(v) for v in item.get("position", [50, 50])),
+            color=color if color is not None else (0, 0, 255),
+            fontFace=cv2.FONT_HERSHEY_SIMPLEX,
+            fontScale=item.get("scale", 1),
+            thickness=item.get("thickness", 3),
+        )
+    elif kind == "box":
+        x0, y0, x1, y1 = (int(v) for v in item["xyxy"])
+        cv2.rectangle(buf, (x0, y0), (x1, y1),
+                      color if color is not None else (0, 255, 0),
+                      item.get("thickness", 2))
+    elif kind == "line":
+        pts = np.asarray(item["xy"], dtype=np.int32).reshape(-1, 1, 2)
+        cv2.polylines(buf, [pts], bool(item.get("closed", False)),
+                      color if color is not None else (255, 0, 0),
+                      item.get("thickness", 2))
+    elif kind == "mask":
+        blend = _mask_blend(item, buf.shape)
+        if blend is not None:
+            y0, y1, x0, x1, alpha, color = blend
+            _blend(buf[y0:y1, x0:x1], alpha, color)
+
+
+_disk_offsets = {}
+
+
+def draw_points(buf, xy, radius, color):
+    """
+    Stamp N filled disks in one vectorized scatter.
+
+    xy: (N, 2) pixel coordinates. color: one BGR triple, or (N, C) per-point
+    colors. Points (or disk pixels) outside the image are clipped.
+    """
+    xy = np.asarray(xy)
+    if xy.size == 0:
+        return
+    xy = np.rint(xy).astype(np.intp).reshape(-1, 2)
+
+    offsets = _disk_offsets.get(radius)
+    if offsets is None:
+        r = int(radius)
+        dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+        inside = dx * dx + dy * dy <= r * r
+        offsets = (dy[inside], dx[inside])
+        _disk_offsets[radius] = offsets
+    dy, dx = offsets
+
+    ys = (xy[:, 1, None] + dy[None, :]).ravel()
+    xs = (xy[:, 0, None] + dx[None, :]).ravel()
+    h, w = buf.shape[:2]
+    valid = (ys >= 0) & (ys < h) & (xs >= 0) & (xs < w)
+
+    color = np.asarray(color, dtype=buf.dtype)
+    if color.ndim == 2:
+        color = np.repeat(color, len(dy), axis=0)[valid]
+    buf[ys[valid], xs[valid]] = color
+
+
+def _mask_blend(item, shape):
+    """Crop a mask overlay to its bounding box -> (y0, y1, x0, x1, alpha, color),
+    or None if the mask is empty."""
+    mask = np.asarray(item["mask"])
+    if mask.shape[:2] != tuple(shape[:2]):
+        raise ValueError(f"mask shape {mask.shape[:2]} does not match frame {tuple(shape[:2])}")
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if rows.size == 0:
+        return None
+    y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    crop = mask[y0:y1, x0:x1].astype(np.float32)
+    if mask.dtype == np.uint8:
+        crop /= 255.0
+    alpha = crop * float(item.get("alpha", 0.5))
+    color = np.asarray(item.get("color", (0, 0, 255)), dtype=np.float32)
+    return y0, y1, x0, x1, alpha[..., None], color
+
+
+def _blend(region, alpha, color):
+    region[...] = (region * (1.0 - alpha) + color * alpha).astype(region.dtype)
@@ -0,0 +1,329 @@
+"""
+Memory and bandwidth planning for a CameraSystem, before and during a run.
+
+plan_system(configs) estimates, from the configs alone (no SDK import),
+what every camera will hold in RAM and move per second:
+
+    sdk          the two SDK Mats per retrieved stream (BGRA / float32)
+    frames       published snapshot arrays (current + one held by readers)
+    history      FrameHistory rings (2x linear buffer)
+    filters      depth filter temporaries
+    viewer       rendered panels plus the hstack canvas
+    preroll      pre-roll ring at its codec's typical size
+    recorder     stereo frames buffered per segment (npz holds them raw,
+                 and np.stack doubles that at segment close; chunked
+                 codecs hold them compressed)
+    io_queue     the I/O scheduler's queue limit
+
+A recorder with no segment_seconds / segment_mb buffers without bound;
+its growth is reported in growth_mb_s instead. copy_mb_s is host memcpy
+traffic (SDK copies + recorder copies), compress_mb_s the raw stereo
+bytes going into compression, disk_mb_s the expected write rate.
+Compression ratios are typical-scene guesses (see STEREO_RATIOS);
+scripts/bench_stereo_codecs.py measures them on your frames.
+
+MemoryGuard enforces CameraSystem(memory_budget_mb=...) at runtime: over
+budget it closes the segment of the recorder buffering the most (its
+frames go to disk), and if that is not enough it stops retrieving
+streams no viewer or recorder consumes. It also warns when the host runs
+low on available memory.
+"""
+import os
+import threading
+import time
+
+from .config import CameraConfig, VALID_RECORD_STREAMS
+
+
+RESOLUTION_SIZES = {"HD720": (1280, 720), "HD1080": (1920, 1080), "HD2K": (2208, 1242), "AUTO": (1280, 720)}
+
+# stream -> (bytes per pixel in the SDK Mat, bytes per pixel after copy_frame)
+STREAM_BYTES = {
+    "left": (4, 3),
+    "right": (4, 3),
+    "depth": (4, 4),
+    "confidence": (4, 4),
+    "point_cloud": (16, 12),
+    "normals": (16, 12),
+}
+
+# Compressed / raw size of camera images, typical indoor scenes.
+STEREO_RATIOS = {"npz": 0.25, "none": 1.0, "zlib": 0.3, "lz4": 0.5, "png": 0.22}
+PREROLL_RATIOS = {"raw": 1.0, "png": 0.3, "jpeg": 0.07}
+MP4_BYTES_PER_PIXEL = 0.009     # ~5 MB/min at 10 fps HD720
+
+MB = 1e6
+
+
+def plan_camera(config):
+    """Estimate for one CameraConfig (or dict). See the module docstring
+    for the keys."""
+    if isinstance(config, dict):
+        config = CameraConfig(**config)
+    zed, viewer, rec = config.zed, config.viewer, config.recorder
+    w, h = RESOLUTION_SIZES[zed.resolution]
+    px = w * h
+    frame = {name: px * STREAM_BYTES[name][1] for name in zed.streams}
+    host = zed.memory == "cpu"
+
+    memory = dict.fromkeys(("sdk", "frames", "history", "filters", "viewer", "preroll", "recorder", "io_queue"), 0.0)
+    device = 0.0
+    sdk = sum(2 * px * STREAM_BYTES[name][0] for name in zed.streams)
+    published = 2 * sum(frame.values())
+    if "depth" in zed.streams and zed.depth_filters:
+        published += 2 * frame["depth"]
+    if host:
+        memory["sdk"], memory["frames"] = sdk, published
+    else:
+        device = sdk + published
+
+    if zed.history_mb is not None:
+        memory["history"] = zed.history_mb * MB
+    elif zed.history_frames is not None:
+        memory["history"] = sum(2 * zed.history_frames * frame[name]
+                                for name in zed.history_streams or zed.streams)
+    if zed.depth_filters:
+        memory["filters"] = (2 + max(zed.depth_filter_threads, 1)) * frame["depth"]
+    if viewer is not None:
+        shown = [name for name in viewer.show if name in zed.streams or name == "depth_filtered"]
+        memory["viewer"] = 2 * len(shown) * px * 3
+
+    notes = []
+    growth = copy = compress = disk = 0.0
+    retrieved = sum(px * STREAM_BYTES[name][0] for name in zed.streams)
+    copy += zed.fps * retrieved if host and not zed.copy_on_read else 0.0
+    segment_mb = None
+    if rec is not None:
+        recorded = [name for name in rec.streams if name in zed.streams and name in VALID_RECORD_STREAMS]
+        stereo = [name for name in ("left", "right") if name in recorded and "right" in recorded]
+        stereo_frame = sum(px * 3 for _ in stereo)
+        held = 1.0 if rec.stereo_codec == "npz" else STEREO_RATIOS[rec.stereo_codec]
+        per_second = rec.fps * stereo_frame
+        copy += per_second
+        compress = per_second if rec.stereo_codec != "none" else 0.0
+        mp4s = [name for name in ("left", "depth") if name in recorded]
+        if "left" in recorded and rec.save_with_overlays:
+            mp4s.append("overlay")
+        disk = per_second * STEREO_RATIOS[rec.stereo_codec] + rec.fps * len(mp4s) * px * MP4_BYTES_PER_PIXEL
+
+        if stereo:
+            bounds = []
+            if rec.segment_seconds is not None:
+                bounds.append(per_second * held * rec.segment_seconds)
+            if rec.segment_mb is not None:
+                bounds.append(rec.segment_mb * MB)
+            if bounds:
+                buffered = min(bounds)
+                segment_mb = buffered / MB
+                # np.stack copies the whole segment before compressing it.
+                memory["recorder"] = 2 * buffered if rec.stereo_codec == "npz" else buffered
+            else:
+                growth = per_second * held
+                notes.append(f"recorder buffers ~{growth * 60 / MB:.0f} MB per minute without bound; "
+                             f"set segment_seconds or segment_mb")
+            if rec.io_scheduler:
+                memory["io_queue"] = rec.io_max_queued_mb * MB
+        if rec.preroll_seconds > 0:
+            per_frame = 0.0
+            for name in recorded:
+                ratio = PREROLL_RATIOS[rec.preroll_codec]
+                if name in stereo and rec.preroll_codec == "jpeg":
+                    ratio = PREROLL_RATIOS["png"]       # the stereo pair stays lossless
+                if name == "depth" and rec.preroll_codec != "raw":
+                    per_frame += px * 2                  # float16
+                else:
+                    per_frame += frame.get(name, 0) * ratio
+            memory["preroll"] = rec.preroll_seconds * rec.fps * per_frame
+
+    return {
+        "resolution": (w, h),
+        "memory_mb": {k: round(v / MB, 1) for k, v in memory.items()},
+        "total_mb": round(sum(memory.values()) / MB, 1),
+        "device_mb": round(device / MB, 1),
+        "segment_mb": None if segment_mb is None else round(segment_mb, 1),
+        "growth_mb_s": round(growth / MB, 2),
+        "copy_mb_s": round(copy / MB, 1),
+        "compress_mb_s": round(compress / MB, 1),
+        "disk_mb_s": round(disk / MB, 1),
+        "notes": notes,
+    }
+
+
+def plan_system(configs, memory_budget_mb=None):
+    """
+    plan_camera() for {serial: CameraConfig} plus totals, the host's memory
+    and warnings: unbounded recorders, a total over memory_budget_mb, or a
+    total above 80% of the memory currently available.
+    """
+    cameras = {serial: plan_camera(cfg) for serial, cfg in configs.items()}
+    total = {key: round(sum(p[key] for p in cameras.values()), 1)
+             for key in ("total_mb", "device_mb", "growth_mb_s", "copy_mb_s", "compress_mb_s", "disk_mb_s")}
+    host_total, available = host_memory()
+    warnings = [f"camera {serial}: {note}" for serial, p in cameras.items() for note in p["notes"]]
+    if memory_budget_mb is not None and total["total_mb"] > memory_budget_mb:
+        warnings.append(f"expected {total['total_mb']:.0f} MB exceeds the memory budget of {memory_budget_mb:.0f} MB")
+    if available is not None and total["total_mb"] > 0.8 * available:
+        warnings.append(f"expected {total['total_mb']:.0f} MB is over 80% of the "
+                        f"{available:.0f} MB the host has available")
+    return {
+        "cameras": cameras,
+        **total,
+        "budget_mb": memory_budget_mb,
+        "host_total_mb": host_total,
+        "host_available_mb": available,
+        "warnings": warnings,
+    }
+
+
+def format_plan(plan):
+    """Text table of a plan_system() result."""
+    parts = ("sdk", "frames", "history", "filters", "viewer", "preroll", "recorder", "io_queue")
+    lines = [f"{'camera':<12}" + "".join(f"{p:>9}" for p in parts) + f"{'total MB':>10}{'grow MB/s':>10}"
+             f"{'copy MB/s':>10}{'disk MB/s':>10}"]
+    for serial, p in plan["cameras"].items():
+        lines.append(f"{str(serial):<12}" + "".join(f"{p['memory_mb'][k]:9.0f}" for k in parts)
+                     + f"{p['total_mb']:10.0f}{p['growth_mb_s']:10.1f}{p['copy_mb_s']:10.0f}{p['disk_mb_s']:10.1f}")
+    lines.append(f"{'all':<12}" + " " * 9 * len(parts) + f"{plan['total_mb']:10.0f}{plan['growth_mb_s']:10.1f}"
+                 f"{plan['copy_mb_s']:10.0f}{plan['disk_mb_s']:10.1f}")
+    if plan["device_mb"]:
+        lines.append(f"GPU memory: {plan['device_mb']:.0f} MB")
+    if plan["host_available_mb"] is not None:
+        lines.append(f"host: {plan['host_available_mb']:.0f} of {plan['host_total_mb']:.0f} MB available")
+    lines += [f"WARNING: {w}" for w in plan["warnings"]]
+    return "\n".join(lines)
+
+
+def host_memory():
+    """(total MB, available MB) of the host; None where unknown."""
+    try:
+        with open("/proc/meminfo") as f:
+            info = {line.split(":")[0]: int(line.split()[1]) for line in f}
+        return info["MemTotal"] / 1e3, info.get("MemAvailable", info.get("MemFree", 0)) / 1e3
+    except (OSError, KeyError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / MB, None
+    except (ValueError, OSError, AttributeError):
+        return None, None
+
+
+def process_rss_mb():
+    """Resident memory of this process in MB (None where unknown)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / MB
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e3 if os.uname().sysname == "Linux" else peak / MB
+    except (ImportError, OSError):
+        return None
+
+
+class MemoryGuard:
+    """
+    Background check (every `interval` seconds) that keeps this process
+    under budget_mb of resident memory:
+
+      1. Over budget: request a segment rotation from the recorder
+         buffering the most, so its frames are written out and released.
+         One recorder per check, so the writes are spread out.
+      2. Still over budget with nothing left to flush: stop retrieving
+         streams that no viewer or recorder consumes
+         (ZedCamera.set_active_streams), once.
+      3. Host MemAvailable below min_available_mb: warn, at most every 10 s.
+
+    Each action is printed and, with an events bus, published as a
+    "memory" event ({"state", "rss_mb", "budget_mb", "available_mb",
+    "action"}). With use_processes only the coordinator is measured and
+    only coordinator-side recorders can be rotated.
+    """
+
+    def __init__(self, cameras, budget_mb, interval=1.0, min_available_mb=512, events=None):
+        self.cameras = cameras
+        self.budget_mb = budget_mb
+        self.interval = interval
+        self.min_available_mb = min_available_mb
+        self.events = events
+        self.rotations = 0
+        self.shed = False
+        self.last_rss_mb = None
+        self._last_warning = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="memory-guard")
+            self._thread.start()
+
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"[Memory] check failed: {type(e).__name__}: {e}")
+
+
+    def check(self):
+        """One pass of the policy above. Returns the action taken, or None."""
+        rss = self.last_rss_mb = process_rss_mb()
+        _, available = host_memory()
+        action = None
+        if rss is not None and self.budget_mb is not None and rss > self.budget_mb:
+            action = self._relieve(rss)
+        if available is not None and available < self.min_available_mb:
+            now = time.monotonic()
+            if now - self._last_warning >= 10:
+                self._last_warning = now
+                print(f"[Memory] WARNING: host has only {available:.0f} MB available "
+                      f"(process {rss or 0:.0f} MB)")
+                self._publish("low_host_memory", rss, available, action)
+        return action
+
+
+    def _relieve(self, rss):
+        held = [(cam.recorder.buffered_bytes(), serial) for serial, cam in self.cameras.items()
+                if cam.recorder is not None]
+        size, serial = max(held, default=(0, None))
+        if size > 0:
+            self.cameras[serial].recorder.request_rotation()
+            self.rotations += 1
+            action = f"rotate recorder {str(serial)[-3:]} ({size / MB:.0f} MB buffered)"
+        elif not self.shed:
+            self.shed = True
+            for cam in self.cameras.values():
+                needed = set()
+                if cam.viewer is not None:
+                    needed.update(cam.cfg.viewer.show)
+                if cam.recorder is not None:
+                    needed.update(cam.cfg.recorder.streams)
+                if cam.cfg.zed.depth_filters and "depth_filtered" in needed:
+                    needed.add("depth")
+                keep = [name for name in cam.cfg.zed.streams if name in needed]
+                if keep and hasattr(cam.zed_camera, "set_active_streams"):
+                    cam.zed_camera.set_active_streams(keep)
+            action = "stop retrieving streams nobody consumes"
+        else:
+            return None
+        print(f"[Memory] {rss:.0f} MB over the {self.budget_mb:.0f} MB budget: {action}")
+        self._publish("over_budget", rss, None, action)
+        return action
+
+
+    def _publish(self, state, rss, available, action):
+        if self.events is not None:
+            self.events.publish("memory", "system", state=state, rss_mb=rss, budget_mb=self.budget_mb,
+                                available_mb=available, action=action)
@@ -0,0 +1,130 @@
+import collections
+import math
+import time
+
+from .encoding import EncoderPool, decode_frame, encode_array, encoded_nbytes
+
+
+class PrerollBuffer:
+    """
+    Rolling in-memory buffer of the last `seconds` of frames, sampled at
+    `fps`, kept while a Recorder is idle so a triggered recording can start
+    in the past.
+
+    The ring holds at most ceil(seconds * fps) entries; pushing beyond that
+    drops the oldest. Frames are sampled on camera timestamps when meta is
+    available (wall clock otherwise), so the buffered rate matches the
+    recorder rate.
+
+    codec bounds RAM for long pre-rolls:
+        - "raw":  keep references to the frames (no CPU cost; ZedCamera hands
+                  out fresh arrays per grab, so nothing is copied).
+        - "png":  lossless PNG for 8-bit images.
+        - "jpeg": JPEG (quality) for 8-bit images, except `lossless` streams
+                  (the recorder passes the npz stereo pair), which use PNG.
+    Depth is stored as float16 when compressing — it is only recorded as a
+    colormap mp4.
+
+    With threads > 0, compression runs on an encoding.EncoderPool, so push()
+    only queues the frame. Samples that arrive while the pool is saturated
+    are skipped and counted in `dropped`.
+    """
+
+    def __init__(self, seconds, fps, codec="raw", quality=90, lossless=(), threads=0):
+        self.capacity = max(1, math.ceil(seconds * fps))
+        self.codec = codec
+        self.quality = int(quality)
+        self.lossless = set(lossless)
+        self._period_ns = int(1e9 / fps)
+        self._ring = collections.deque(maxlen=self.capacity)
+        self._last_slot = None
+        self._last_seq = None
+        self._nbytes = 0
+        self.dropped = 0
+        self._pool = None
+        if codec != "raw" and threads > 0:
+            self._pool = EncoderPool(threads, codec=codec, quality=quality, lossless=lossless)
+
+
+    def __len__(self):
+        return len(self._ring)
+
+
+    def push(self, streams, meta=None):
+        """Buffer this frame if a sample is due. Returns True if buffered."""
+        streams = {name: arr for name, arr in streams.items() if arr is not None}
+        if not streams:
+            return False    # camera has not delivered a frame yet
+        meta = dict(meta or {})
+        seq, ts = meta.get("seq"), meta.get("timestamp_ns")
+        if seq is not None and seq == self._last_seq:
+            return False
+        # One sample per period on a fixed time grid, so timestamp jitter
+        # (or a camera rate that is not a multiple of fps) doesn't stretch
+        # the spacing by a frame.
+        slot = (ts if ts is not None else time.monotonic_ns()) // self._period_ns
+        if self._last_slot is not None and slot <= self._last_slot:
+            return False
+        self._last_slot, self._last_seq = slot, seq
+
+        if self._pool is not None:
+            encoded = self._pool.submit(streams, block=False)
+            if encoded is None:
+                self.dropped += 1
+                return False
+        else:
+            encoded = {name: self._encode(name, arr) for name, arr in streams.items()}
+        if len(self._ring) == self.capacity:
+            self._nbytes -= _entry_bytes(self._ring[0][1])
+        self._ring.append((meta, encoded))
+        self._nbytes += _entry_bytes(encoded)
+        return True
+
+
+    @property
+    def nbytes(self):
+        """Bytes held; pool-encoded frames count once they are done."""
+        done = sum(encoded_nbytes(encoded.result()) for _, encoded in self._ring
+                   if not isinstance(encoded, dict) and encoded.done() and encoded.exception() is None)
+        return self._nbytes + done
+
+
+    def drain(self):
+        """Take every buffered entry, oldest first, and empty the ring.
+        Waits for frames still being encoded."""
+        entries = []
+        for meta, encoded in self._ring:
+            if not isinstance(encoded, dict):
+                try:
+                    encoded = encoded.result()
+                except Exception as e:
+                    print(f"[Preroll] dropping a frame that failed to encode: {e}")
+                    continue
+            entries.append((meta, encoded))
+        self._ring.clear()
+        self._last_slot = self._last_seq = None
+        self._nbytes = 0
+        return entries
+
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+
+    def _encode(self, name, arr):
+        if self.codec == "raw":
+            return ("raw", arr)
+        codec = "png" if name in self.lossless else self.codec
+        return encode_array(arr, codec, self.quality)
+
+
+    @staticmethod
+    def decode(encoded):
+        return decode_frame(encoded)
+
+
+def _entry_bytes(encoded):
+    # Pool futures are counted by the nbytes property instead.
+    return encoded_nbytes(encoded) if isinstance(encoded, dict) else 0
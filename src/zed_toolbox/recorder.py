@@ -1,13 +1,25 @@
+import collections
 import json
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
 from pathlib import Path
 
 import cv2
 import numpy as np
 
 from .config import RecorderConfig
-from .utils import draw_overlays
+from .diskio import IOScheduler
+from .framestore import FrameStoreWriter, file_extension
+from .manifest import SessionManifest, output_filename
+from .metadata import MetadataWriter, empty_row
+from .overlays import OverlayRenderer
+from .preroll import PrerollBuffer
+from .recovery import recover_manifest
 
+_INDEX_HEADER = "frame,slot,seq,timestamp_ns,outputs,skip_reason\n"
 
 class Recorder:
     """
@@ -18,13 +30,53 @@ class Recorder:
         - "right": right.npz + calibration.json.
         - "depth": depth.mp4 (lossy colormap, visual only).
 
-    npz streams are buffered in memory during recording and saved at stop().
-    Memory cost: at 1280x720 color, ~5–8 MB per second of stereo pair at 10 fps
-    after compression; budget for your expected session length.
+    npz streams are buffered in memory and saved when the current segment
+    closes (at stop(), or on rotation when cfg.segment_seconds/segment_mb is
+    set). Memory cost: at 1280x720 color, ~5–8 MB per second of stereo pair at
+    10 fps after compression; budget for your expected segment length. With
+    a chunked cfg.stereo_codec the frames are compressed on a thread pool as
+    they arrive and held compressed (see framestore.py).
+
+    Every event (session start, segment open/close, each frame) is appended
+    to manifest.jsonl as it happens, so a crashed session can be validated
+    and repaired by recovery.recover_session() and continued with
+    cfg.resume=True. Only the segment open at crash time is at risk; without
+    segment_seconds / segment_mb that is the whole recording.
+
+    Every saved frame gets a row in timestamps.csv (camera seq + timestamp +
+    which outputs received it) and, with cfg.save_metadata, a row in the
+    columnar metadata.zmd sidecar (meta["sensors"]: host time,
+    exposure/gain, IMU; see metadata.py). With cfg.sampling == "adaptive", frames are
+    picked on a camera-timestamp grid and optional outputs are shed under
+    load (see SHED_ORDER); skipped grid slots are logged with a reason.
+    With cfg.unchanged, frames whose meta["change_seq"] matches the last
+    stored frame's (the camera saw no change) become "repeat" markers or
+    are skipped, so a static scene costs no encoding, buffering or disk.
+
+    With cfg.preroll_seconds, update() keeps feeding a PrerollBuffer while
+    idle. start() hands the buffered frames to a flush thread, which writes
+    them ahead of the live frames; live frames arriving meanwhile queue
+    behind the flush, so the recording has no gap at the trigger.
+
+    With cfg.io_scheduler, the session registers with the
+    process-wide diskio.IOScheduler: npz files stream to disk through it in
+    large blocks, fairly interleaved with other recorders and paced by
+    cfg.io_budget_mb_s, and the open files are fsynced in one batch every
+    cfg.durability_interval seconds.
+
+    With an events.EventBus, the recorder publishes "recording" events
+    (source: serial): {"state": "started", "session_dir"}, {"state":
+    "segment", "segment", "frames"} when a segment is closed, and
+    {"state": "stopped", "session_dir", "frames"}.
     """
 
-    def __init__(self, serial, config=None):
+    # Optional outputs dropped one at a time, in this order, when the
+    # adaptive recorder runs over its load budget. npz streams are never shed.
+    SHED_ORDER = ("overlay_mp4", "depth_mp4", "left_mp4")
+
+    def __init__(self, serial, config=None, overlay_renderer=None, events=None):
         self.serial = serial
+        self.events = events
 
         if config is None:
             config = RecorderConfig()
@@ -36,25 +88,79 @@ class Recorder:
         self._wants_right = "right" in self.cfg.streams
         self._wants_depth = "depth" in self.cfg.streams
         self._save_left_npz = self._wants_left and self._wants_right
+        enabled = {
+            "overlay_mp4": self._wants_left and self.cfg.save_with_overlays,
+            "depth_mp4": self._wants_depth,
+            "left_mp4": self._wants_left,
+        }
+        self._sheddable = [o for o in self.SHED_ORDER if enabled[o]]
 
         self.frame_interval = 1.0 / self.cfg.fps if self.cfg.fps > 0 else 0
+        self._period_ns = int(round(1e9 / self.cfg.fps))
         self._last_update = 0
         self._is_recording = False
         self.session_dir = None
 
+        self._manifest = None
+        self._io = None
+        self._segment = 0
+        self._segment_frames = 0
+        self._segment_start = 0.0
+        self._segment_bytes = 0
+        self._segment_outputs = set()
+        self._rotate_requested = False
+        self._repeat_of = None              # frame index of the segment's last stored frame
+        self._stored_change_seq = None      # its meta["change_seq"]
+        self.unchanged_frames = 0
+
+        self._index = None
+        self._metadata = None
+        self._frame_idx = 0
+        self._last_seq = None
+        self._t0_ns = None
+        self._last_slot = -1
+        self._last_call = None
+        self._shed_level = 0
+        self._cost_ema = 0.0
+        self._calm_frames = 0
+        self.skipped_slots = 0
+
         self._left_mp4 = None
         self._depth_mp4 = None
         self._overlay_mp4 = None
+        self._overlays = overlay_renderer or OverlayRenderer()
         self._left_buf = None
         self._right_buf = None
+        self._stereo_ext = file_extension(self.cfg.stereo_codec)
+        self._stereo_pool = None
+
+        self._preroll = None
+        if self.cfg.preroll_seconds > 0:
+            self._preroll = PrerollBuffer(
+                self.cfg.preroll_seconds, self.cfg.fps,
+                codec=self.cfg.preroll_codec, quality=self.cfg.preroll_quality,
+                lossless=("left", "right") if self._wants_right else (),
+                threads=self.cfg.preroll_threads,
+            )
+        self._flush_thread = None
+        self._flushing = False
+        self._flush_overlays = None     # renderer of the flush thread; the shared one is the caller's
+        self._pending = collections.deque()
+        self._pending_lock = threading.Lock()
 
 
     def start(self, calibration=None):
-        """Open the session directory; write calibration.json if applicable.
+        """Open the session directory and manifest; write calibration.json if
+        applicable.
 
         calibration: optional dict with keys 'intrinsics', 'streams',
             'depth_mode', 'coordinate_units', 'resolution', 'camera_fps'.
-            Written to calibration.json when "right" is in cfg.streams.
+            Recorded in the manifest, and written to calibration.json when
+            "right" is in cfg.streams.
+
+        With cfg.resume and an existing manifest for this camera under
+        save_dir/save_name, the session is recovered and recording continues
+        in a new segment after the last recorded frame.
         """
         if self._is_recording:
             return
@@ -62,83 +168,479 @@ class Recorder:
         save_name = self.cfg.save_name or time.strftime("%Y%m%d_%H%M%S")
         self.session_dir = Path(self.cfg.save_dir) / save_name
         self.session_dir.mkdir(parents=True, exist_ok=True)
+        last3 = str(self.serial)[-3:]
+
+        manifest_path = self.session_dir / f"cam_{last3}_manifest.jsonl"
+        resumed = None
+        if self.cfg.resume and manifest_path.exists():
+            resumed = recover_manifest(manifest_path, repair=True)
 
         if self._wants_right:
             if calibration:
                 self._write_calibration(calibration)
             else:
-                print(f"[Recorder {str(self.serial)[-3:]}] WARNING: right-stream "
+                print(f"[Recorder {last3}] WARNING: right-stream "
                       f"recording started without calibration; recordings will not "
                       f"be self-contained for FFS replay.")
 
-        if self._save_left_npz:
-            self._left_buf = []
-        if self._wants_right:
-            self._right_buf = []
-
+        if self.cfg.io_scheduler:
+            self._io = IOScheduler.shared().session(
+                f"{save_name}/cam_{last3}", budget_mb_s=self.cfg.io_budget_mb_s,
+                max_queued_mb=self.cfg.io_max_queued_mb,
+                durability_interval=self.cfg.durability_interval,
+            )
+        self._manifest = SessionManifest(manifest_path, sync_interval=self.cfg.durability_interval,
+                                         append=resumed is not None, io=self._io)
+        index_path = self.session_dir / f"cam_{last3}_timestamps.csv"
+        if resumed is not None:
+            self._segment = resumed["next_segment"]
+            self._frame_idx = resumed["next_frame"]
+            self._manifest.write("resume", segment=self._segment, frame=self._frame_idx,
+                                 time=time.time())
+            self._index = open(index_path, "a")
+            if self._index.tell() == 0:
+                self._index.write(_INDEX_HEADER)
+            print(f"[Recorder {last3}] resuming after frame {self._frame_idx} "
+                  f"({len(resumed['problems'])} recovery note(s))")
+        else:
+            self._segment = 0
+            self._frame_idx = 0
+            self._manifest.write("session", serial=self.serial, config=asdict(self.cfg),
+                                 calibration=self._calibration_dict(calibration or {}),
+                                 time=time.time())
+            self._index = open(index_path, "w")
+            self._index.write(_INDEX_HEADER)
+        if self._io is not None:
+            self._io.track(index_path)
+        if self.cfg.save_metadata:
+            metadata_path = self.session_dir / f"cam_{last3}_metadata.zmd"
+            self._metadata = MetadataWriter(metadata_path, append=resumed is not None)
+            if self._io is not None:
+                self._io.track(metadata_path)
+
+        self._last_seq = None
+        self._t0_ns = None
+        self._last_slot = -1
+        self._last_call = None
+        self._shed_level = 0
+        self._cost_ema = 0.0
+        self._calm_frames = 0
+        self.skipped_slots = 0
+        self._stored_change_seq = None
+        self.unchanged_frames = 0
+
+        if self.cfg.stereo_codec != "npz" and self.cfg.stereo_threads and self._stereo_pool is None:
+            self._stereo_pool = ThreadPoolExecutor(self.cfg.stereo_threads,
+                                                   thread_name_prefix=f"recorder-{last3}-stereo")
+        self._open_segment()
         self._last_update = 0
         self._is_recording = True
-        print(f"[Recorder {str(self.serial)[-3:]}] start -> {self.session_dir}")
+        print(f"[Recorder {last3}] start -> {self.session_dir}")
+        if self.events is not None:
+            self.events.publish("recording", self.serial, state="started", session_dir=str(self.session_dir))
+
+        if self._preroll is not None and len(self._preroll):
+            entries = self._preroll.drain()
+            self._manifest.write("preroll", frames=len(entries), time=time.time())
+            self._flushing = True
+            self._flush_overlays = self._overlays.fork()
+            self._flush_thread = threading.Thread(
+                target=self._flush_preroll, args=(entries,), daemon=True,
+                name=f"recorder-{last3}-preroll",
+            )
+            self._flush_thread.start()
+
+
+    def _flush_preroll(self, entries):
+        """Write pre-roll entries, then drain live work queued meanwhile.
+        Clears _flushing only with the queue empty, under the queue lock, so
+        update() switches back to writing inline without reordering."""
+        last3 = str(self.serial)[-3:]
+        t0 = time.perf_counter()
+        for meta, encoded in entries:
+            try:
+                outputs = self._write_frame(self._preroll.decode(encoded), None)
+                self._log_frame(None, meta, outputs, preroll=True)
+            except Exception as e:
+                print(f"[Recorder {last3}] Error writing pre-roll frame: {e}")
+        print(f"[Recorder {last3}] flushed {len(entries)} pre-roll frame(s) "
+              f"in {time.perf_counter() - t0:.2f}s")
+        while True:
+            with self._pending_lock:
+                if not self._pending:
+                    self._flushing = False
+                    return
+                fn, args = self._pending.popleft()
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"[Recorder {last3}] Error writing queued frame: {e}")
+
+
+    def _run(self, fn, *args):
+        """Run a write now, or queue it behind an in-progress pre-roll flush."""
+        if self._flushing:
+            with self._pending_lock:
+                if self._flushing:
+                    self._pending.append((fn, args))
+                    return
+        fn(*args)
+
+
+    def _open_segment(self):
+        if self._save_left_npz:
+            self._left_buf = self._stereo_buffer()
+        if self._wants_right:
+            self._right_buf = self._stereo_buffer()
+        self._segment_frames = 0
+        self._segment_bytes = 0
+        self._segment_outputs = set()
+        self._rotate_requested = False
+        self._repeat_of = None
+        self._segment_start = time.monotonic()
+        self._manifest.write("segment_open", segment=self._segment, time=time.time())
+
+
+    def _stereo_buffer(self):
+        if self.cfg.stereo_codec == "npz":
+            return []
+        return FrameStoreWriter(self.cfg.stereo_codec, self.cfg.stereo_level,
+                                self.cfg.stereo_chunk_frames, self._stereo_pool)
+
+
+    def _close_segment(self):
+        """Finalize every file of the current segment, fsync them, and log
+        the segment as closed. After this the segment survives a crash."""
+        for attr in ("_left_mp4", "_depth_mp4", "_overlay_mp4"):
+            writer = getattr(self, attr)
+            if writer is not None:
+                writer.release()
+                setattr(self, attr, None)
+                if self._io is not None:
+                    self._io.untrack(self._output_path(f"{attr[1:-4]}_mp4"))
 
+        if self._save_left_npz and self._left_buf:
+            self._save_npz("left_npz", self._left_buf)
+        if self._wants_right and self._right_buf:
+            self._save_npz("right_npz", self._right_buf)
+        self._left_buf = None
+        self._right_buf = None
 
-    def update(self, streams, overlays=None):
+        if self._metadata is not None:
+            self._metadata.flush()
+
+        files = {}
+        for output in sorted(self._segment_outputs):
+            path = self._output_path(output)
+            _fsync_path(path)
+            files[path.name] = path.stat().st_size
+        self._manifest.write("segment_close", segment=self._segment,
+                             frames=self._segment_frames, files=files, time=time.time())
+        self._manifest.sync()
+        if self.events is not None:
+            self.events.publish("recording", self.serial, state="segment", segment=self._segment,
+                                frames=self._segment_frames)
+
+
+    def _save_npz(self, output, frames):
+        """Save one segment's stereo frames: compress the buffered list into
+        an npz, or write out a FrameStoreWriter's finished chunks. Through
+        the I/O scheduler the file is streamed in blocks, and close()
+        returns once it is fsynced."""
+        path = self._output_path(output)
+        if isinstance(frames, FrameStoreWriter):
+            save = frames.write
+        else:
+            arr = np.stack(frames, axis=0)
+            save = lambda f: np.savez_compressed(f, frames=arr)
+        with (open(path, "wb") if self._io is None else self._io.open(path)) as f:
+            save(f)
+        self._segment_outputs.add(output)
+
+
+    def _maybe_rotate(self):
+        if self._segment_frames == 0:
+            return
+        seconds, mb = self.cfg.segment_seconds, self.cfg.segment_mb
+        due = (
+            self._rotate_requested
+            or (seconds is not None and time.monotonic() - self._segment_start >= seconds)
+            or (mb is not None and self._segment_size() >= mb * 1e6)
+        )
+        if not due:
+            return
+        self._close_segment()
+        self._segment += 1
+        self._open_segment()
+
+
+    def request_rotation(self):
+        """Close the current segment at the next saved frame, writing its
+        buffered stereo frames out (used by planner.MemoryGuard). Safe to
+        call from any thread."""
+        self._rotate_requested = True
+
+
+    def buffered_bytes(self):
+        """Bytes of frames held in memory: the open segment's stereo
+        buffers plus the pre-roll."""
+        total = 0
+        for buf in (self._left_buf, self._right_buf):
+            if isinstance(buf, FrameStoreWriter):
+                total += buf.nbytes
+            elif buf:
+                total += sum(frame.nbytes for frame in buf)
+        if self._preroll is not None:
+            total += self._preroll.nbytes
+        return total
+
+
+    def _segment_size(self):
+        size = self._segment_bytes
+        for buf in (self._left_buf, self._right_buf):
+            if isinstance(buf, FrameStoreWriter):
+                size += buf.nbytes - buf.raw_bytes
+        for output in self._segment_outputs:
+            path = self._output_path(output)
+            if path.suffix == ".mp4" and path.exists():
+                size += path.stat().st_size
+        return size
+
+
+    def update(self, streams, overlays=None, meta=None):
+        """
+        streams: dict from ZedCamera.get_current_state().
+        overlays: optional list applied to the overlay mp4.
+        meta: optional {"seq", "timestamp_ns"} from
+            ZedCamera.get_current_state(return_meta=True). Required for
+            adaptive sampling; used for the timestamp index either way.
+        """
         if not self._is_recording:
+            if self._preroll is not None:
+                self._preroll.push({name: streams.get(name) for name in self.cfg.streams}, meta)
             return
+        if self.cfg.sampling == "adaptive":
+            self._update_adaptive(streams, overlays, meta)
+            return
+
         now = time.time()
         if now - self._last_update < self.frame_interval:
             return
         self._last_update = now
 
+        self._run(self._record_frame, streams, overlays, meta, None, ())
+
+
+    def _record_frame(self, streams, overlays, meta, slot, shed):
+        change_seq = (meta or {}).get("change_seq")
+        if (self.cfg.unchanged != "save" and change_seq is not None
+                and self._repeat_of is not None and change_seq == self._stored_change_seq):
+            self._record_unchanged(meta, slot)
+            return
+        t_start = time.perf_counter()
+        outputs = self._write_frame(streams, overlays, shed=shed)
+        if slot is not None:
+            self._account_cost(time.perf_counter() - t_start)
+        if outputs:
+            self._repeat_of, self._stored_change_seq = self._frame_idx, change_seq
+        self._log_frame(slot, meta, outputs)
+
+
+    def _record_unchanged(self, meta, slot):
+        """A sampled frame showing the same image as the last stored one:
+        a repeat marker, or only a skip row (cfg.unchanged)."""
+        self.unchanged_frames += 1
+        if self.cfg.unchanged == "repeat":
+            self._log_frame(slot, meta, ["repeat"], repeat_of=self._repeat_of)
+            return
+        seq, ts = meta.get("seq"), meta.get("timestamp_ns")
+        self._last_seq = seq
+        self._index.write(f",{'' if slot is None else slot},{'' if seq is None else seq},"
+                          f"{'' if ts is None else ts},,unchanged\n")
+
+
+    def _update_adaptive(self, streams, overlays, meta):
+        if meta is None:
+            raise ValueError("adaptive sampling requires frame meta (seq, timestamp_ns)")
+        if meta.get("timestamp_ns") is None:
+            return  # no frame captured yet
+        seq, ts = meta["seq"], meta["timestamp_ns"]
+        now = time.perf_counter()
+        last_call, self._last_call = self._last_call, now
+        if seq == self._last_seq:
+            return
+
+        if self._t0_ns is None:
+            self._t0_ns = ts
+        slot = (ts - self._t0_ns) // self._period_ns
+        if slot <= self._last_slot:
+            return
+
+        # Slots between the last saved frame and this one got no frame. If
+        # the caller itself was late, blame the consumer; otherwise the
+        # camera never delivered a frame in that window.
+        late = last_call is not None and now - last_call > self.frame_interval
+        reason = "consumer_late" if late else "no_frame"
+        for missed in range(self._last_slot + 1, slot):
+            self._run(self._index.write, f",{missed},,,,{reason}\n")
+            self.skipped_slots += 1
+        self._last_slot = slot
+
+        shed = set(self._sheddable[:self._shed_level])
+        self._run(self._record_frame, streams, overlays, meta, slot, shed)
+
+
+    def stats(self):
+        """Live counters: frames saved this session, adaptive slots skipped,
+        sampled frames that were unchanged (cfg.unchanged),
+        outputs currently shed, frames queued behind a pre-roll flush, and the
+        pre-roll fill (frames, bytes, samples dropped by a saturated encoder)
+        and, through the I/O scheduler, the session's disk stats
+        (IOSession.stats())."""
+        stats = {
+            "recording": self._is_recording,
+            "frames": self._frame_idx,
+            "skipped": self.skipped_slots,
+            "unchanged": self.unchanged_frames,
+            "shed": list(self._sheddable[:self._shed_level]),
+            "queued": len(self._pending),
+        }
+        if self._preroll is not None:
+            stats["preroll"] = {"frames": len(self._preroll), "bytes": self._preroll.nbytes,
+                                "dropped": self._preroll.dropped}
+        if self._io is not None:
+            stats["io"] = self._io.stats()
+        return stats
+
+
+    def _account_cost(self, cost):
+        """Track write cost against the load budget; shed or restore one output
+        at a time, with hysteresis so the level doesn't flap."""
+        budget = self.cfg.load_budget * self.frame_interval
+        self._cost_ema = 0.8 * self._cost_ema + 0.2 * cost
+
+        if self._cost_ema > budget and self._shed_level < len(self._sheddable):
+            self._shed_level += 1
+            self._cost_ema = 0.0
+            self._calm_frames = 0
+            print(f"[Recorder {str(self.serial)[-3:]}] over load budget; "
+                  f"shedding {self._sheddable[self._shed_level - 1]}")
+        elif self._cost_ema < 0.5 * budget and self._shed_level > 0:
+            self._calm_frames += 1
+            if self._calm_frames >= 2 * self.cfg.fps:
+                self._shed_level -= 1
+                self._calm_frames = 0
+                print(f"[Recorder {str(self.serial)[-3:]}] load recovered; "
+                      f"restoring {self._sheddable[self._shed_level]}")
+        else:
+            self._calm_frames = 0
+
+
+    def _write_frame(self, streams, overlays, shed=()):
+        """Write one frame to every enabled output not in `shed`. Returns the
+        list of outputs that received it."""
+        outputs = []
         if self._wants_left:
             left = streams.get("left")
             if left is not None:
-                self._maybe_init_left_mp4(left)
-                self._left_mp4.write(left)
+                if "left_mp4" not in shed:
+                    self._maybe_init_left_mp4(left)
+                    self._left_mp4.write(left)
+                    outputs.append("left_mp4")
                 if self._save_left_npz:
                     self._left_buf.append(left.copy())
-                if self.cfg.save_with_overlays:
+                    self._segment_bytes += left.nbytes
+                    outputs.append("left_npz")
+                if self.cfg.save_with_overlays and "overlay_mp4" not in shed:
                     self._maybe_init_overlay_mp4(left)
-                    img = draw_overlays(left, overlays) if overlays else left
+                    # Only the flush thread writes while _flushing, and the
+                    # Viewer renders into the shared buffer meanwhile.
+                    renderer = self._flush_overlays if self._flushing else self._overlays
+                    img = renderer.render(left, overlays) if renderer.has_overlays(overlays) else left
                     self._overlay_mp4.write(img)
+                    outputs.append("overlay_mp4")
 
         if self._wants_right:
             right = streams.get("right")
             if right is not None:
                 self._right_buf.append(right.copy())
+                self._segment_bytes += right.nbytes
+                outputs.append("right_npz")
 
-        if self._wants_depth:
+        if self._wants_depth and "depth_mp4" not in shed:
             depth = streams.get("depth")
             if depth is not None:
                 self._maybe_init_depth_mp4(depth)
                 self._depth_mp4.write(self._depth_to_color(depth))
+                outputs.append("depth_mp4")
+        return outputs
+
+
+    def _log_frame(self, slot, meta, outputs, preroll=False, repeat_of=None):
+        if not outputs:
+            return
+        meta = meta or {}
+        seq, ts = meta.get("seq"), meta.get("timestamp_ns")
+        if not preroll:
+            self._last_seq = seq
+        self._index.write(
+            f"{self._frame_idx},{'' if slot is None else slot},"
+            f"{'' if seq is None else seq},{'' if ts is None else ts},"
+            f"{'+'.join(outputs)},\n"
+        )
+        if self._metadata is not None:
+            sensors = meta.get("sensors")
+            self._metadata.append(self._frame_idx, self._segment,
+                                  empty_row(seq, ts) if sensors is None else sensors)
+        extra = {"preroll": True} if preroll else {}
+        if repeat_of is not None:
+            extra["repeat_of"] = repeat_of
+        self._manifest.write("frame", frame=self._frame_idx, segment=self._segment,
+                             seq=seq, timestamp_ns=ts, outputs=outputs, **extra)
+        self._frame_idx += 1
+        self._segment_frames += 1
+        self._segment_outputs.update(o for o in outputs if o.endswith("_mp4"))
+        self._maybe_rotate()
 
 
     def stop(self):
         if not self._is_recording:
             return
         self._is_recording = False
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+            self._flush_thread = None
+
+        self._close_segment()
+        if self._stereo_pool is not None:
+            self._stereo_pool.shutdown()
+            self._stereo_pool = None
+        self._manifest.write("end", frames=self._frame_idx, time=time.time())
+        self._manifest.close()
+        self._manifest = None
+
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        if self._metadata is not None:
+            self._metadata.close()
+            self._metadata = None
+        if self._io is not None:
+            self._io.close()
+            self._io = None
 
-        if self._left_mp4 is not None:
-            self._left_mp4.release()
-            self._left_mp4 = None
-        if self._depth_mp4 is not None:
-            self._depth_mp4.release()
-            self._depth_mp4 = None
-        if self._overlay_mp4 is not None:
-            self._overlay_mp4.release()
-            self._overlay_mp4 = None
-
-        if self._save_left_npz and self._left_buf:
-            arr = np.stack(self._left_buf, axis=0)
-            np.savez_compressed(self._npz_path("left"), frames=arr)
-        if self._wants_right and self._right_buf:
-            arr = np.stack(self._right_buf, axis=0)
-            np.savez_compressed(self._npz_path("right"), frames=arr)
+        print(f"[Recorder {str(self.serial)[-3:]}] saved to {self.session_dir}")
+        if self.events is not None:
+            self.events.publish("recording", self.serial, state="stopped",
+                                session_dir=str(self.session_dir), frames=self._frame_idx)
 
-        self._left_buf = None
-        self._right_buf = None
 
-        print(f"[Recorder {str(self.serial)[-3:]}] saved to {self.session_dir}")
+    def shutdown(self):
+        """Stop any recording and release the pre-roll encoder threads."""
+        self.stop()
+        if self._preroll is not None:
+            self._preroll.close()
+            self._preroll = None
 
 
     def _maybe_init_left_mp4(self, frame):
@@ -160,13 +662,17 @@ class Recorder:
 
 
     def _open_mp4(self, stream, w, h):
-        path = str(self.session_dir / f"cam_{str(self.serial)[-3:]}_{stream}.mp4")
+        path = str(self._output_path(f"{stream}_mp4"))
         fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        return cv2.VideoWriter(path, fourcc, self.cfg.fps, (w, h))
+        writer = cv2.VideoWriter(path, fourcc, self.cfg.fps, (w, h))
+        if self._io is not None:
+            self._io.track(path)
+        return writer
 
 
-    def _npz_path(self, stream):
-        return str(self.session_dir / f"cam_{str(self.serial)[-3:]}_{stream}.npz")
+    def _output_path(self, output):
+        ext = self._stereo_ext if output.endswith("_npz") else None
+        return self.session_dir / output_filename(str(self.serial)[-3:], output, self._segment, ext)
 
 
     @staticmethod
@@ -178,18 +684,29 @@ class Recorder:
 
 
     def _write_calibration(self, calibration):
+        path = self.session_dir / f"cam_{str(self.serial)[-3:]}_calibration.json"
+        with open(path, "w") as f:
+            json.dump(self._calibration_dict(calibration), f, indent=2)
+
+
+    def _calibration_dict(self, calibration):
         out = {}
         intr = calibration.get("intrinsics") or {}
         if intr.get("matrix") is not None:
             out["K"] = intr["matrix"].tolist()
         if intr.get("baseline") is not None:
             out["baseline"] = float(intr["baseline"])
-        for key in ("streams", "depth_mode", "coordinate_units", "resolution", "camera_fps"):
-            if key in calibration:
+        for key in ("streams", "depth_mode", "coordinate_units", "resolution", "camera_fps", "extrinsics"):
+            if calibration.get(key) is not None:
                 v = calibration[key]
                 out[key] = list(v) if isinstance(v, (list, tuple, set)) else v
         out["recorder_fps"] = self.cfg.fps
+        return out
 
-        path = self.session_dir / f"cam_{str(self.serial)[-3:]}_calibration.json"
-        with open(path, "w") as f:
-            json.dump(out, f, indent=2)
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
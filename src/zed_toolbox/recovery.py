@@ -0,0 +1,226 @@
+"""
+Validate and repair recording sessions left behind by a crashed process.
+
+    python -m zed_toolbox.recovery recordings/trial            # repair
+    python -m zed_toolbox.recovery recordings/trial --check    # report only
+
+Recovery replays each cam_<last3>_manifest.jsonl, checks every file the
+manifest references, and (when repairing):
+    - truncates a torn last manifest line, a torn last row of
+      timestamps.csv and a torn last row group of the metadata.zmd sidecar,
+    - renames unreadable files of an unfinished segment to <name>.corrupt
+      (e.g. an mp4 whose moov atom was never written),
+    - appends a "recovered" event that closes the unfinished segment.
+A repaired session can be continued with RecorderConfig(resume=True).
+
+Only closed segments are safe: without segment_seconds / segment_mb the
+whole recording is one segment, its npz frames are held in memory until
+stop, and a crash loses all of them. An mp4 of the open segment usually
+lacks its moov atom; it is quarantined, not rebuilt.
+"""
+import argparse
+import os
+import zipfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from .framestore import check_frames
+from .manifest import OUTPUT_FILES, SessionManifest, find_output, read_manifest
+from .metadata import repair_metadata
+
+
+def recover_session(session_dir, serial=None, repair=True):
+    """Recover every camera manifest in session_dir (or only the one for
+    serial). Returns {last3: report}; see recover_manifest()."""
+    session_dir = Path(session_dir)
+    last3 = str(serial)[-3:] if serial is not None else "*"
+    return {
+        path.name.split("_")[1]: recover_manifest(path, repair=repair)
+        for path in sorted(session_dir.glob(f"cam_{last3}_manifest.jsonl"))
+    }
+
+
+def recover_manifest(path, repair=True):
+    """
+    Replay one manifest and validate its files.
+
+    Returns a report dict:
+        frames:      frames recorded according to the manifest
+        segments:    {segment: {"closed", "frames", "files": {name: bytes}}}
+        next_segment / next_frame: where a resumed recording continues
+        last_seq / last_timestamp_ns: camera position of the last frame
+        ended:       True if the session was stopped cleanly
+        problems:    human-readable list of issues found (and fixed, if repair)
+    """
+    path = Path(path)
+    session_dir = path.parent
+    last3 = path.name.split("_")[1]
+    problems = []
+
+    events, good_bytes = read_manifest(path)
+    size = path.stat().st_size
+    if good_bytes < size:
+        problems.append(f"torn manifest tail ({size - good_bytes} bytes)")
+        if repair:
+            os.truncate(path, good_bytes)
+    if not events or events[0].get("event") != "session":
+        problems.append("manifest has no session header")
+
+    index = session_dir / f"cam_{last3}_timestamps.csv"
+    if index.exists():
+        torn = repair_csv(index, repair=repair)
+        if torn:
+            problems.append(f"torn timestamps.csv tail ({torn} bytes)")
+
+    metadata = session_dir / f"cam_{last3}_metadata.zmd"
+    if metadata.exists():
+        try:
+            _, torn = repair_metadata(metadata, repair=repair)
+            if torn:
+                problems.append(f"torn metadata tail ({torn} bytes)")
+        except (ValueError, OSError) as e:
+            problems.append(f"{metadata.name} is unreadable ({e})")
+
+    segments = {}
+    frames, last_frame, ended = 0, None, False
+    for ev in events:
+        kind = ev.get("event")
+        if kind == "segment_open":
+            segments[ev["segment"]] = {"closed": False, "frames": 0, "files": {}}
+        elif kind == "frame":
+            seg = segments.setdefault(ev["segment"], {"closed": False, "frames": 0, "files": {}})
+            seg["frames"] += 1
+            frames = ev["frame"] + 1
+            last_frame = ev
+        elif kind in ("segment_close", "recovered"):
+            seg = segments.setdefault(ev["segment"], {"closed": False, "frames": 0, "files": {}})
+            seg["closed"] = True
+            seg["files"] = ev.get("files", {})
+        elif kind == "end":
+            ended = True
+        elif kind in ("session", "resume"):
+            ended = False
+
+    for k, seg in sorted(segments.items()):
+        if seg["closed"]:
+            for name in seg["files"]:
+                ok, detail = validate_file(session_dir / name)
+                if not ok:
+                    problems.append(f"segment {k}: {name} {detail}")
+            continue
+
+        # Unfinished segment: keep whatever is readable, quarantine the rest.
+        files, lost = {}, []
+        for output in OUTPUT_FILES:
+            file = find_output(session_dir, last3, output, k)
+            if file is None:
+                continue
+            name = file.name
+            ok, detail = validate_file(file)
+            if ok:
+                files[name] = file.stat().st_size
+                continue
+            lost.append(name)
+            problems.append(f"segment {k}: {name} {detail}")
+            if repair:
+                file.rename(file.with_name(name + ".corrupt"))
+        problems.append(f"segment {k} was not closed ({seg['frames']} frame(s); "
+                        f"buffered npz frames of this segment are lost)")
+        if repair:
+            manifest = SessionManifest(path, append=True)
+            manifest.write("recovered", segment=k, frames=seg["frames"],
+                           files=files, lost=lost)
+            manifest.close()
+            seg["closed"] = True
+            seg["files"] = files
+
+    return {
+        "frames": frames,
+        "segments": segments,
+        "next_segment": max(segments) + 1 if segments else 0,
+        "next_frame": frames,
+        "last_seq": last_frame["seq"] if last_frame else None,
+        "last_timestamp_ns": last_frame["timestamp_ns"] if last_frame else None,
+        "ended": ended,
+        "problems": problems,
+    }
+
+
+def repair_csv(path, repair=True):
+    """Find a partial last row (no trailing newline) and, when repairing, cut
+    it off. Returns the number of torn bytes."""
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            cut = f.read(end - start).rfind(b"\n")
+            if cut >= 0:
+                end = start + cut + 1
+                break
+            end = start
+        if repair and end < size:
+            f.truncate(end)
+    return size - end
+
+
+def validate_file(path):
+    """Cheap readability check. Returns (ok, detail)."""
+    if not path.exists():
+        return False, "is missing"
+    if path.suffix == ".mp4":
+        cap = cv2.VideoCapture(str(path))
+        try:
+            if not cap.isOpened() or not cap.read()[0]:
+                return False, "is unreadable (unfinalized mp4?)"
+            return True, f"{int(cap.get(cv2.CAP_PROP_FRAME_COUNT))} frames"
+        finally:
+            cap.release()
+    if path.suffix == ".npz":
+        try:
+            with zipfile.ZipFile(path) as zf:
+                bad = zf.testzip()
+                if bad is not None:
+                    return False, f"has a corrupt member {bad}"
+                with zf.open("frames.npy") as f:
+                    version = np.lib.format.read_magic(f)
+                    if version == (1, 0):
+                        shape, _, _ = np.lib.format.read_array_header_1_0(f)
+                    else:
+                        shape, _, _ = np.lib.format.read_array_header_2_0(f)
+            return True, f"{shape[0]} frames"
+        except (zipfile.BadZipFile, KeyError, ValueError, OSError) as e:
+            return False, f"is unreadable ({e})"
+    if path.suffix == ".zfr":
+        try:
+            return True, f"{check_frames(path)} frames"
+        except (ValueError, OSError) as e:
+            return False, f"is unreadable ({e})"
+    return True, "unchecked"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("session_dir")
+    parser.add_argument("--serial", default=None, help="only this camera")
+    parser.add_argument("--check", action="store_true", help="report only, change nothing")
+    args = parser.parse_args(argv)
+
+    reports = recover_session(args.session_dir, serial=args.serial, repair=not args.check)
+    if not reports:
+        print(f"[Recovery] no manifests found in {args.session_dir}")
+        return 1
+    for last3, report in reports.items():
+        state = "clean" if report["ended"] else "interrupted"
+        print(f"[Recovery {last3}] {state}: {report['frames']} frame(s) in "
+              f"{len(report['segments'])} segment(s)")
+        for problem in report["problems"]:
+            print(f"[Recovery {last3}]   {problem}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
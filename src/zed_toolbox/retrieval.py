@@ -0,0 +1,158 @@
+"""
+Frame retrieval from the SDK into host (CpuRetriever) or device
+(GpuRetriever) memory. pyzed is imported when a retriever is built without
+an `sdk` argument, not at import time, so the CPU path runs against a
+stand-in SDK on hosts without the ZED SDK or a GPU.
+"""
+import numpy as np
+
+
+# stream id -> (retrieve kind, member of sl.VIEW / sl.MEASURE)
+STREAM_SOURCES = {
+    "left":        ("image", "LEFT"),
+    "right":       ("image", "RIGHT"),
+    "depth":       ("measure", "DEPTH"),
+    "confidence":  ("measure", "CONFIDENCE"),
+    "point_cloud": ("measure", "XYZ"),
+    "normals":     ("measure", "NORMALS"),
+}
+
+
+def load_sdk():
+    import pyzed.sl as sl
+    return sl
+
+
+def _sources(sdk, streams):
+    """{stream: (kind, SDK enum)} for the given streams."""
+    sources = {}
+    for name in streams:
+        kind, member = STREAM_SOURCES[name]
+        sources[name] = (kind, getattr(sdk.VIEW if kind == "image" else sdk.MEASURE, member))
+    return sources
+
+
+class CpuRetriever:
+    """
+    Retrieve streams into host-memory sl.Mats and hand out NumPy copies.
+
+    This is the default path. 4-channel buffers drop their last channel
+    (BGRA images -> BGR, XYZ/normals padding -> 3 floats); single-channel
+    measures are copied as-is. Every frame gets fresh arrays, so consumers
+    may keep references across grabs.
+
+    sdk: pyzed.sl (imported when None) or a stand-in providing Mat, VIEW
+    and MEASURE, so the retriever runs against a synthetic camera without
+    the ZED SDK. mat_factory overrides sdk.Mat.
+
+    retrieve(copy=False) skips the copy and returns views of the Mat
+    buffers; pass them through materialize() to get a standalone array.
+    Each stream alternates between two Mats, so a view stays valid until
+    the stream has been retrieved twice more.
+    """
+    memory = "cpu"
+
+    def __init__(self, streams, mat_factory=None, sdk=None):
+        sdk = sdk or load_sdk()
+        mat_factory = mat_factory or sdk.Mat
+        self._sources = _sources(sdk, streams)
+        self._mats = {name: (mat_factory(), mat_factory()) for name in streams}
+        self._flip = dict.fromkeys(streams, 0)
+
+
+    def retrieve(self, camera, streams=None, copy=True):
+        names = self._mats.keys() if streams is None else streams
+        out = {}
+        for name in names:
+            mat = _next_mat(self._mats, self._flip, name)
+            kind, source = self._sources[name]
+            if kind == "image":
+                camera.retrieve_image(mat, source)
+            else:
+                camera.retrieve_measure(mat, source)
+            data = mat.get_data()
+            out[name] = copy_frame(data) if copy else data
+        return out
+
+
+    def materialize(self, data):
+        return copy_frame(data)
+
+
+class GpuRetriever:
+    """
+    Retrieve streams into device-memory sl.Mats and hand out CuPy arrays.
+
+    Frames never touch host memory: the returned arrays implement
+    __cuda_array_interface__ and __dlpack__, so torch.from_dlpack(frame) or
+    cupy consumers use them in place. Copies (alpha drop for images) happen
+    on the device; the default stream is synchronized before the frame is
+    published, so readers always see complete data.
+
+    Requires cupy; raises RuntimeError at construction if it's missing.
+    """
+    memory = "gpu"
+
+    def __init__(self, streams, mat_factory=None, sdk=None):
+        try:
+            import cupy
+        except ImportError as e:
+            raise RuntimeError(
+                "memory='gpu' requires cupy (e.g. pip install cupy-cuda12x)"
+            ) from e
+        self._cp = cupy
+        sdk = sdk or load_sdk()
+        self._gpu = sdk.MEM.GPU
+        mat_factory = mat_factory or sdk.Mat
+        self._sources = _sources(sdk, streams)
+        self._mats = {name: (mat_factory(), mat_factory()) for name in streams}
+        self._flip = dict.fromkeys(streams, 0)
+
+
+    def retrieve(self, camera, streams=None, copy=True):
+        names = self._mats.keys() if streams is None else streams
+        out = {}
+        for name in names:
+            mat = _next_mat(self._mats, self._flip, name)
+            kind, source = self._sources[name]
+            if kind == "image":
+                camera.retrieve_image(mat, source, self._gpu)
+            else:
+                camera.retrieve_measure(mat, source, self._gpu)
+            data = mat.get_data(memory_type=self._gpu, deep_copy=False)
+            out[name] = copy_frame(data, xp=self._cp) if copy else data
+        self._cp.cuda.Stream.null.synchronize()
+        return out
+
+
+    def materialize(self, data):
+        out = copy_frame(data, xp=self._cp)
+        self._cp.cuda.Stream.null.synchronize()
+        return out
+
+
+def _next_mat(mats, flip, name):
+    flip[name] ^= 1
+    return mats[name][flip[name]]
+
+
+def make_retriever(memory, streams, sdk=None):
+    if memory == "gpu":
+        return GpuRetriever(streams, sdk=sdk)
+    return CpuRetriever(streams, sdk=sdk)
+
+
+def copy_frame(data, xp=np):
+    """Copy one retrieved Mat buffer into a standalone array. 4-channel
+    buffers lose their last channel (alpha / padding); everything else is
+    copied verbatim."""
+    if data.ndim == 3 and data.shape[2] == 4:
+        return xp.ascontiguousarray(data[:, :, :3])
+    return data.copy()
+
+
+def to_host(frame):
+    """Device array -> NumPy (via .get()); NumPy arrays pass through."""
+    if frame is None or isinstance(frame, np.ndarray):
+        return frame
+    return frame.get()
@@ -0,0 +1,142 @@
+import itertools
+import time
+
+
+class RetrieveScheduler:
+    """
+    Decides, per grab, which streams the capture thread retrieves.
+
+    A stream is retrieved when it is active and due. Active streams are the
+    configured streams minus any switched off with set_active(); consumers
+    use that to stop paying for measures nobody reads (retrieve_measure for
+    point clouds and normals is far from free). Due-ness follows an optional
+    per-stream rate, scheduled on a grid of camera timestamps so the
+    effective rate doesn't drift: a 15 Hz stream on a 30 fps camera lands on
+    every other grab.
+
+    The first grab after a stream becomes active always retrieves it.
+
+    With demand_timeout set, an active stream is also only retrieved while
+    someone wants it: it is held by a subscription (subscribe()), or was
+    read (touch()) within the last demand_timeout seconds. Every stream
+    starts out read, so nothing is skipped during the first timeout window.
+    With demand_timeout=None (default) demand is not tracked.
+    """
+
+    def __init__(self, streams, rates=None, camera_fps=30, demand_timeout=None):
+        self.streams = list(streams)
+        rates = rates or {}
+        self._period_ns = {name: int(1e9 / hz) for name, hz in rates.items()}
+        # Half a camera frame of slack absorbs timestamp jitter, so a stream
+        # at an exact divisor of the camera rate never slips by one grab.
+        self._slack_ns = int(0.5e9 / camera_fps)
+        self._next_ns = {}
+        self._active = set(self.streams)
+
+        self.demand_timeout = demand_timeout
+        self._subscriptions = {}    # token -> set of streams
+        self._tokens = itertools.count(1)
+        now = time.monotonic()
+        self._last_read = {name: now for name in self.streams}
+
+
+    @property
+    def active(self):
+        return set(self._active)
+
+
+    def set_active(self, streams):
+        """Retrieve only these streams (a subset of the configured ones)."""
+        streams = set(streams)
+        unknown = streams - set(self.streams)
+        if unknown:
+            raise ValueError(f"Stream(s) not configured: {sorted(unknown)}")
+        for name in streams - self._active:
+            self._next_ns.pop(name, None)
+        self._active = streams
+
+
+    def subscribe(self, streams):
+        """Hold these streams wanted until unsubscribe(token). Returns the token."""
+        streams = set(streams)
+        unknown = streams - set(self.streams)
+        if unknown:
+            raise ValueError(f"Stream(s) not configured: {sorted(unknown)}")
+        token = next(self._tokens)
+        self._subscriptions[token] = streams
+        return token
+
+
+    def unsubscribe(self, token):
+        self._subscriptions.pop(token, None)
+
+
+    def touch(self, streams, now=None):
+        """Record a read of these streams (unknown names are ignored)."""
+        now = time.monotonic() if now is None else now
+        for name in streams:
+            if name in self._last_read:
+                self._last_read[name] = now
+
+
+    @property
+    def demanded(self):
+        """Streams currently wanted by a subscription or a recent read."""
+        if self.demand_timeout is None:
+            return set(self.streams)
+        cutoff = time.monotonic() - self.demand_timeout
+        out = {name for name, t in self._last_read.items() if t >= cutoff}
+        for streams in self._subscriptions.values():
+            out |= streams
+        return out
+
+
+    def due(self, timestamp_ns):
+        """Streams to retrieve for a grab with this image timestamp."""
+        wanted = self._active & self.demanded
+        out = []
+        for name in self.streams:
+            if name not in wanted:
+                continue
+            period = self._period_ns.get(name)
+            if period is not None:
+                nxt = self._next_ns.get(name)
+                if nxt is not None and timestamp_ns < nxt - self._slack_ns:
+                    continue
+                if nxt is not None and timestamp_ns - nxt < period:
+                    self._next_ns[name] = nxt + period
+                else:
+                    self._next_ns[name] = timestamp_ns + period
+            out.append(name)
+        return out
+
+
+class Subscription:
+    """
+    Handle returned by ZedCamera.subscribe(). Keeps its streams retrieved
+    until close(); usable as a context manager.
+    """
+
+    def __init__(self, owner, token, streams):
+        self._owner = owner
+        self._token = token
+        self.streams = tuple(streams)
+
+
+    def close(self):
+        if self._token is not None:
+            self._owner._unsubscribe(self._token)
+            self._token = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def source_stream(name):
+    """The retrieved stream a published stream is derived from."""
+    return "depth" if name == "depth_filtered" else name
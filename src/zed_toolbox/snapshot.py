@@ -0,0 +1,100 @@
+import threading
+
+
+class LazyFrame:
+    """
+    A retrieved frame still sitting in its SDK buffer (copy_on_read).
+
+    The first get() copies it out and caches the copy. When the capture
+    thread is about to reuse the buffer it calls expire(). A get() after
+    that, if nothing copied the frame in time, returns None, and the reader
+    retries on a newer snapshot. Only readers racing that one copy ever
+    share the small per-frame lock. The capture thread takes it in
+    expire(), and waits at most for a copy already in progress.
+    """
+    __slots__ = ("_view", "_copy", "_value", "_lock")
+
+    def __init__(self, view, copy):
+        self._view = view
+        self._copy = copy
+        self._value = None
+        self._lock = threading.Lock()
+
+
+    def get(self):
+        value = self._value
+        if value is not None:
+            return value
+        with self._lock:
+            if self._value is None and self._view is not None:
+                self._value = self._copy(self._view)
+                self._view = None
+            return self._value
+
+
+    def expire(self):
+        with self._lock:
+            self._view = None
+
+
+class FrameSnapshot:
+    """
+    One published state of a camera: every stream's latest frame plus the
+    grab it came from (its metadata.SensorRow and, with change detection,
+    the seq of the newest grab whose image changed). Never modified
+    after publication. The capture thread
+    builds the next snapshot with updated() and publishes it by rebinding a
+    single attribute, so readers only ever see complete snapshots.
+    """
+    __slots__ = ("seq", "timestamp_ns", "frames", "stream_seq", "sensors", "change_seq")
+
+    def __init__(self, seq=0, timestamp_ns=None, frames=None, stream_seq=None, sensors=None,
+                 change_seq=None):
+        self.seq = seq
+        self.timestamp_ns = timestamp_ns
+        self.frames = frames or {}          # stream -> array | LazyFrame
+        self.stream_seq = stream_seq or {}  # stream -> seq it was retrieved at
+        self.sensors = sensors              # SensorRow of grab seq, or None
+        self.change_seq = change_seq        # seq of the last changed image, or None
+
+
+    def updated(self, frames, seq=None, timestamp_ns=None, stream_seq=None, sensors=None,
+                change_seq=None):
+        """A new snapshot with these frames replaced. By default their
+        stream_seq is the new seq."""
+        seq = self.seq if seq is None else seq
+        if stream_seq is None:
+            stream_seq = {name: seq for name in frames}
+        return FrameSnapshot(
+            seq,
+            self.timestamp_ns if timestamp_ns is None else timestamp_ns,
+            {**self.frames, **frames},
+            {**self.stream_seq, **stream_seq},
+            self.sensors if sensors is None else sensors,
+            self.change_seq if change_seq is None else change_seq,
+        )
+
+
+    def read(self, names=None):
+        """{stream: array} for these streams (default: all). Returns None if
+        a lazy frame expired before it could be copied."""
+        out = {}
+        for name in self.frames if names is None else names:
+            frame = self.frames.get(name)
+            if isinstance(frame, LazyFrame):
+                frame = frame.get()
+                if frame is None:
+                    return None
+            if frame is not None:
+                out[name] = frame
+        return out
+
+
+    def meta(self):
+        return {
+            "seq": self.seq,
+            "timestamp_ns": self.timestamp_ns,
+            "stream_seq": dict(self.stream_seq),
+            "sensors": self.sensors,
+            "change_seq": self.change_seq,
+        }
@@ -0,0 +1,379 @@
+"""
+Incremental spatial index over depth-derived points.
+
+VoxelGrid hashes points into voxel_size cubes and keeps, per occupied
+voxel, the running centroid, the total number of points seen (hits), the
+number of points in its latest observation, and when it was last observed.
+Each integrate() merges one frame into the grid in O(N log N + M) for N
+new points and M voxels, instead of rebuilding from scratch, and drops
+voxels that haven't been observed for max_age integrations.
+
+Voxel keys are the three cell indices packed into one int64 (21 bits
+each, x-major) and kept sorted, so a box query only scans the voxels
+whose x index is in range. Box, radius and ray queries are vectorized
+over those candidates. kdtree() builds a scipy cKDTree view over the
+centroids (cached until the next update) for nearest-neighbour queries.
+
+Like FrameSnapshot, the grid state is immutable once published: an update
+builds new arrays and publishes them by rebinding one attribute. Queries
+therefore never block on, or see half of, an update, and DepthMapper can
+feed the grid from a camera thread while planners query it.
+"""
+import threading
+import time
+
+import numpy as np
+
+from .geometry import depth_to_points, scale_intrinsics, transform_points
+from .retrieval import to_host
+
+
+_BITS = 21
+_OFFSET = 1 << (_BITS - 1)      # cell indices must lie in [-_OFFSET, _OFFSET)
+
+
+def _pack(ijk):
+    """(N, 3) int64 cell indices -> (N,) int64 keys, ordered x, then y, then z."""
+    keys = ijk[:, 0] + _OFFSET
+    keys <<= _BITS
+    keys += ijk[:, 1] + _OFFSET
+    keys <<= _BITS
+    keys += ijk[:, 2] + _OFFSET
+    return keys
+
+
+class _GridState:
+    """One published state of a VoxelGrid. Arrays are read-only."""
+    __slots__ = ("keys", "ijk", "centroids", "hits", "counts", "last_seen", "frame", "tree")
+
+    def __init__(self, keys, ijk, centroids, hits, counts, last_seen, frame):
+        self.keys = keys
+        self.ijk = ijk
+        self.centroids = centroids
+        self.hits = hits
+        self.counts = counts
+        self.last_seen = last_seen
+        self.frame = frame
+        self.tree = None
+        for arr in (keys, ijk, centroids, hits, counts, last_seen):
+            arr.flags.writeable = False
+
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, np.int64), np.empty((0, 3), np.int64), np.empty((0, 3), np.float64),
+                   np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64), 0)
+
+
+class VoxelGrid:
+    """
+    voxel_size: cube edge in the points' units (coordinate_units for camera
+        depth). Cell indices must fit 21 bits, i.e. points within about
+        ±1e6 voxels of the origin; points beyond that are dropped.
+    max_age: drop voxels not observed in the last max_age integrations
+        (None keeps everything, e.g. for static maps).
+
+    Query results are voxel centroids, so they are exact to within a voxel.
+    "Counts" are the points a voxel held in its latest observation, which
+    for a live camera approximates the points in the current frame.
+    """
+
+    def __init__(self, voxel_size, max_age=None):
+        if voxel_size <= 0:
+            raise ValueError(f"voxel_size must be > 0, got {voxel_size}")
+        if max_age is not None and max_age < 1:
+            raise ValueError(f"max_age must be >= 1 or None, got {max_age}")
+        self.voxel_size = float(voxel_size)
+        self.max_age = max_age
+        self._state = _GridState.empty()
+        self._write_lock = threading.Lock()
+        self.last_update_ms = None
+
+
+    def __len__(self):
+        return len(self._state.keys)
+
+
+    @property
+    def frame(self):
+        """Number of integrations so far."""
+        return self._state.frame
+
+
+    def clear(self):
+        with self._write_lock:
+            self._state = _GridState.empty()
+
+
+    def integrate(self, points):
+        """
+        Merge one frame of (N, 3) points. Voxels hit by this frame get their
+        centroid and hits updated and their count set to this frame's
+        points; new voxels are inserted in key order. Returns the number of
+        occupied voxels afterwards.
+        """
+        t0 = time.perf_counter()
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+        finite = np.isfinite(points).all(axis=1)
+        if not finite.all():
+            points = points[finite]
+        cells = np.floor(points * np.float32(1.0 / self.voxel_size)).astype(np.int64)
+        if len(cells) and (cells.min() < -_OFFSET or cells.max() >= _OFFSET):
+            in_range = ((cells >= -_OFFSET) & (cells < _OFFSET)).all(axis=1)
+            cells, points = cells[in_range], points[in_range]
+
+        # Group by voxel with one argsort; np.unique(return_index=True,
+        # return_inverse=True) is several times slower on HD-sized frames.
+        keys = _pack(cells)
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if len(keys) else order
+        new_keys = sorted_keys[starts]
+        n = np.diff(np.r_[starts, len(keys)])
+        new_cells = cells[order[starts]]
+        if len(keys):
+            sums = np.add.reduceat(points[order], starts, axis=0, dtype=np.float64)
+        else:
+            sums = np.empty((0, 3))
+
+        with self._write_lock:
+            old = self._state
+            frame = old.frame + 1
+            pos = np.searchsorted(old.keys, new_keys)
+            found = pos < len(old.keys)
+            found[found] = old.keys[pos[found]] == new_keys[found]
+            hit, miss = pos[found], ~found
+
+            hits = old.hits.copy()
+            counts = old.counts.copy()
+            last_seen = old.last_seen.copy()
+            centroid_sums = old.centroids * old.hits[:, None]
+            centroid_sums[hit] += sums[found]
+            hits[hit] += n[found]
+            counts[hit] = n[found]
+            last_seen[hit] = frame
+
+            at = pos[miss]
+            keys = np.insert(old.keys, at, new_keys[miss])
+            ijk = np.insert(old.ijk, at, new_cells[miss], axis=0)
+            centroid_sums = np.insert(centroid_sums, at, sums[miss], axis=0)
+            hits = np.insert(hits, at, n[miss])
+            counts = np.insert(counts, at, n[miss])
+            last_seen = np.insert(last_seen, at, frame)
+
+            if self.max_age is not None:
+                keep = last_seen > frame - self.max_age
+                if not keep.all():
+                    keys, ijk, centroid_sums = keys[keep], ijk[keep], centroid_sums[keep]
+                    hits, counts, last_seen = hits[keep], counts[keep], last_seen[keep]
+
+            centroids = centroid_sums / np.maximum(hits, 1)[:, None]
+            self._state = _GridState(keys, ijk, centroids, hits, counts, last_seen, frame)
+        self.last_update_ms = (time.perf_counter() - t0) * 1e3
+        return len(keys)
+
+
+    def integrate_depth(self, depth, K, T=None, stride=2, min_depth=0.0, max_depth=None):
+        """Deproject a depth map (see geometry.depth_to_points), move it into
+        the grid's frame with the 4x4 T, and integrate it."""
+        points = depth_to_points(to_host(depth), np.asarray(K, dtype=np.float64), stride,
+                                 min_depth, max_depth)
+        if T is not None:
+            points = transform_points(points, T)
+        return self.integrate(points)
+
+
+    def voxels(self):
+        """(centroids (M, 3), counts (M,)) of every occupied voxel, read-only."""
+        state = self._state
+        return state.centroids, state.counts
+
+
+    def _box_candidates(self, state, lo, hi):
+        """Indices of voxels whose cell overlaps [lo, hi]: a key-range slice on
+        x, then a vectorized test on y and z."""
+        lo_cell = np.floor(np.asarray(lo, dtype=np.float64) / self.voxel_size).astype(np.int64)
+        hi_cell = np.floor(np.asarray(hi, dtype=np.float64) / self.voxel_size).astype(np.int64)
+        lo_cell, hi_cell = np.clip(lo_cell, -_OFFSET, _OFFSET - 1), np.clip(hi_cell, -_OFFSET, _OFFSET - 1)
+        bounds = _pack(np.array([[lo_cell[0], -_OFFSET, -_OFFSET], [hi_cell[0], _OFFSET - 1, _OFFSET - 1]]))
+        start = int(np.searchsorted(state.keys, bounds[0], side="left"))
+        stop = int(np.searchsorted(state.keys, bounds[1], side="right"))
+        ijk = state.ijk[start:stop, 1:]
+        inside = ((ijk >= lo_cell[1:]) & (ijk <= hi_cell[1:])).all(axis=1)
+        return start + np.flatnonzero(inside)
+
+
+    def query_box(self, lo, hi):
+        """Centroids of the voxels inside the axis-aligned box [lo, hi]."""
+        state = self._state
+        idx = self._box_candidates(state, lo, hi)
+        c = state.centroids[idx]
+        return c[((c >= lo) & (c <= hi)).all(axis=1)]
+
+
+    def count_box(self, lo, hi):
+        """Points (latest observation counts) in the box [lo, hi]."""
+        state = self._state
+        idx = self._box_candidates(state, lo, hi)
+        c = state.centroids[idx]
+        return int(state.counts[idx][((c >= lo) & (c <= hi)).all(axis=1)].sum())
+
+
+    def query_radius(self, center, radius, return_counts=False):
+        """Centroids within radius of center (and their counts)."""
+        state = self._state
+        center = np.asarray(center, dtype=np.float64)
+        idx = self._box_candidates(state, center - radius, center + radius)
+        d2 = np.sum((state.centroids[idx] - center) ** 2, axis=1)
+        idx = idx[d2 <= radius * radius]
+        if return_counts:
+            return state.centroids[idx], state.counts[idx]
+        return state.centroids[idx]
+
+
+    def count_radius(self, center, radius):
+        return int(self.query_radius(center, radius, return_counts=True)[1].sum())
+
+
+    def nearest_to_ray(self, origin, direction, max_range=None, radius=None):
+        """
+        The voxel centroid closest to the ray origin + t * direction, t >= 0
+        (and <= max_range). With radius, only centroids within radius of the
+        ray count, and the one with the smallest t wins (a first-hit raycast).
+
+        Returns (point, distance to the ray, t) or None.
+        """
+        state = self._state
+        origin = np.asarray(origin, dtype=np.float64)
+        d = np.asarray(direction, dtype=np.float64)
+        d = d / np.linalg.norm(d)
+        if max_range is not None:
+            pad = radius if radius is not None else 0.0
+            end = origin + d * max_range
+            idx = self._box_candidates(state, np.minimum(origin, end) - pad, np.maximum(origin, end) + pad)
+        else:
+            idx = np.arange(len(state.keys))
+        rel = state.centroids[idx] - origin
+        t = rel @ d
+        ok = t >= 0 if max_range is None else (t >= 0) & (t <= max_range)
+        idx, rel, t = idx[ok], rel[ok], t[ok]
+        dist = np.linalg.norm(rel - t[:, None] * d, axis=1)
+        if radius is not None:
+            within = dist <= radius
+            idx, t, dist = idx[within], t[within], dist[within]
+            best = np.argmin(t) if len(t) else None
+        else:
+            best = np.argmin(dist) if len(dist) else None
+        if best is None:
+            return None
+        return state.centroids[idx[best]], float(dist[best]), float(t[best])
+
+
+    def raycast(self, origin, direction, max_range=None, radius=None):
+        """First voxel along the ray: nearest_to_ray() with radius defaulting
+        to half a voxel diagonal. Returns (point, t) or None."""
+        radius = self.voxel_size * np.sqrt(3) / 2 if radius is None else radius
+        hit = self.nearest_to_ray(origin, direction, max_range, radius)
+        return None if hit is None else (hit[0], hit[2])
+
+
+    def kdtree(self):
+        """scipy.spatial.cKDTree over the current centroids, built on first use
+        and cached until the next update. Indices match voxels()."""
+        return self._tree(self._state)
+
+
+    def _tree(self, state):
+        if state.tree is None:
+            try:
+                from scipy.spatial import cKDTree
+            except ImportError as e:
+                raise RuntimeError("VoxelGrid.kdtree() requires SciPy (pip install scipy)") from e
+            state.tree = cKDTree(state.centroids)
+        return state.tree
+
+
+    def nearest(self, points, k=1):
+        """(distances, centroids) of the k nearest voxels to each query point
+        (via kdtree())."""
+        state = self._state
+        if len(state.keys) == 0:
+            raise ValueError("nearest() on an empty grid")
+        dist, idx = self._tree(state).query(np.asarray(points, dtype=np.float64), k=k)
+        return dist, state.centroids[idx]
+
+
+    def stats(self):
+        state = self._state
+        return {
+            "voxels": len(state.keys),
+            "points": int(state.counts.sum()),
+            "frame": state.frame,
+            "update_ms": self.last_update_ms,
+        }
+
+
+class DepthMapper:
+    """
+    Feeds one ZedCamera's depth into a VoxelGrid on a background thread:
+    blocks in wait_for_frame(), deprojects every stride-th pixel, moves the
+    points into the grid frame with extrinsics (4x4, e.g.
+    CameraSystem.extrinsics[serial]) and integrates them. Several mappers
+    can share one grid; max_age then counts integrations from all of them.
+    Frames arriving while an integration runs are skipped, not queued.
+    """
+
+    def __init__(self, zed_camera, grid, stream=None, stride=2, min_depth=0.0, max_depth=None,
+                 extrinsics=None):
+        if stream is None:
+            stream = "depth_filtered" if zed_camera.cfg.depth_filters else "depth"
+        self.zed_camera = zed_camera
+        self.grid = grid
+        self.stream = stream
+        self.stride = stride
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.extrinsics = None if extrinsics is None else np.asarray(extrinsics, dtype=np.float64)
+        self.frames = 0
+        self.last_seq = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+
+    def _run(self):
+        last3 = str(self.zed_camera.serial)[-3:]
+        while not self._stop_event.is_set():
+            result = self.zed_camera.wait_for_frame(self.last_seq, timeout=0.5, streams=[self.stream])
+            if result is None:
+                continue
+            frames, meta = result
+            self.last_seq = meta["seq"]
+            depth = frames.get(self.stream)
+            intr = self.zed_camera.get_intrinsics()
+            if depth is None or intr is None:
+                continue
+            depth = to_host(depth)
+            K = scale_intrinsics(intr["matrix"], intr.get("size"), depth.shape)
+            try:
+                self.grid.integrate_depth(depth, K, self.extrinsics, self.stride,
+                                          self.min_depth, self.max_depth)
+            except Exception as e:
+                print(f"[Spatial {last3}] integrate failed: {e}")
+                continue
+            self.frames += 1
+
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
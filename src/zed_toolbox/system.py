@@ -1,4 +1,17 @@
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .burst import capture_bursts
 from .camera import Camera
+from .events import EventBus
+from .exposure import ExposureController
+from .geometry import as_transform, camera_cloud, scale_intrinsics, voxel_downsample
+from .history import align_nearest
+from .planner import MemoryGuard, plan_system
+from .retrieval import to_host
+from .worker import ProcessCamera
 
 
 class CameraSystem:
@@ -9,33 +22,106 @@ class CameraSystem:
     get_observations(). Does not own a KeyListener: the caller decides
     when to trigger recording.
 
-    Typical use:
+    Every camera publishes on one events.EventBus (self.events): "frame"
+    and "health" from each ZedCamera, "recording" from each Recorder. A
+    KeyListener given the same bus adds "key" events, so the whole
+    application can block on one queue instead of polling:
+
         system = CameraSystem({
             24944966: CameraConfig(zed=..., recorder=...),
             27821499: CameraConfig(zed=..., recorder=...),
         })
         system.launch()
-        with KeyListener() as keys:
-            while system.is_alive:
-                system.get_observations()
-                if keys.consume_pressed("s"):    system.start_recording()
-                if keys.consume_pressed("e"):    system.stop_recording()
-                if keys.consume_pressed("esc"):  break
+        with system.events.queue(["frame", "key"]) as queue, KeyListener(events=system.events):
+            for ev in queue:
+                if ev.kind == "frame":
+                    system.cameras[ev.source].get_observations()
+                elif ev.data["key"] == "s":  system.start_recording()
+                elif ev.data["key"] == "e":  system.stop_recording()
+                elif ev.data["key"] == "esc":  break
         system.shutdown()
+
+    use_processes: run each camera's capture in its own worker process
+        (see worker.ProcessCamera) so NumPy copies and SDK calls of different
+        cameras don't serialize on the GIL. Frames return via shared memory;
+        get_observations() keeps the same return shape. Crashed workers are
+        restarted up to max_restarts times per camera.
+    record_in_worker: with use_processes, also run each Recorder inside its
+        camera's worker process instead of on the coordinator.
+    shared_exposure: drive every camera from one ExposureController, so all
+        cameras run identical exposure/gain (metered on their combined
+        frames). Every camera needs ZedConfig.exposure_control; the first
+        camera's parameters are used. Not available with use_processes.
+    memory_budget_mb: resident memory this process may use. launch() warns
+        when the plan (see plan()) exceeds it, and a planner.MemoryGuard
+        keeps the process under it while running: it closes the segment of
+        the recorder buffering the most, then stops retrieving streams no
+        viewer or recorder consumes. Actions are published as "memory"
+        events. With use_processes only the coordinator is guarded.
+
+    CameraConfig.extrinsics places each camera in a shared system frame;
+    get_fused_point_cloud() merges every camera's depth into one cloud there.
     """
 
-    def __init__(self, configs):
+    def __init__(self, configs, use_processes=False, record_in_worker=False, max_restarts=3,
+                 shared_exposure=False, memory_budget_mb=None, events=None):
         if not configs:
             raise ValueError("CameraSystem requires at least one camera config")
-        self.cameras = {serial: Camera(serial, cfg) for serial, cfg in configs.items()}
+        if record_in_worker and not use_processes:
+            raise ValueError("record_in_worker requires use_processes=True")
+        if shared_exposure and use_processes:
+            raise ValueError("shared_exposure is not supported with use_processes=True")
+        if memory_budget_mb is not None and memory_budget_mb <= 0:
+            raise ValueError("memory_budget_mb must be > 0")
+        self.events = events if events is not None else EventBus()
+        if use_processes:
+            self.cameras = {
+                serial: ProcessCamera(serial, cfg, record_in_worker=record_in_worker,
+                                      max_restarts=max_restarts, events=self.events)
+                for serial, cfg in configs.items()
+            }
+        else:
+            self.cameras = {serial: Camera(serial, cfg, events=self.events) for serial, cfg in configs.items()}
+        self.exposure_controller = None
+        if shared_exposure:
+            self._share_exposure()
+        self.extrinsics = {serial: as_transform(cam.cfg.extrinsics) for serial, cam in self.cameras.items()}
+        self._cloud_pool = None
+        self._cloud_pool_size = 0
+        self.memory_budget_mb = memory_budget_mb
+        self.memory_guard = None
         self._launched = False
 
 
+    def _share_exposure(self):
+        zed_cfgs = [cam.zed_camera.cfg for cam in self.cameras.values()]
+        if any(cfg.exposure_control is None for cfg in zed_cfgs):
+            raise ValueError("shared_exposure requires ZedConfig.exposure_control on every camera")
+        first = zed_cfgs[0]
+        self.exposure_controller = ExposureController(
+            exposure=first.exposure, gain=first.gain, **first.exposure_control,
+        )
+        for cam in self.cameras.values():
+            cam.zed_camera.set_exposure_controller(self.exposure_controller)
+
+
+    def plan(self):
+        """Expected memory and bandwidth of this system, from the configs
+        (planner.plan_system())."""
+        return plan_system({serial: cam.cfg for serial, cam in self.cameras.items()}, self.memory_budget_mb)
+
+
     def launch(self):
+        plan = self.plan()
+        for warning in plan["warnings"]:
+            print(f"[System] WARNING: {warning}")
         for cam in self.cameras.values():
             cam.launch()
+        if self.memory_budget_mb is not None:
+            self.memory_guard = MemoryGuard(self.cameras, self.memory_budget_mb, events=self.events)
+            self.memory_guard.start()
         self._launched = True
-        print(f"[System] launched {len(self.cameras)} camera(s)")
+        print(f"[System] launched {len(self.cameras)} camera(s), expected memory {plan['total_mb']:.0f} MB")
 
 
     def get_observations(self, overlays_by_serial=None):
@@ -47,6 +133,139 @@ class CameraSystem:
         }
 
 
+    def get_aligned(self, stream="left", timestamp_ns=None, tolerance_ms=None):
+        """
+        Frame of `stream` nearest to one timestamp from every camera's
+        history (ZedConfig.history_frames / history_mb must be set; not
+        available with use_processes). timestamp_ns defaults to the newest
+        time all cameras have reached. Cameras with no frame within
+        tolerance_ms map to None.
+
+        Returns {serial: (frame, timestamp_ns, seq) | None}; frames are
+        zero-copy views into the histories.
+        """
+        histories = {serial: cam.zed_camera.history for serial, cam in self.cameras.items()}
+        missing = [serial for serial, h in histories.items() if h is None]
+        if missing:
+            raise RuntimeError(f"get_aligned requires a frame history on every camera; missing: {missing}")
+        tolerance_ns = None if tolerance_ms is None else int(tolerance_ms * 1e6)
+        return align_nearest(histories, stream, timestamp_ns, tolerance_ns)
+
+
+    def get_fused_point_cloud(self, voxel_size=0.01, stride=2, min_depth=0.0, max_depth=None,
+                              colors=False, stream=None, tolerance_ms=None, processes=0,
+                              return_meta=False):
+        """
+        One voxel-downsampled point cloud from every camera's latest depth,
+        in the system frame given by CameraConfig.extrinsics.
+
+        Depth is taken time-aligned from the frame histories when every
+        camera keeps `stream` in one (see get_aligned(); tolerance_ms drops
+        cameras too far off), else from each camera's latest snapshot.
+        stream defaults to "depth_filtered" when every camera filters depth,
+        else "depth". Each camera is deprojected (every stride-th pixel,
+        depths in [min_depth, max_depth]), transformed, and downsampled on its
+        own; the merged cloud is downsampled once more so overlapping views
+        don't double up.
+
+        processes: N > 0 runs the per-camera work on a pool of N worker
+            processes (kept until shutdown()); worth it with many cameras or
+            stride=1. The calling script needs the usual
+            `if __name__ == "__main__":` guard.
+
+        Returns (N, 3) float32 points in coordinate_units; with colors=True,
+        (points, colors) with (N, 3) uint8 BGR colors from the left image;
+        with return_meta=True, additionally {serial: {"seq", "timestamp_ns"}}
+        of the depth frames used.
+        """
+        if len(self.cameras) > 1:
+            missing = [serial for serial, cam in self.cameras.items() if cam.cfg.extrinsics is None]
+            if missing:
+                raise RuntimeError(f"get_fused_point_cloud requires CameraConfig.extrinsics; missing: {missing}")
+        units = {cam.zed_camera.cfg.coordinate_units for cam in self.cameras.values()}
+        if len(units) > 1:
+            raise ValueError(f"cameras use different coordinate_units: {sorted(units)}")
+        if stream is None:
+            filtered = all(cam.zed_camera.cfg.depth_filters for cam in self.cameras.values())
+            stream = "depth_filtered" if filtered else "depth"
+
+        jobs, meta = [], {}
+        for serial, (depth, image, seq, ts) in self._synced_depth(stream, colors, tolerance_ms).items():
+            intr = self.cameras[serial].zed_camera.get_intrinsics()
+            K = scale_intrinsics(intr["matrix"], intr.get("size"), depth.shape)
+            jobs.append((depth, K, self.extrinsics[serial], stride, min_depth, max_depth,
+                         voxel_size, image))
+            meta[serial] = {"seq": seq, "timestamp_ns": ts}
+
+        if processes and jobs:
+            if self._cloud_pool is None or self._cloud_pool_size != processes:
+                if self._cloud_pool is not None:
+                    self._cloud_pool.shutdown()
+                self._cloud_pool = ProcessPoolExecutor(processes, mp_context=mp.get_context("spawn"))
+                self._cloud_pool_size = processes
+            parts = list(self._cloud_pool.map(camera_cloud, *zip(*jobs)))
+        else:
+            parts = [camera_cloud(*job) for job in jobs]
+
+        if parts:
+            points = np.concatenate([p for p, _ in parts])
+            cols = np.concatenate([c for _, c in parts]) if colors and all(c is not None for _, c in parts) else None
+        else:
+            points, cols = np.empty((0, 3), np.float32), (np.empty((0, 3), np.uint8) if colors else None)
+        if len(parts) > 1 and voxel_size:
+            out = voxel_downsample(points, voxel_size, cols)
+            points, cols = out if cols is not None else (out, None)
+
+        result = (points, cols) if colors else points
+        return (result, meta) if return_meta else result
+
+
+    def _synced_depth(self, stream, colors, tolerance_ms):
+        """{serial: (depth, left image | None, seq, timestamp_ns)}."""
+        histories = {serial: cam.zed_camera.history for serial, cam in self.cameras.items()}
+        out = {}
+        if all(h is not None and stream in h.streams for h in histories.values()):
+            for serial, hit in self.get_aligned(stream, tolerance_ms=tolerance_ms).items():
+                if hit is None:
+                    continue
+                depth, ts, seq = hit
+                image = None
+                if colors and "left" in histories[serial].streams:
+                    near = histories[serial].nearest("left", ts)
+                    image = near[0] if near is not None else None
+                out[serial] = (depth, image, seq, ts)
+            return out
+        names = [stream, "left"] if colors else [stream]
+        for serial, cam in self.cameras.items():
+            frames, meta = cam.zed_camera.get_current_state(return_meta=True, streams=names)
+            if frames.get(stream) is None:
+                continue
+            out[serial] = (to_host(frames[stream]), to_host(frames.get("left")),
+                           meta["seq"], meta["timestamp_ns"])
+        return out
+
+
+    def snapshot(self, n=1, streams=None, timeout=5.0, save_dir=None, codec="png"):
+        """
+        Camera.snapshot() on every camera at once (one thread each, released
+        together), e.g. 50 frames of a calibration board from every view.
+        Returns {serial: Burst}; pair frames across cameras by
+        burst.timestamp_ns. With save_dir every burst is saved there in the
+        background (burst.saved).
+        """
+        bursts = capture_bursts({serial: cam.zed_camera for serial, cam in self.cameras.items()},
+                                n, streams, timeout)
+        if save_dir is not None:
+            for burst in bursts.values():
+                burst.save(save_dir, codec)
+        return bursts
+
+
+    def get_health(self):
+        """{serial: ZedCamera.get_health()} — watchdog state and gaps per camera."""
+        return {serial: cam.zed_camera.get_health() for serial, cam in self.cameras.items()}
+
+
     def start_recording(self):
         for cam in self.cameras.values():
             cam.start_recording()
@@ -58,14 +277,23 @@ class CameraSystem:
 
 
     def shutdown(self):
+        if self.memory_guard is not None:
+            self.memory_guard.stop()
+            self.memory_guard = None
         for cam in self.cameras.values():
             cam.shutdown()
+        if self._cloud_pool is not None:
+            self._cloud_pool.shutdown()
+            self._cloud_pool = None
+        self._cloud_pool_size = 0
         self._launched = False
         print("[System] shutdown complete")
 
 
     @property
     def is_alive(self):
+        """False once any camera has failed for good (a reconnecting camera
+        still counts as alive) or any viewer window was closed."""
         if not self._launched:
             return False
         for cam in self.cameras.values():
@@ -5,7 +5,9 @@ import termios
 import threading
 import tty
 
-import cv2
+import numpy as np
+
+from .overlays import draw_item
 
 
 class KeyListener:
@@ -21,15 +23,22 @@ class KeyListener:
                 if keys.consume_pressed("s"):    system.start_recording()
                 if keys.consume_pressed("e"):    system.stop_recording()
                 if keys.consume_pressed("esc"):  running = False
+
+    With events (an events.EventBus), every keypress is also published as a
+    "key" event ({"key": name}, source "keyboard"), so a loop can block on
+    the bus instead of polling consume_pressed(). The reader thread sleeps
+    in select() until a key arrives or stop() wakes it.
     """
 
-    def __init__(self):
+    def __init__(self, events=None):
+        self.events = events
         self._pressed = set()
         self._lock = threading.Lock()
         self._stop_event = threading.Event()
         self._thread = None
         self._old_settings = None
         self._fd = None
+        self._wake = None           # self-pipe (read, write) that interrupts select()
 
     def start(self):
         if not sys.stdin.isatty():
@@ -38,15 +47,22 @@ class KeyListener:
         self._fd = sys.stdin.fileno()
         self._old_settings = termios.tcgetattr(self._fd)
         tty.setcbreak(self._fd)
+        self._wake = os.pipe()
         self._stop_event.clear()
         self._thread = threading.Thread(target=self._loop, daemon=True)
         self._thread.start()
 
     def stop(self):
         self._stop_event.set()
+        if self._wake is not None:
+            os.write(self._wake[1], b"x")
         if self._thread is not None:
             self._thread.join(timeout=1.0)
             self._thread = None
+        if self._wake is not None:
+            for fd in self._wake:
+                os.close(fd)
+            self._wake = None
         if self._old_settings is not None:
             termios.tcsetattr(self._fd, termios.TCSADRAIN, self._old_settings)
             self._old_settings = None
@@ -61,8 +77,8 @@ class KeyListener:
 
     def _loop(self):
         while not self._stop_event.is_set():
-            r, _, _ = select.select([self._fd], [], [], 0.1)
-            if not r:
+            r, _, _ = select.select([self._fd, self._wake[0]], [], [])
+            if self._fd not in r:
                 continue
             ch = os.read(self._fd, 1).decode(errors="ignore")
             if ch == "\x1b":
@@ -76,6 +92,8 @@ class KeyListener:
                 name = ch
             with self._lock:
                 self._pressed.add(name)
+            if self.events is not None:
+                self.events.publish("key", "keyboard", key=name)
 
     def __enter__(self):
         self.start()
@@ -86,29 +104,26 @@ class KeyListener:
 
 
 def draw_overlays(image, overlays):
+    """Return a copy of image with overlays drawn on it. For per-frame use,
+    prefer overlays.OverlayRenderer, which reuses its output buffer."""
     copied = image.copy()
     for item in overlays:
-        if item["type"] == "dot" and item.get("xy") is not None:
-            cv2.circle(
-                copied,
-                (int(item["xy"][0]), int(item["xy"][1])),
-                item.get("radius", 6),
-                item.get("color", (0, 255, 0)),
-                -1,
-            )
-        elif item["type"] == "text":
-            cv2.putText(
-                copied,
-                text=item.get("content", item.get("text", "")),
-                org=item.get("position", [50, 50]),
-                color=item.get("color", (0, 0, 255)),
-                fontFace=cv2.FONT_HERSHEY_SIMPLEX,
-                fontScale=1,
-                thickness=3,
-            )
+        draw_item(copied, item)
     return copied
 
 
+def pixel_to_point(K, u, v, z):
+    """Back-project pixel (u, v) at depth z through intrinsics K. Returns
+    [x, y, z] in the camera frame, or None if z is not a valid depth."""
+    if not np.isfinite(z) or z <= 0:
+        return None
+    fx, fy = K[0, 0], K[1, 1]
+    cx, cy = K[0, 2], K[1, 2]
+    x = (u - cx) * z / fx
+    y = (v - cy) * z / fy
+    return [x, y, z]
+
+
 def save_calibration_file(filepath, K, baseline):
     k_flat = " ".join([str(val) for val in K.flatten()])
     baseline_str = f"{baseline:.18f}"
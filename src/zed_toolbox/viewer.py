@@ -4,7 +4,7 @@ import cv2
 import numpy as np
 
 from .config import ViewerConfig
-from .utils import draw_overlays
+from .overlays import OverlayRenderer
 
 
 class Viewer:
@@ -14,9 +14,13 @@ class Viewer:
     Accepts a streams dict (matching ZedCamera.get_current_state()) and
     renders the streams listed in cfg.show side-by-side, rate-limited to
     cfg.fps.
+
+    overlay_renderer: optional OverlayRenderer shared with other sinks (the
+    Camera passes the same one to its Recorder so overlays render once per
+    frame). A private renderer is created if omitted.
     """
 
-    def __init__(self, serial, config=None):
+    def __init__(self, serial, config=None, overlay_renderer=None):
         self.serial = serial
 
         if config is None:
@@ -27,6 +31,7 @@ class Viewer:
 
         self.frame_interval = 1.0 / self.cfg.fps if self.cfg.fps > 0 else 0
         self._last_update = 0
+        self._overlays = overlay_renderer or OverlayRenderer()
 
         self.window_name = f"Zed {str(self.serial)[-3:]}"
         cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
@@ -36,10 +41,11 @@ class Viewer:
         """
         streams: dict from ZedCamera.get_current_state().
         overlays: optional list applied to the "left" panel only.
+        Returns True if the frame was drawn (False: rate-limited).
         """
         now = time.time()
         if now - self._last_update < self.frame_interval:
-            return
+            return False
         self._last_update = now
 
         panels = []
@@ -58,6 +64,7 @@ class Viewer:
 
         cv2.imshow(self.window_name, display)
         cv2.waitKey(1)
+        return True
 
 
     def is_window_open(self):
@@ -76,11 +83,17 @@ class Viewer:
 
     def _render_panel(self, name, img, overlays):
         if name == "left":
-            return draw_overlays(img, overlays) if overlays else img
+            return self._overlays.render(img, overlays) if self._overlays.has_overlays(overlays) else img
         if name == "right":
             return img
-        if name == "depth":
+        if name in ("depth", "depth_filtered"):
             return self._depth_to_color(img)
+        if name == "confidence":
+            # SDK confidence: 0 (most confident) .. 100; brighter = more confident.
+            gray = (255 - np.clip(np.nan_to_num(img, nan=100.0), 0, 100) * 2.55).astype(np.uint8)
+            return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        if name == "normals":
+            return ((np.nan_to_num(img) + 1.0) * 127.5).clip(0, 255).astype(np.uint8)
         return img
 
 
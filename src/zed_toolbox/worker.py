@@ -0,0 +1,520 @@
+import multiprocessing as mp
+import threading
+import time
+from multiprocessing import connection, shared_memory
+
+import numpy as np
+
+from .camera import Camera
+from .metadata import SENSOR_FIELDS, SensorRow, empty_row
+from .config import ZedConfig
+from .recorder import Recorder
+from .scheduler import Subscription
+from .utils import pixel_to_point
+from .zed import HEALTH_STATES
+
+
+# Shared header layout: the frame's seq, timestamp and change_seq (-1 =
+# None), then the child's get_health(); followed by one stream_seq per
+# shared stream, in layout order.
+_HEADER = ("seq", "timestamp_ns", "change_seq", "state", "reconnects", "grab_errors", "gaps",
+           "last_good_ns", "last_gap_us", "longest_gap_us")
+_HEALTH = slice(3, len(_HEADER))
+
+# The frame's SensorRow (ZedConfig.metadata), as one shared record.
+_SENSOR_DTYPE = np.dtype([(name, dtype, shape) for name, (dtype, shape) in SENSOR_FIELDS.items()])
+
+
+class ZedWorker:
+    """
+    Runs a ZedCamera (and optionally its Recorder) in a child process.
+
+    Coordinator-side stand-in for ZedCamera: exposes launch(),
+    get_current_state(), wait_for_frame(), get_intrinsics(),
+    deproject_pixel_to_point(), shutdown(), plus cfg and intrinsics.
+
+    The child writes every new frame into per-stream shared-memory buffers
+    (guarded by one cross-process lock); get_current_state() copies them out,
+    so the coordinator never shares arrays with the child. The frame's meta
+    (seq, timestamp_ns, change_seq, stream_seq and, with cfg.metadata, the
+    SensorRow) travels in a shared header next to them. The child then
+    notifies a cross-process Condition, on which wait_for_frame() blocks.
+    A supervisor thread watches the child and relaunches it after a crash,
+    up to max_restarts times with exponential backoff. While the child is
+    down, get_current_state() returns {}. The child's capture watchdog reports
+    through the same header (get_health()); a camera the child gives up on
+    ends the child, so it counts as a crash.
+    """
+
+    def __init__(self, serial, config=None, recorder_config=None,
+                 max_restarts=3, launch_timeout=30.0):
+        if not serial:
+            raise ValueError("Missing camera serial number.")
+        self.serial = serial
+
+        if config is None:
+            config = ZedConfig()
+        elif isinstance(config, dict):
+            config = ZedConfig(**config)
+        if config.memory == "gpu":
+            raise ValueError("ZedWorker shares frames through host memory; memory='gpu' is not supported")
+        if config.history_frames is not None or config.history_mb is not None:
+            raise ValueError("ZedWorker does not keep a frame history; history_* is not supported")
+        self.cfg = config
+        self.recorder_cfg = recorder_config
+        self.history = None
+
+        self.max_restarts = max_restarts
+        self.launch_timeout = launch_timeout
+        self.restarts = 0
+        self.failed = False
+        self.is_recording = False
+
+        self._ctx = mp.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._shm_lock = None
+        self._frame_cond = None     # Condition on _shm_lock, notified per frame
+        self._published = None      # shared Value: seq of the last frame in shared memory
+        self._header_shm = None
+        self._header = None
+        self._sensors_shm = None
+        self._sensors = None        # _SENSOR_DTYPE record view, with cfg.metadata
+        self._buffers = {}          # stream -> (SharedMemory, ndarray view)
+        self._seq_offset = 0        # keeps seq monotonic across restarts
+
+        self._state_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._supervisor = None
+
+        self.intrinsics = None
+
+
+    def launch(self):
+        self._stopping.clear()
+        self._spawn()
+        self._supervisor = threading.Thread(target=self._supervise, daemon=True)
+        self._supervisor.start()
+
+
+    def _spawn(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        shm_lock = self._ctx.Lock()
+        frame_cond = self._ctx.Condition(shm_lock)
+        published = self._ctx.Value("q", 0, lock=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.serial, self.cfg, self.recorder_cfg, child_conn, shm_lock, frame_cond, published),
+            name=f"zed-{str(self.serial)[-3:]}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+
+        if not parent_conn.poll(self.launch_timeout):
+            process.kill()
+            process.join()
+            raise RuntimeError(f"[Worker {str(self.serial)[-3:]}] launch timed out")
+        kind, payload = parent_conn.recv()
+        if kind != "ready":
+            process.join(timeout=2)
+            raise RuntimeError(f"[Worker {str(self.serial)[-3:]}] launch failed: {payload}")
+
+        header_shm = shared_memory.SharedMemory(name=payload["header"])
+        sensors_shm = None
+        if payload["sensors"] is not None:
+            sensors_shm = shared_memory.SharedMemory(name=payload["sensors"])
+        buffers = {}
+        for name, (shm_name, shape, dtype) in payload["streams"].items():
+            shm = shared_memory.SharedMemory(name=shm_name)
+            buffers[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+        with self._state_lock:
+            self._process = process
+            self._conn = parent_conn
+            self._shm_lock = shm_lock
+            self._frame_cond = frame_cond
+            self._published = published
+            self._header_shm = header_shm
+            self._header = np.ndarray((len(_HEADER) + len(buffers),), dtype=np.int64, buffer=header_shm.buf)
+            self._sensors_shm = sensors_shm
+            self._sensors = (np.ndarray((), dtype=_SENSOR_DTYPE, buffer=sensors_shm.buf)
+                             if sensors_shm is not None else None)
+            self._buffers = buffers
+            self.intrinsics = payload["intrinsics"]
+        print(f"[Worker {str(self.serial)[-3:]}] running in pid {process.pid}")
+
+
+    def _supervise(self):
+        while not self._stopping.is_set():
+            process = self._process
+            connection.wait([process.sentinel], timeout=0.5)
+            if process.is_alive() or self._stopping.is_set():
+                continue
+
+            print(f"[Worker {str(self.serial)[-3:]}] capture process exited "
+                  f"(code {process.exitcode})")
+            self._release(unlink=True)
+            if self.is_recording:
+                print(f"[Worker {str(self.serial)[-3:]}] WARNING: in-worker "
+                      f"recording was interrupted and will not resume.")
+                self.is_recording = False
+
+            while self.restarts < self.max_restarts and not self._stopping.is_set():
+                self.restarts += 1
+                time.sleep(min(2 ** (self.restarts - 1), 10))
+                try:
+                    self._spawn()
+                    break
+                except Exception as e:
+                    print(f"[Worker {str(self.serial)[-3:]}] restart "
+                          f"{self.restarts}/{self.max_restarts} failed: {e}")
+            else:
+                if not self._stopping.is_set():
+                    print(f"[Worker {str(self.serial)[-3:]}] giving up after "
+                          f"{self.restarts} restart(s)")
+                    self.failed = True
+                return
+
+
+    def _release(self, unlink=False):
+        """Detach from the current child's shared memory. unlink=True also
+        frees the segments, for when the child died without cleaning up."""
+        with self._state_lock:
+            segments = [shm for shm, _ in self._buffers.values()]
+            if self._header_shm is not None:
+                segments.append(self._header_shm)
+                self._seq_offset += int(self._header[0])
+            if self._sensors_shm is not None:
+                segments.append(self._sensors_shm)
+            self._buffers = {}
+            self._header = None
+            self._header_shm = None
+            self._sensors = None
+            self._sensors_shm = None
+            self._frame_cond = None
+            self._published = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        for shm in segments:
+            shm.close()
+            if unlink:
+                try:
+                    shm.unlink()
+                except FileNotFoundError:
+                    pass
+
+
+    def get_current_state(self, return_meta=False, streams=None):
+        with self._state_lock:
+            if self._header is None:
+                frames, meta = {}, {"seq": self._seq_offset, "timestamp_ns": None}
+            else:
+                with self._shm_lock:
+                    frames = {name: view.copy() for name, (_, view) in self._buffers.items()
+                              if streams is None or name in streams}
+                    header = self._header.tolist()
+                    sensors = self._sensors.copy() if self._sensors is not None else None
+                meta = self._meta(header, sensors)
+        return (frames, meta) if return_meta else frames
+
+
+    def _meta(self, header, sensors):
+        """ZedCamera-style meta from a header copy; seqs get the restart
+        offset so they stay monotonic."""
+        offset = self._seq_offset
+        seq, ts, change_seq = header[:3]
+        row = None
+        if sensors is not None:
+            fields = {name: sensors[name].tolist() for name in SENSOR_FIELDS}
+            fields = {name: tuple(v) if isinstance(v, list) else v for name, v in fields.items()}
+            fields["seq"] += offset
+            row = SensorRow(**fields)
+        return {
+            "seq": seq + offset,
+            "timestamp_ns": ts,
+            "stream_seq": {name: header[len(_HEADER) + i] + offset for i, name in enumerate(self._buffers)},
+            "sensors": row,
+            "change_seq": None if change_seq < 0 else change_seq + offset,
+        }
+
+
+    @property
+    def health(self):
+        return self.get_health()["state"]
+
+
+    def get_health(self):
+        """ZedCamera.get_health() as last mirrored by the child, plus
+        "restarts". While the child is down the state is "reconnecting"
+        (or "failed" once max_restarts is exhausted)."""
+        with self._state_lock:
+            if self._header is None:
+                state = "failed" if self.failed else "reconnecting"
+                return {"state": state, "since_last_frame_s": None, "reconnects": 0,
+                        "grab_errors": 0, "gaps": 0, "last_gap_s": None,
+                        "longest_gap_s": None, "restarts": self.restarts}
+            with self._shm_lock:
+                h = dict(zip(_HEADER, self._header[:len(_HEADER)].tolist()))
+        since = (time.monotonic_ns() - h["last_good_ns"]) / 1e9 if h["last_good_ns"] else None
+        return {
+            "state": HEALTH_STATES[h["state"]],
+            "since_last_frame_s": since,
+            "reconnects": h["reconnects"],
+            "grab_errors": h["grab_errors"],
+            "gaps": h["gaps"],
+            "last_gap_s": h["last_gap_us"] / 1e6 if h["gaps"] else None,
+            "longest_gap_s": h["longest_gap_us"] / 1e6 if h["gaps"] else None,
+            "restarts": self.restarts,
+        }
+
+
+    def subscribe(self, streams):
+        """The child mirrors every configured stream into shared memory, so
+        subscriptions don't change what it retrieves; the handle is inert."""
+        return Subscription(self, None, streams)
+
+
+    def wait_for_frame(self, after_seq=0, timeout=None, streams=None):
+        """Block on the child's frame Condition until a frame newer than
+        after_seq is in shared memory. Waits are sliced to 0.5 s so a
+        restarted child (new Condition) is picked up."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            frames, meta = self.get_current_state(return_meta=True, streams=streams)
+            if meta["seq"] > after_seq:
+                return frames, meta
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            wait = 0.5 if remaining is None else min(remaining, 0.5)
+            with self._state_lock:
+                cond, published, offset = self._frame_cond, self._published, self._seq_offset
+            if cond is None:
+                time.sleep(wait)        # child down; the supervisor is restarting it
+                continue
+            with cond:
+                cond.wait_for(lambda: published.value + offset > after_seq, wait)
+
+
+    def get_intrinsics(self):
+        return self.intrinsics
+
+
+    def deproject_pixel_to_point(self, xy):
+        if "depth" not in self.cfg.streams or self.intrinsics is None:
+            raise RuntimeError(
+                "deproject_pixel_to_point requires the 'depth' stream and a launched camera."
+            )
+        u, v = int(xy[0]), int(xy[1])
+        with self._state_lock:
+            if "depth" not in self._buffers:
+                return None
+            depth = self._buffers["depth"][1]
+            h, w = depth.shape[:2]
+            if not (0 <= u < w and 0 <= v < h):
+                return None
+            with self._shm_lock:
+                z = float(depth[v, u])
+        return pixel_to_point(self.intrinsics["matrix"], u, v, z)
+
+
+    def start_recording(self, calibration):
+        self._send(("start_recording", calibration))
+        self.is_recording = True
+
+
+    def stop_recording(self):
+        self._send(("stop_recording", None))
+        self.is_recording = False
+
+
+    def _send(self, msg):
+        with self._state_lock:
+            if self._conn is None:
+                print(f"[Worker {str(self.serial)[-3:]}] not running; dropped {msg[0]}")
+                return
+            self._conn.send(msg)
+
+
+    def shutdown(self):
+        self._stopping.set()
+        process = self._process
+        if process is not None and process.is_alive():
+            self._send(("shutdown", None))
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._release(unlink=process is not None and process.exitcode != 0)
+        if self._supervisor is not None:
+            self._supervisor.join(timeout=2)
+            self._supervisor = None
+        self._process = None
+        print(f"[Worker {str(self.serial)[-3:]}] Shutdown complete.")
+
+
+def _worker_main(serial, zed_cfg, recorder_cfg, conn, shm_lock, frame_cond, published):
+    """Child process entry point: own the ZedCamera, mirror frames into
+    shared memory, and service recording commands from the coordinator."""
+    from .zed import ZedCamera
+
+    zed = ZedCamera(serial, zed_cfg)
+    recorder = Recorder(serial, recorder_cfg) if recorder_cfg is not None else None
+    segments = []
+    try:
+        zed.launch()
+        # Shared buffers are sized from the first frame that carries every
+        # stream (depth_filtered may trail the raw streams by a frame).
+        expected = set(zed_cfg.streams) | ({"depth_filtered"} if zed_cfg.depth_filters else set())
+        deadline = time.monotonic() + 10
+        streams, meta = {}, {"seq": 0}
+        while not expected <= streams.keys():
+            frame = zed.wait_for_frame(meta["seq"], timeout=max(deadline - time.monotonic(), 0))
+            if frame is None:
+                raise RuntimeError("no complete frame within 10s of launch")
+            streams, meta = frame
+
+        header_shm = shared_memory.SharedMemory(create=True, size=8 * (len(_HEADER) + len(streams)))
+        segments.append(header_shm)
+        header = np.ndarray((len(_HEADER) + len(streams),), dtype=np.int64, buffer=header_shm.buf)
+        header[:] = 0
+        header[2] = -1
+        sensors = sensors_shm = None
+        if zed_cfg.metadata:
+            sensors_shm = shared_memory.SharedMemory(create=True, size=_SENSOR_DTYPE.itemsize)
+            segments.append(sensors_shm)
+            sensors = np.ndarray((), dtype=_SENSOR_DTYPE, buffer=sensors_shm.buf)
+            sensors[()] = tuple(empty_row())
+
+        views, layout = {}, {}
+        for name, arr in streams.items():
+            shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+            segments.append(shm)
+            views[name] = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+            layout[name] = (shm.name, arr.shape, arr.dtype.str)
+
+        intrinsics = {k: v for k, v in zed.intrinsics.items() if k != "raw"}
+        conn.send(("ready", {"header": header_shm.name, "streams": layout, "intrinsics": intrinsics,
+                             "sensors": sensors_shm.name if sensors_shm is not None else None}))
+
+        seq = 0
+        while True:
+            if conn.poll():
+                cmd, payload = conn.recv()
+                if cmd == "shutdown":
+                    break
+                if recorder is not None and cmd == "start_recording":
+                    recorder.start(calibration=payload)
+                elif recorder is not None and cmd == "stop_recording":
+                    recorder.stop()
+
+            health = zed.get_health()
+            with shm_lock:
+                header[_HEALTH] = _health_fields(health)
+            if health["state"] == "failed":
+                raise RuntimeError(f"camera lost after {health['reconnects']} reconnect(s)")
+
+            frame = zed.wait_for_frame(seq, timeout=0.1)
+            if frame is None:
+                continue
+            streams, meta = frame
+            seq = meta["seq"]
+            with frame_cond:
+                for name, view in views.items():
+                    arr = streams.get(name)
+                    if arr is not None:
+                        view[...] = arr
+                header[0] = seq
+                header[1] = meta["timestamp_ns"] or 0
+                change_seq = meta.get("change_seq")
+                header[2] = -1 if change_seq is None else change_seq
+                stream_seq = meta.get("stream_seq") or {}
+                for i, name in enumerate(views):
+                    header[len(_HEADER) + i] = stream_seq.get(name, seq)
+                if sensors is not None:
+                    row = meta.get("sensors")
+                    sensors[()] = tuple(row if row is not None else empty_row(seq, meta["timestamp_ns"]))
+                published.value = seq
+                frame_cond.notify_all()
+            if recorder is not None:
+                recorder.update(streams, meta=meta)
+
+    except Exception as e:
+        try:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        except (BrokenPipeError, OSError):
+            pass
+        raise
+    finally:
+        if recorder is not None:
+            recorder.shutdown()
+        zed.shutdown()
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+
+def _health_fields(health):
+    since = health["since_last_frame_s"]
+    last_good_ns = time.monotonic_ns() - int(since * 1e9) if since is not None else 0
+    return [
+        HEALTH_STATES.index(health["state"]),
+        health["reconnects"],
+        health["grab_errors"],
+        health["gaps"],
+        last_good_ns,
+        int((health["last_gap_s"] or 0) * 1e6),
+        int((health["longest_gap_s"] or 0) * 1e6),
+    ]
+
+
+class ProcessCamera(Camera):
+    """
+    Camera whose capture runs in a ZedWorker child process.
+
+    The Viewer always stays in the coordinator (OpenCV windows belong to the
+    main process). The Recorder runs in the coordinator by default; with
+    record_in_worker=True it runs next to the capture loop in the child and
+    receives every captured frame without a shared-memory round trip
+    (overlays are not recorded in that mode).
+
+    events: only the coordinator-side Recorder publishes on it. Frames and
+    health live in the child, so there are no "frame"/"health" events;
+    use wait_for_observations() and get_health().
+    """
+
+    def __init__(self, serial, config=None, record_in_worker=False, max_restarts=3, events=None):
+        self._record_in_worker = record_in_worker
+        self.max_restarts = max_restarts
+        super().__init__(serial, config, events=events)
+
+
+    def _make_source(self):
+        self.record_in_worker = self._record_in_worker and self.cfg.recorder is not None
+        return ZedWorker(
+            self.serial, self.cfg.zed,
+            recorder_config=self.cfg.recorder if self.record_in_worker else None,
+            max_restarts=self.max_restarts,
+        )
+
+
+    def start_recording(self):
+        if self.record_in_worker:
+            self.zed_camera.start_recording(self._calibration())
+        else:
+            super().start_recording()
+
+
+    def stop_recording(self):
+        if self.record_in_worker:
+            self.zed_camera.stop_recording()
+        else:
+            super().stop_recording()
+
+
+    def shutdown(self):
+        if self.record_in_worker and self.zed_camera.is_recording:
+            self.zed_camera.stop_recording()
+        super().shutdown()
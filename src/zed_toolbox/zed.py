@@ -1,9 +1,24 @@
+import collections
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pyzed.sl as sl
 
+from .change import ChangeDetector
 from .config import ZedConfig
+from .depth_filters import DepthFilterChain
+from .exposure import ExposureController
+from .history import FrameHistory
+from .metadata import MetadataLog, SensorRow
+from .retrieval import make_retriever
+from .scheduler import RetrieveScheduler, Subscription, source_stream
+from .snapshot import FrameSnapshot, LazyFrame
+from .utils import pixel_to_point
+
+
+HEALTH_STATES = ("starting", "ok", "degraded", "stalled", "reconnecting", "failed")
 
 
 class ZedCamera:
@@ -12,13 +27,77 @@ class ZedCamera:
 
     Access images via attributes (left_image, right_image, depth_image —
     only the streams enabled in config are populated) or via
-    get_current_state() for a snapshot dict under lock.
+    get_current_state() for the current immutable FrameSnapshot, published
+    by reference swap and read without a lock (which also carries
+    confidence / point_cloud / normals when enabled).
+
+    A RetrieveScheduler picks which streams each grab retrieves: per-stream
+    rates come from cfg.stream_rates, and set_active_streams() switches
+    streams off at runtime so unused measures aren't retrieved at all.
+    With cfg.demand_timeout, streams are only retrieved while a consumer
+    holds a subscribe() handle for them or has read them recently; with
+    cfg.copy_on_read, a retrieved frame is only copied out of the SDK
+    buffer when someone reads it.
 
     The left camera anchors the canonical intrinsics; depth (when enabled)
     is registered to the left frame.
+
+    With cfg.memory == "gpu", frames stay in device memory and are CuPy
+    arrays (DLPack / __cuda_array_interface__ capable) instead of NumPy.
+
+    With cfg.depth_filters, the filter chain runs on every depth frame (in
+    the capture thread or a small worker pool) and the result is published
+    as depth_filtered_image / the "depth_filtered" stream. It may lag the
+    raw depth by a frame when run on the pool.
+
+    With cfg.exposure_control, an ExposureController meters left frames in
+    the capture thread and adjusts exposure/gain at a bounded rate;
+    set_exposure_controller() swaps in one shared by several cameras.
+
+    With cfg.history_frames / cfg.history_mb, every retrieved frame is also
+    appended to self.history (a FrameHistory) for lookback queries.
+
+    With cfg.metadata, every grab also reads a metadata.SensorRow
+    (host time, exposure/gain in effect, the IMU sample at the image
+    timestamp). It is published with the frame as meta["sensors"] and
+    appended to self.metadata, a columnar MetadataLog of recent grabs.
+
+    With cfg.change_detection, self.change_detector (a
+    change.ChangeDetector) compares every retrieved image of its stream
+    with the last one that changed; meta["change_seq"] is the seq of the
+    newest grab that changed, so sinks can skip frames showing the same
+    scene.
+
+    Frames are published lock-free. The capture thread builds each new
+    FrameSnapshot (all streams plus seq, timestamp and per-stream seq)
+    outside any lock and publishes it by rebinding one attribute. Readers
+    take whatever snapshot is current and never block the capture thread.
+    Guarantees:
+        - one read (get_current_state, wait_for_frame, the *_image
+          properties) sees a single snapshot: its streams and meta all
+          belong to the same published grab;
+        - published arrays are never written again, so they can be kept
+          and used without copying;
+        - stream_seq in meta tells which grab each stream came from
+          (older for rate-limited or inactive streams; depth_filtered
+          carries the seq of the depth it was computed from and may trail).
+    Only the writers (capture thread, depth filter workers) serialize with
+    each other, on a publish lock readers never take.
+
+    The capture thread doubles as a watchdog. Failing grabs are retried
+    with exponential backoff (state "degraded"); after cfg.stall_timeout
+    seconds without a good frame the camera is closed and reopened with the
+    same InitParameters ("reconnecting"), without touching consumers. After
+    cfg.max_reconnects failed reopens it gives up ("failed"). get_health()
+    reports the state, time since the last frame and the gaps survived.
+
+    With an events.EventBus, every published frame is announced as a
+    "frame" event ({"seq", "timestamp_ns"}) and every watchdog state change
+    as a "health" event ({"state", "previous"}), both with the serial as
+    source, so consumers can block on the bus instead of polling.
     """
 
-    def __init__(self, serial, config=None):
+    def __init__(self, serial, config=None, events=None):
         if not serial:
             raise ValueError("Missing camera serial number.")
         self.serial = serial
@@ -28,22 +107,70 @@ class ZedCamera:
         elif isinstance(config, dict):
             config = ZedConfig(**config)
         self.cfg = config
+        self.events = events
 
-        self._has_left = "left" in self.cfg.streams
-        self._has_right = "right" in self.cfg.streams
         self._has_depth = "depth" in self.cfg.streams
 
         self.camera = sl.Camera()
         self.init_params = self._build_init_params()
+        self._retriever = make_retriever(self.cfg.memory, self.cfg.streams)
+        self._scheduler = RetrieveScheduler(self.cfg.streams, self.cfg.stream_rates,
+                                            self.cfg.fps, self.cfg.demand_timeout)
+
+        self.exposure_controller = None
+        self._exposure_version = 0
+        if self.cfg.exposure_control is not None:
+            self.exposure_controller = ExposureController(
+                exposure=self.cfg.exposure, gain=self.cfg.gain, **self.cfg.exposure_control,
+            )
+
+        self.history = None
+        if self.cfg.history_frames is not None or self.cfg.history_mb is not None:
+            self.history = FrameHistory(
+                self.cfg.history_streams or self.cfg.streams,
+                capacity=self.cfg.history_frames,
+                budget_mb=self.cfg.history_mb,
+            )
+
+        self.metadata = None
+        self._sensors_data = None
+        self._settings = (np.nan, np.nan)      # exposure, gain last applied
+        if self.cfg.metadata:
+            self.metadata = MetadataLog(self.cfg.metadata_frames)
+
+        self.change_detector = None
+        if self.cfg.change_detection is not None:
+            self.change_detector = ChangeDetector(**self.cfg.change_detection)
+
+        self._depth_chain = None
+        self._filter_pool = None
+        self._filter_workers = 0
+        self._filter_busy = 0
+        self.filter_drops = 0
+        if self.cfg.depth_filters:
+            self._depth_chain = DepthFilterChain(self.cfg.depth_filters)
 
         self._thread = None
         self._stop_event = threading.Event()
-        self._lock = threading.Lock()
+        self._lock = threading.Lock()           # scheduler, health and filter bookkeeping
+        self._publish_lock = threading.Lock()   # writers of _snapshot; readers never take it
+        self._frame_ready = threading.Condition()
         self._started = False
 
-        self.left_image = None
-        self.right_image = None
-        self.depth_image = None
+        self._snapshot = FrameSnapshot()
+        self._eager = set()         # streams copied at retrieve time even with copy_on_read
+        if self.cfg.depth_filters and self.cfg.depth_filter_threads > 0:
+            self._eager.add("depth")    # pooled filters outlive the buffer view
+        self.grab_drops = 0         # camera frames missed, from image timestamp gaps
+        self._frame_period_ns = int(1e9 / self.cfg.fps)
+
+        self.health = "starting"
+        self.reconnects = 0
+        self.grab_errors = 0
+        self.gaps = collections.deque(maxlen=100)  # (monotonic resume time, seconds without frames)
+        self._last_good = None      # monotonic time of the last published frame
+        self._watch_from = None     # last good frame or reopen, whichever is later
+        self._fail_streak = 0
 
         self.intrinsics = None
 
@@ -66,19 +193,24 @@ class ZedCamera:
                     f"sl.Camera.open() failed with {err}. Check camera connection."
                 )
             self._started = True
-
-            if self.cfg.auto_exposure:
-                self.camera.set_camera_settings(sl.VIDEO_SETTINGS.AEC_AGC, 1)
-            else:
-                self.camera.set_camera_settings(sl.VIDEO_SETTINGS.AEC_AGC, 0)
-                self.camera.set_camera_settings(sl.VIDEO_SETTINGS.EXPOSURE, self.cfg.exposure)
-                self.camera.set_camera_settings(sl.VIDEO_SETTINGS.GAIN, self.cfg.gain)
-
+            self._apply_settings()
             self._capture_intrinsics()
+            if self.metadata is not None:
+                self._sensors_data = sl.SensorsData()
+
+            if self._depth_chain is not None and self.cfg.depth_filter_threads > 0:
+                stateful = self._depth_chain.stateful
+                self._filter_workers = 1 if stateful else self.cfg.depth_filter_threads
+                self._filter_pool = ThreadPoolExecutor(
+                    max_workers=self._filter_workers,
+                    thread_name_prefix=f"zed-{str(self.serial)[-3:]}-depth",
+                )
 
             for _ in range(30):
                 self.camera.grab()
 
+            self._last_good = None
+            self._watch_from = time.monotonic()
             self._thread = threading.Thread(target=self._update_frame, daemon=True)
             self._thread.start()
 
@@ -90,6 +222,17 @@ class ZedCamera:
             raise
 
 
+    def _apply_settings(self):
+        if self.cfg.auto_exposure:
+            self.camera.set_camera_settings(sl.VIDEO_SETTINGS.AEC_AGC, 1)
+        else:
+            self.camera.set_camera_settings(sl.VIDEO_SETTINGS.AEC_AGC, 0)
+            self.camera.set_camera_settings(sl.VIDEO_SETTINGS.EXPOSURE, self.cfg.exposure)
+            self.camera.set_camera_settings(sl.VIDEO_SETTINGS.GAIN, self.cfg.gain)
+            self._settings = (self.cfg.exposure, self.cfg.gain)
+        self._exposure_version = 0      # re-apply controller settings on the next frame
+
+
     def _capture_intrinsics(self):
         info = self.camera.get_camera_information()
         calib = info.camera_configuration.calibration_parameters
@@ -103,51 +246,359 @@ class ZedCamera:
         translation = calib.stereo_transform.get_translation().get()
         baseline = float(abs(translation[0]))
 
+        resolution = info.camera_configuration.resolution
+
         self.intrinsics = {
             "matrix": K,
             "raw": left,
             "baseline": baseline,
+            "size": (int(resolution.width), int(resolution.height)),
         }
 
 
     def _update_frame(self):
-        left = sl.Mat() if self._has_left else None
-        right = sl.Mat() if self._has_right else None
-        depth = sl.Mat() if self._has_depth else None
-
-        while not self._stop_event.is_set():
+        while not self._stop_event.is_set() and self.health != "failed":
             try:
-                if self.camera.grab() != sl.ERROR_CODE.SUCCESS:
+                err = self.camera.grab()
+                host_ns = time.time_ns()
+                if err != sl.ERROR_CODE.SUCCESS:
+                    self._grab_failed(err)
                     continue
 
-                if left is not None:
-                    self.camera.retrieve_image(left, sl.VIEW.LEFT)
-                if right is not None:
-                    self.camera.retrieve_image(right, sl.VIEW.RIGHT)
-                if depth is not None:
-                    self.camera.retrieve_measure(depth, sl.MEASURE.DEPTH)
-
+                ts = self.camera.get_timestamp(sl.TIME_REFERENCE.IMAGE).get_nanoseconds()
+                sensors = self._read_sensors() if self.metadata is not None else None
+                with self._lock:
+                    due = self._scheduler.due(ts)
+                frames = self._retriever.retrieve(self.camera, due, copy=not self.cfg.copy_on_read)
+                if self.cfg.copy_on_read:
+                    for name in self._eager & frames.keys():
+                        frames[name] = self._retriever.materialize(frames[name])
+
+                changed = False
+                detector = self.change_detector
+                if detector is not None and detector.stream in frames:
+                    changed = detector.update(frames[detector.stream])
+
+                published = {
+                    name: LazyFrame(frame, self._retriever.materialize)
+                    if self.cfg.copy_on_read and name not in self._eager else frame
+                    for name, frame in frames.items()
+                }
+                with self._publish_lock:
+                    prev = self._snapshot
+                    if prev.timestamp_ns is not None:
+                        missed = round((ts - prev.timestamp_ns) / self._frame_period_ns) - 1
+                        if missed > 0:
+                            self.grab_drops += missed
+                    seq = prev.seq + 1
+                    if sensors is not None:
+                        sensors = SensorRow(seq, ts, host_ns, *sensors)
+                    self._snapshot = prev.updated(published, seq=seq, timestamp_ns=ts, sensors=sensors,
+                                                  change_seq=seq if changed else None)
+                # The next retrieve of these streams reuses the buffer an
+                # uncopied frame of `prev` still points into.
+                for name in published:
+                    old = prev.frames.get(name)
+                    if isinstance(old, LazyFrame):
+                        old.expire()
+                with self._frame_ready:
+                    self._frame_ready.notify_all()
+                if self.events is not None:
+                    self.events.publish("frame", self.serial, seq=seq, timestamp_ns=ts)
                 with self._lock:
-                    if left is not None:
-                        self.left_image = np.ascontiguousarray(left.get_data()[:, :, :3])
-                    if right is not None:
-                        self.right_image = np.ascontiguousarray(right.get_data()[:, :, :3])
-                    if depth is not None:
-                        self.depth_image = depth.get_data().copy()
+                    self._grab_ok_locked()
+
+                if sensors is not None:
+                    self.metadata.append(sensors)
+                if self.exposure_controller is not None and "left" in frames:
+                    self._control_exposure(frames["left"])
+                if self.history is not None:
+                    self.history.append(frames, ts, seq)
+                if self._depth_chain is not None and "depth" in frames:
+                    self._filter_depth(frames["depth"], seq)
 
             except Exception as e:
                 print(f"[Zed {str(self.serial)[-3:]}] Error in capture thread: {e}")
-                time.sleep(0.5)
+                self._grab_failed(e)
+
+
+    def _read_sensors(self):
+        """SensorRow fields after (seq, timestamp_ns, host_ns) for the grab
+        just made. Values the camera can't report (no IMU on the original
+        ZED, a failed query) are NaN / -1."""
+        exposure, gain = self._settings
+        if self.cfg.auto_exposure:
+            exposure, gain = (self._camera_setting(s) for s in (sl.VIDEO_SETTINGS.EXPOSURE, sl.VIDEO_SETTINGS.GAIN))
+        imu_ns, accel, gyro, orientation = -1, (np.nan,) * 3, (np.nan,) * 3, (np.nan,) * 4
+        data = self._sensors_data
+        if data is not None and self.camera.get_sensors_data(data, sl.TIME_REFERENCE.IMAGE) == sl.ERROR_CODE.SUCCESS:
+            imu = data.get_imu_data()
+            imu_ns = imu.timestamp.get_nanoseconds()
+            accel = imu.get_linear_acceleration()
+            gyro = imu.get_angular_velocity()
+            orientation = imu.get_pose().get_orientation().get()
+        return exposure, gain, imu_ns, accel, gyro, orientation
+
+
+    def _camera_setting(self, setting):
+        err, value = self.camera.get_camera_settings(setting)
+        return value if err == sl.ERROR_CODE.SUCCESS else np.nan
+
+
+    def _grab_ok_locked(self):
+        now = time.monotonic()
+        if self._last_good is not None and (
+            self._fail_streak or now - self._last_good >= self.cfg.stall_timeout
+        ):
+            self.gaps.append((now, now - self._last_good))
+        if self.health != "ok" and self._last_good is not None:
+            print(f"[Zed {str(self.serial)[-3:]}] frames resumed after "
+                  f"{now - self._last_good:.2f}s")
+        self._last_good = self._watch_from = now
+        self._fail_streak = 0
+        self._set_health_locked("ok")
+
+
+    def _set_health_locked(self, state):
+        previous, self.health = self.health, state
+        if state != previous and self.events is not None:
+            self.events.publish("health", self.serial, state=state, previous=previous)
+
+
+    def _grab_failed(self, err):
+        """Back off after a failed grab; reopen the camera once no frame
+        arrived for cfg.stall_timeout."""
+        with self._lock:
+            self.grab_errors += 1
+            self._fail_streak += 1
+            streak = self._fail_streak
+            silent = time.monotonic() - self._watch_from
+            if self.health == "ok":
+                self._set_health_locked("degraded")
+                print(f"[Zed {str(self.serial)[-3:]}] grab failed ({err}); retrying")
+        if silent >= self.cfg.stall_timeout:
+            self._reconnect()
+        else:
+            self._stop_event.wait(min(0.005 * 2 ** (streak - 1), 0.5))
+
+
+    def _reconnect(self):
+        tag = f"[Zed {str(self.serial)[-3:]}]"
+        attempt = 0
+        while not self._stop_event.is_set():
+            if self.cfg.max_reconnects is not None and attempt >= self.cfg.max_reconnects:
+                with self._lock:
+                    self._set_health_locked("failed")
+                print(f"{tag} giving up after {attempt} failed reopen(s)")
+                return
+            with self._lock:
+                self._set_health_locked("reconnecting")
+                silent = time.monotonic() - self._watch_from
+            print(f"{tag} no frame for {silent:.1f}s; reopening camera (attempt {attempt + 1})")
+            self.camera.close()
+            err = self.camera.open(self.init_params)
+            if err == sl.ERROR_CODE.SUCCESS:
+                self._apply_settings()
+                if self.change_detector is not None:
+                    self.change_detector.reset()
+                with self._lock:
+                    self.reconnects += 1
+                    self._set_health_locked("degraded")
+                    self._watch_from = time.monotonic()
+                print(f"{tag} camera reopened")
+                return
+            attempt += 1
+            print(f"{tag} reopen failed ({err})")
+            self._stop_event.wait(min(0.5 * 2 ** (attempt - 1), 10))
 
 
-    def get_current_state(self):
+    def get_health(self):
+        """
+        {"state", "since_last_frame_s", "reconnects", "grab_errors", "gaps",
+        "last_gap_s", "longest_gap_s"}. state is one of HEALTH_STATES;
+        "stalled" means grab() itself has been blocking for longer than
+        cfg.stall_timeout. A gap is an interruption (failed grabs, a reopen,
+        or a stall) between two good frames; the last 100 are kept.
+        """
         with self._lock:
-            imgs = {
-                "left": self.left_image,
-                "right": self.right_image,
-                "depth": self.depth_image,
+            now = time.monotonic()
+            since = None if self._last_good is None else now - self._last_good
+            state = self.health
+            if state == "ok" and since is not None and since >= self.cfg.stall_timeout:
+                state = "stalled"
+            gaps = [gap for _, gap in self.gaps]
+            return {
+                "state": state,
+                "since_last_frame_s": since,
+                "reconnects": self.reconnects,
+                "grab_errors": self.grab_errors,
+                "gaps": len(gaps),
+                "last_gap_s": gaps[-1] if gaps else None,
+                "longest_gap_s": max(gaps, default=None),
             }
-            return {k: v for k, v in imgs.items() if v is not None}
+
+
+    def _control_exposure(self, left):
+        exposure, gain, version = self.exposure_controller.observe(self.serial, left)
+        if version != self._exposure_version:
+            self.camera.set_camera_settings(sl.VIDEO_SETTINGS.EXPOSURE, exposure)
+            self.camera.set_camera_settings(sl.VIDEO_SETTINGS.GAIN, gain)
+            self._settings = (exposure, gain)
+            self._exposure_version = version
+
+
+    def set_exposure_controller(self, controller):
+        """Use `controller` (e.g. one shared across cameras) from the next
+        frame on; its current settings are applied then."""
+        self.exposure_controller = controller
+        self._exposure_version = 0
+
+
+    def _filter_depth(self, depth, seq):
+        if self._filter_pool is None:
+            self._publish_filtered(self._depth_chain(depth), seq)
+            return
+
+        # Bounded: never queue more frames than there are workers.
+        with self._lock:
+            if self._filter_busy >= self._filter_workers:
+                self.filter_drops += 1
+                return
+            self._filter_busy += 1
+        self._filter_pool.submit(self._filter_job, depth, seq)
+
+
+    def _filter_job(self, depth, seq):
+        try:
+            self._publish_filtered(self._depth_chain(depth), seq)
+        except Exception as e:
+            print(f"[Zed {str(self.serial)[-3:]}] Error in depth filter: {e}")
+        finally:
+            with self._lock:
+                self._filter_busy -= 1
+
+
+    def _publish_filtered(self, filtered, seq):
+        with self._publish_lock:
+            prev = self._snapshot
+            if prev.stream_seq.get("depth_filtered", 0) > seq:
+                return      # a newer depth was already filtered
+            self._snapshot = prev.updated({"depth_filtered": filtered},
+                                          stream_seq={"depth_filtered": seq})
+
+
+    def set_active_streams(self, streams):
+        """Retrieve only these configured streams from the next grab on.
+        Inactive streams keep their last value in get_current_state()."""
+        with self._lock:
+            self._scheduler.set_active(streams)
+
+
+    def subscribe(self, streams):
+        """
+        Keep these streams retrieved while the returned Subscription is open
+        (only matters with cfg.demand_timeout). Viewer/Recorder streams are
+        subscribed by Camera; user code that polls a stream rarely should
+        hold its own subscription.
+        """
+        streams = list(streams)
+        with self._lock:
+            token = self._scheduler.subscribe({source_stream(name) for name in streams})
+        return Subscription(self, token, streams)
+
+
+    def _unsubscribe(self, token):
+        with self._lock:
+            self._scheduler.unsubscribe(token)
+
+
+    def get_filter_timings(self):
+        """Per-stage depth filter cost, {stage: EMA ms}; {} without filters."""
+        return self._depth_chain.timings() if self._depth_chain is not None else {}
+
+
+    def get_current_state(self, return_meta=False, streams=None):
+        """
+        Snapshot of the latest frame as {stream: array}.
+
+        streams: only return these streams (default: all available). Naming
+            what you read keeps demand tracking and copy_on_read from paying
+            for the rest.
+
+        return_meta: if True, return (streams, meta) where meta is
+            {"seq": int, "timestamp_ns": int | None, "stream_seq": dict}
+            from the same snapshot as the images. seq increments once per
+            successful grab; the timestamp is the SDK image timestamp
+            (TIME_REFERENCE.IMAGE). stream_seq maps each stream to the seq it
+            was last retrieved at (older than seq for rate-limited or
+            inactive streams). meta["sensors"] is the grab's
+            metadata.SensorRow (None without cfg.metadata);
+            meta["change_seq"] the seq of the newest grab whose image
+            changed (None without cfg.change_detection).
+        """
+        frames, meta = self._read_snapshot(streams)
+        return (frames, meta) if return_meta else frames
+
+
+    @property
+    def frame_seq(self):
+        return self._snapshot.seq
+
+
+    @property
+    def timestamp_ns(self):
+        return self._snapshot.timestamp_ns
+
+
+    @property
+    def left_image(self):
+        return self._read("left")
+
+
+    @property
+    def right_image(self):
+        return self._read("right")
+
+
+    @property
+    def depth_image(self):
+        return self._read("depth")
+
+
+    @property
+    def depth_filtered_image(self):
+        return self._read("depth_filtered")
+
+
+    def wait_for_frame(self, after_seq=0, timeout=None, streams=None):
+        """
+        Block until a frame newer than after_seq is available.
+
+        Returns (streams, meta) like get_current_state(return_meta=True), or
+        None on timeout.
+        """
+        if self._snapshot.seq <= after_seq:
+            with self._frame_ready:
+                if not self._frame_ready.wait_for(lambda: self._snapshot.seq > after_seq, timeout):
+                    return None
+        return self._read_snapshot(streams)
+
+
+    def _read(self, name):
+        return self._read_snapshot([name])[0].get(name)
+
+
+    def _read_snapshot(self, streams=None):
+        """(frames, meta) from the current snapshot, without locking. Retries
+        on a newer snapshot if a copy_on_read frame expired under us."""
+        while True:
+            snap = self._snapshot
+            frames = snap.read(streams)
+            if frames is not None:
+                break
+        # Plain dict stores of existing keys: safe against the capture thread.
+        self._scheduler.touch({source_stream(name) for name in (snap.frames if streams is None else streams)})
+        return frames, snap.meta()
 
 
     def get_intrinsics(self):
@@ -167,23 +618,14 @@ class ZedCamera:
             )
         u, v = int(xy[0]), int(xy[1])
 
-        with self._lock:
-            if self.depth_image is None:
-                return None
-            h, w = self.depth_image.shape[:2]
-            if not (0 <= u < w and 0 <= v < h):
-                return None
-            z = float(self.depth_image[v, u])
-
-        if not np.isfinite(z) or z <= 0:
+        depth = self._read("depth")
+        if depth is None:
             return None
-
-        K = self.intrinsics["matrix"]
-        fx, fy = K[0, 0], K[1, 1]
-        cx, cy = K[0, 2], K[1, 2]
-        x = (u - cx) * z / fx
-        y = (v - cy) * z / fy
-        return [x, y, z]
+        h, w = depth.shape[:2]
+        if not (0 <= u < w and 0 <= v < h):
+            return None
+        z = float(depth[v, u])
+        return pixel_to_point(self.intrinsics["matrix"], u, v, z)
 
 
     def shutdown(self):
@@ -191,7 +633,11 @@ class ZedCamera:
         if self._thread is not None:
             self._thread.join(timeout=2)
             self._thread = None
+        if self._filter_pool is not None:
+            self._filter_pool.shutdown(wait=True)
+            self._filter_pool = None
         if self._started:
             self.camera.close()
             self._started = False
         print(f"[Zed {str(self.serial)[-3:]}] Shutdown complete.")
+